@@ -0,0 +1,512 @@
+"""
+Batched lockstep simulation engine.
+
+Advances many runs together over NumPy arrays instead of one `Collection`
+at a time. Collections are kept as a (runs x cards) count matrix, with every
+card of the expansion given a column, and runs are retired as they complete.
+
+The rules follow `simulation.simulate`: variant rotation, booster types,
+buying everything once affordable, and buying a card by the buy strategy
+at the pack point cap.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from pokemon_tcg_simulate.expansion import ANY, Expansion
+from pokemon_tcg_simulate.simulation import MAX_PACK_POINTS, rarity_order
+
+# default number of runs advanced together
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def _normalise_counts(counts):
+    # same rules as collection files: int -> one each, list -> copies per card
+    if isinstance(counts, (int, list)):
+        counts = {ANY: counts}
+    return {
+        variant: [1] * count if isinstance(count, int) else list(count)
+        for variant, count in counts.items()
+    }
+
+
+class BatchLayout:
+    """
+    Column layout of an expansion for the batch engine.
+
+    Every (rarity, variant, index) card gets a column. Cards of a rarity are
+    contiguous, and split into blocks by variant key in `counts` order.
+    """
+
+    def __init__(
+        self,
+        expansion: Expansion,
+        mission: dict | None = None,
+        buy_strategy: str = "rarest",
+    ):
+        self.expansion = expansion
+
+        if expansion.variants == [ANY]:
+            self.variants = [ANY]
+        else:
+            self.variants = [v for v in expansion.variants if v != ANY]
+        variant_index = {v: i for i, v in enumerate(self.variants)}
+
+        self.rarities = expansion.rarities
+        self.rarity_index = {r.name: i for i, r in enumerate(self.rarities)}
+
+        # columns are the card IDs of the compiled expansion
+        self.compiled = expansion.compiled
+        self._offsets = {
+            (self.rarity_index[name], key): start
+            for (name, key), start in self.compiled.offsets.items()
+        }
+        rarity_of = self.compiled.rarity_of
+        block_of, blocks = [], []
+        for i, rarity in enumerate(self.rarities):
+            for key, count in rarity.counts.items():
+                block_of += [len(blocks)] * count
+                blocks.append((i, key))
+
+        self.size = len(rarity_of)
+        self.rarity_of = np.array(rarity_of, dtype=np.intp)
+        self.rarity_matrix = np.eye(len(self.rarities), dtype=np.int64)[self.rarity_of]
+        self.block_of = np.array(block_of, dtype=np.intp)
+
+        n_rarities = len(self.rarities)
+        n_variants = len(self.variants)
+
+        # blocks which count towards completing a variant
+        self.block_variant = np.zeros((len(blocks), n_variants), dtype=np.int32)
+        for b, (_, key) in enumerate(blocks):
+            if key == ANY:
+                self.block_variant[b, :] = 1
+            elif key in variant_index:
+                self.block_variant[b, variant_index[key]] = 1
+
+        # per rarity / variant tables for regular slots
+        self.any_count = np.array([r.count(ANY) for r in self.rarities])
+        self.any_offset = np.array(
+            [self._offsets.get((i, ANY), 0) for i in range(n_rarities)]
+        )
+        self.variant_count = np.array(
+            [[r.count(v) for v in self.variants] for r in self.rarities]
+        )
+        self.variant_offset = np.array(
+            [
+                [self._offsets.get((i, v), 0) for v in self.variants]
+                for i in range(n_rarities)
+            ]
+        )
+
+        self.slot_cum_prob = [np.array(p, dtype=float) for p in expansion._cum_prob]
+
+        self.boosters = list(expansion.booster_rates)
+        self.booster_cum_prob = np.cumsum(list(expansion.booster_rates.values()))
+
+        # rare boosters: pool of columns per variant, padded with -1
+        self.rare_pool, self.rare_pool_size = self._pad(
+            [self.compiled._rare_cards.get(v, []) for v in self.variants]
+        )
+
+        self.themed_pool, self.themed_size = self._pad(
+            [self.compiled._themed_cards.get(v, []) for v in self.variants]
+        )
+
+        self.width = max(expansion.cards_per_pack + 1, 5, self.themed_pool.shape[1])
+
+        self.costs = np.array([r.cost for r in self.rarities], dtype=np.int64)
+
+        # rarities in the order the buy strategy picks from them, by variant
+        self.buy_strategy_order = [
+            np.array(rarity_order(self.rarities, buy_strategy, v), dtype=np.intp)
+            for v in self.variants
+        ]
+
+        self._load_mission(mission)
+
+    @staticmethod
+    def _pad(pools):
+        width = max((len(p) for p in pools), default=0)
+        table = np.full((len(pools), max(width, 1)), -1, dtype=np.intp)
+        for i, pool in enumerate(pools):
+            table[i, : len(pool)] = pool
+        return table, np.array([len(p) for p in pools])
+
+    def card_id(self, rarity_name: str, card: tuple[str, int]) -> int:
+        """
+        Column of a pulled card, following `RarityCollection.add`.
+        """
+        return self.compiled.card_id(rarity_name, card)
+
+    def _load_mission(self, mission):
+        n_rarities = len(self.rarities)
+        self.need = np.zeros(self.size, dtype=np.int32)
+
+        # columns in the order cards are bought, per rarity
+        self.buy_order = [np.zeros(0, dtype=np.intp) for _ in range(n_rarities)]
+
+        if mission:
+            self.tracked = np.array([r.name in mission for r in self.rarities])
+            for name, counts in mission.items():
+                i = self.rarity_index[name]
+                order = []
+                for variant, need in _normalise_counts(counts).items():
+                    start = self._offsets[(i, variant)]
+                    self.need[start : start + len(need)] = need
+                    order += range(start, start + len(need))
+                self.buy_order[i] = np.array(order, dtype=np.intp)
+        else:
+            self.tracked = np.ones(n_rarities, dtype=bool)
+            self.need[:] = 1
+            for i in range(n_rarities):
+                self.buy_order[i] = np.flatnonzero(self.rarity_of == i)
+
+        self.common = np.array([bool(r.common) for r in self.rarities]) & self.tracked
+        self.rare = np.array([r.rare for r in self.rarities])
+        self.rarity_size = np.bincount(self.rarity_of, minlength=n_rarities)
+
+    def initial_counts(self, initial_state: dict | None):
+        """
+        Card counts and loaded rarities from an initial state.
+        """
+        counts = np.zeros(self.size, dtype=np.int32)
+        loaded = np.zeros(len(self.rarities), dtype=bool)
+        if not initial_state:
+            return counts, loaded
+
+        for name, state in initial_state["collected"].items():
+            i = self.rarity_index[name]
+            if not self.tracked[i]:
+                raise KeyError(name)
+            loaded[i] = True
+
+            if not isinstance(state, dict):
+                state = {ANY: state}
+            for variant, count in state.items():
+                start = self._offsets[(i, variant)]
+                if isinstance(count, int):
+                    counts[start : start + count] += 1
+                else:
+                    counts[start : start + len(count)] += count
+
+        return counts, loaded
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of a batch of completed runs.
+
+    Per rarity arrays have a column for each rarity in `rarities`,
+    with -1 standing in for None.
+    """
+
+    # names of the rarities in the collection
+    rarities: list[str]
+
+    # whether each rarity appears in rare boosters
+    rare: list[bool]
+
+    # number of cards of each rarity
+    size: list[int]
+
+    # packs opened per run
+    opened: np.ndarray
+
+    # packs opened to complete all common cards per run
+    all_common_at: np.ndarray
+
+    # packs opened to complete each rarity per run
+    completed_at: np.ndarray
+
+    # cards bought per run by rarity
+    bought: np.ndarray
+
+    # unique cards collected per run by rarity
+    unique: np.ndarray
+
+    # total cards collected per run by rarity, including duplicates
+    total: np.ndarray
+
+    # cards still missing per run by rarity
+    remaining: np.ndarray
+
+    @property
+    def runs(self):
+        return len(self.opened)
+
+
+class _Batch:
+    def __init__(self, layout, n, initial_state, rng):
+        self.layout = layout
+        self.rng = rng
+
+        counts, loaded = layout.initial_counts(initial_state)
+        deficit = np.maximum(layout.need - counts, 0)
+
+        self.counts = np.tile(counts, (n, 1))
+        self.deficit_block = np.tile(
+            np.bincount(
+                layout.block_of, weights=deficit, minlength=len(layout.block_variant)
+            ),
+            (n, 1),
+        ).astype(np.int32)
+        rarity_deficit = np.bincount(
+            layout.rarity_of, weights=deficit, minlength=len(layout.rarities)
+        ).astype(np.int32)
+        self.deficit = np.tile(rarity_deficit, (n, 1))
+
+        completed_at = np.where(loaded & (rarity_deficit == 0), 0, -1)
+        self.completed_at = np.tile(completed_at, (n, 1))
+        self.bought = np.zeros((n, len(layout.rarities)), dtype=np.int32)
+
+        pack_points = (initial_state or {}).get("pack_points", 0)
+        self.opened = np.zeros(n, dtype=np.int32)
+        self.pack_points = np.full(n, pack_points, dtype=np.int64)
+        self.all_common_at = np.full(n, -1, dtype=np.int32)
+
+        n_variants = len(layout.variants)
+        self.variant_active = np.ones((n, n_variants), dtype=bool)
+        self.variant_pos = np.full(n, n_variants - 1, dtype=np.intp)
+
+        self.active = np.arange(n)
+
+    def next_variants(self, rows):
+        n_variants = self.variant_active.shape[1]
+        candidates = (self.variant_pos[rows, None] + np.arange(1, n_variants + 1)) % (
+            n_variants
+        )
+        ok = self.variant_active[rows[:, None], candidates]
+        variants = candidates[np.arange(len(rows)), ok.argmax(axis=1)]
+        self.variant_pos[rows] = variants
+        return variants
+
+    def pick_boosters(self, n):
+        cum_prob = self.layout.booster_cum_prob
+        if cum_prob[-1] == 0:
+            raise Exception("Infinite loop! Check your booster probabilities")
+        r = self.rng.random(n) * min(cum_prob[-1], 100)
+        return np.searchsorted(cum_prob, r)
+
+    def open_regular(self, variants, slots):
+        layout = self.layout
+        pulled = np.full((len(variants), layout.width), -1, dtype=np.intp)
+        for pos in range(slots):
+            cum_prob = layout.slot_cum_prob[pos]
+            r = self.rng.random(len(variants)) * min(cum_prob[-1], 100)
+            rarity = np.searchsorted(cum_prob, r)
+
+            any_count = layout.any_count[rarity]
+            count = layout.variant_count[rarity, variants]
+            if (count == 0).any():
+                raise ValueError("no cards to pick from")
+            p = (self.rng.random(len(variants)) * count).astype(np.intp)
+            pulled[:, pos] = np.where(
+                p < any_count,
+                layout.any_offset[rarity] + p,
+                layout.variant_offset[rarity, variants] + p - any_count,
+            )
+        return pulled
+
+    def open_rare(self, variants):
+        layout = self.layout
+        pulled = np.full((len(variants), layout.width), -1, dtype=np.intp)
+        size = layout.rare_pool_size[variants]
+        for pos in range(5):
+            p = (self.rng.random(len(variants)) * size).astype(np.intp)
+            pulled[:, pos] = layout.rare_pool[variants, p]
+        return pulled
+
+    def open_themed_rare(self, variants):
+        layout = self.layout
+        pulled = np.full((len(variants), layout.width), -1, dtype=np.intp)
+        themed = layout.themed_pool[variants]
+        pulled[:, : themed.shape[1]] = themed
+        return pulled
+
+    def open(self, variants):
+        layout = self.layout
+        boosters = self.pick_boosters(len(variants))
+        pulled = np.full((len(variants), layout.width), -1, dtype=np.intp)
+
+        for i, booster in enumerate(layout.boosters):
+            selected = np.flatnonzero(boosters == i)
+            if len(selected) == 0:
+                continue
+
+            v = variants[selected]
+            if booster == "regular":
+                pulled[selected] = self.open_regular(v, layout.expansion.cards_per_pack)
+            elif booster == "plus_one":
+                pulled[selected] = self.open_regular(
+                    v, layout.expansion.cards_per_pack + 1
+                )
+            elif booster == "rare":
+                pulled[selected] = self.open_rare(v)
+            elif booster == "themed_rare":
+                pulled[selected] = self.open_themed_rare(v)
+            else:
+                raise KeyError(booster)
+
+        return pulled
+
+    def add(self, rows, pulled):
+        layout = self.layout
+        counts = self.counts.reshape(-1)
+        for pos in range(pulled.shape[1]):
+            card = pulled[:, pos]
+            valid = card >= 0
+            if not valid.any():
+                continue
+            r, card = rows[valid], card[valid]
+
+            flat = r * layout.size + card
+            missing = counts[flat] < layout.need[card]
+            counts[flat] += 1
+
+            if missing.any():
+                r, card = r[missing], card[missing]
+                self.deficit[r, layout.rarity_of[card]] -= 1
+                self.deficit_block[r, layout.block_of[card]] -= 1
+
+    def mark_completed(self, rows):
+        completed = (
+            (self.deficit[rows] == 0)
+            & (self.completed_at[rows] < 0)
+            & self.layout.tracked
+        )
+        r, rarity = np.nonzero(completed)
+        self.completed_at[rows[r], rarity] = self.opened[rows[r]]
+
+    def completed_all(self, rows):
+        return ((self.completed_at[rows] >= 0) | ~self.layout.tracked).all(axis=1)
+
+    def buy_remaining(self, rows):
+        layout = self.layout
+        required = self.deficit[rows] @ layout.costs
+        affordable = required <= self.pack_points[rows]
+        rows = rows[affordable]
+        if len(rows) == 0:
+            return
+
+        self.pack_points[rows] -= required[affordable]
+        self.bought[rows] += self.deficit[rows]
+        self.counts[rows] = np.maximum(self.counts[rows], layout.need)
+        self.deficit[rows] = 0
+        self.deficit_block[rows] = 0
+        self.mark_completed(rows)
+
+    def buy_at_cap(self, rows, variants):
+        layout = self.layout
+        capped = self.pack_points[rows] == MAX_PACK_POINTS
+        rows, variants = rows[capped], variants[capped]
+        incomplete = ~self.completed_all(rows)
+        rows, variants = rows[incomplete], variants[incomplete]
+
+        for v, order in enumerate(layout.buy_strategy_order):
+            selected = rows[variants == v]
+            if len(selected) == 0:
+                continue
+
+            remaining = self.deficit[selected][:, order] > 0
+            rarities = order[remaining.argmax(axis=1)]
+
+            for rarity in np.unique(rarities):
+                r = selected[rarities == rarity]
+                buy_order = layout.buy_order[rarity]
+                missing = self.counts[r][:, buy_order] < layout.need[buy_order]
+                card = buy_order[missing.argmax(axis=1)]
+
+                self.counts[r, card] += 1
+                self.deficit[r, rarity] -= 1
+                self.deficit_block[r, layout.block_of[card]] -= 1
+                self.bought[r, rarity] += 1
+                self.pack_points[r] -= layout.costs[rarity]
+                self.mark_completed(r)
+
+    def step(self, buy_cards, max_opened):
+        layout = self.layout
+        rows = self.active
+
+        variants = self.next_variants(rows)
+        pulled = self.open(variants)
+
+        self.opened[rows] += 1
+        self.pack_points[rows] += 5
+
+        self.add(rows, pulled)
+        self.mark_completed(rows)
+
+        if buy_cards:
+            self.buy_remaining(rows)
+            self.buy_at_cap(rows, variants)
+
+        common = ((self.completed_at[rows] >= 0) | ~layout.common).all(axis=1)
+        common &= self.all_common_at[rows] < 0
+        self.all_common_at[rows[common]] = self.opened[rows[common]]
+
+        done = self.completed_all(rows)
+
+        variant_deficit = self.deficit_block[rows] @ layout.block_variant
+        completed_variant = variant_deficit[np.arange(len(rows)), variants] == 0
+        self.variant_active[rows[completed_variant], variants[completed_variant]] = (
+            False
+        )
+
+        if max_opened is not None:
+            done |= self.opened[rows] >= max_opened
+
+        self.active = rows[~done]
+
+    def result(self):
+        layout = self.layout
+        tracked = np.flatnonzero(layout.tracked)
+
+        unique = (self.counts > 0).astype(np.int64) @ layout.rarity_matrix
+        total = self.counts.astype(np.int64) @ layout.rarity_matrix
+
+        return BatchResult(
+            rarities=[layout.rarities[i].name for i in tracked],
+            rare=layout.rare[tracked].tolist(),
+            size=layout.rarity_size[tracked].tolist(),
+            opened=self.opened,
+            all_common_at=self.all_common_at,
+            completed_at=self.completed_at[:, tracked],
+            bought=self.bought[:, tracked],
+            unique=unique[:, tracked],
+            total=total[:, tracked],
+            remaining=self.deficit[:, tracked],
+        )
+
+
+def simulate_batch(
+    expansion: Expansion,
+    runs: int,
+    *,
+    mission: dict | None = None,
+    initial_state: dict | None = None,
+    buy_cards=True,
+    max_opened=None,
+    batch_size=None,
+    rng=None,
+    buy_strategy="rarest",
+):
+    """
+    Simulate `runs` collections in batches of up to `batch_size`.
+
+    Yields a `BatchResult` for each batch once all of its runs are done.
+    """
+    layout = BatchLayout(expansion, mission, buy_strategy)
+    rng = np.random.default_rng(rng)
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+
+    while runs > 0:
+        n = min(runs, batch_size)
+        batch = _Batch(layout, n, initial_state, rng)
+        while len(batch.active):
+            batch.step(buy_cards, max_opened)
+
+        yield batch.result()
+        runs -= n
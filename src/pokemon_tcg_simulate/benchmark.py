@@ -0,0 +1,360 @@
+"""
+Benchmarks of the simulation, stored as a JSON baseline to compare changes against.
+
+Every expansion is benchmarked simulating the full set, all common cards,
+a mission (if there is one for the expansion) and up to a max packs opened,
+along with micro-benchmarks of opening packs, adding cards to a collection
+and the statistics. All results are rates, so higher is better.
+"""
+
+import json
+import platform
+import sys
+import time
+from argparse import ArgumentParser
+from collections.abc import Callable
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from functools import partial
+from pathlib import Path
+
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.expansion import Expansion, create_common_mission
+from pokemon_tcg_simulate.registry import DATA_DIRECTORY, DEFAULT_DIRECTORY
+from pokemon_tcg_simulate.rng import run_rng
+from pokemon_tcg_simulate.runner import create_statistics
+from pokemon_tcg_simulate.simulation import simulate
+from pokemon_tcg_simulate.tables import find_expansions
+
+# bump when benchmarks change so old baselines aren't comparable
+BENCHMARK_VERSION = 2
+
+# seconds spent measuring each benchmark
+DEFAULT_MIN_TIME = 0.5
+
+# rounds of measurement, of which the fastest is kept
+REPEAT = 3
+
+# slowdown beyond which a benchmark counts as a regression
+DEFAULT_THRESHOLD = 0.1
+
+# packs opened in --max-opened mode
+MAX_OPENED = 100
+
+# packs opened, and results added, per call of the micro-benchmarks
+MICRO_SIZE = 1000
+STATISTICS_SIZE = 50
+
+SEED = 0
+
+
+def measure(step, *, min_time=DEFAULT_MIN_TIME, repeat=REPEAT):
+    """
+    Rate of calling `step()`, which returns how many units of work it did.
+
+    Returns (calls per second, units per second) of the fastest of `repeat`
+    rounds, each calling `step` for at least `min_time / repeat` seconds.
+    A step with a `reset` method has it called before each round, so every
+    round does the same work.
+    """
+    best = (0.0, 0.0)
+    for _ in range(repeat):
+        if reset := getattr(step, "reset", None):
+            reset()
+        calls = units = 0
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < min_time / repeat:
+            units += step()
+            calls += 1
+        best = max(best, (calls / elapsed, units / elapsed))
+    return best
+
+
+def find_missions(directory):
+    """
+    Mission cards by expansion name, the first mission file for each.
+    """
+    missions = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        with open(path) as f:
+            mission = json.load(f)
+        missions.setdefault(mission["expansion"], mission["cards"])
+    return missions
+
+
+def simulate_step(expansion, *, mission=None, max_opened=None):
+    # each call is one run, with its own stream so every benchmark does the same work
+    index = 0
+
+    def reset():
+        nonlocal index
+        index = 0
+
+    def step():
+        nonlocal index
+        collection = Collection.from_json(expansion, mission=mission)
+        simulate(
+            expansion,
+            collection,
+            max_opened=max_opened,
+            rng=run_rng(SEED, index),
+        )
+        index += 1
+        return collection.opened
+
+    step.reset = reset
+    return step
+
+
+def open_step(open_pack, variants):
+    rng = run_rng(SEED, 0)
+
+    def reset():
+        nonlocal rng
+        rng = run_rng(SEED, 0)
+
+    def step():
+        for i in range(MICRO_SIZE):
+            open_pack(variants[i % len(variants)], rng)
+        return MICRO_SIZE
+
+    step.reset = reset
+    return step
+
+
+def add_step(expansion):
+    compiled = expansion.compiled
+    rng = run_rng(SEED, 0)
+    packs = [
+        compiled.open(expansion.variants[i % len(expansion.variants)], rng)
+        for i in range(MICRO_SIZE)
+    ]
+
+    def step():
+        collection = Collection.from_json(expansion)
+        collection.index_cards(compiled)
+        for pulled in packs:
+            collection.add_ids(pulled)
+        return MICRO_SIZE
+
+    return step
+
+
+def _results(expansion):
+    results = []
+    for i in range(STATISTICS_SIZE):
+        collection = Collection.from_json(expansion)
+        results.append(simulate(expansion, collection, rng=run_rng(SEED, i)))
+    return results
+
+
+def _add_results(statistics, results):
+    for result in results:
+        for stat in statistics.values():
+            stat.add(result)
+    return statistics
+
+
+def statistics_add_step(expansion):
+    results = _results(expansion)
+
+    def step():
+        _add_results(create_statistics(), results)
+        return STATISTICS_SIZE
+
+    return step
+
+
+def statistics_summary_step(expansion):
+    statistics = _add_results(create_statistics(), _results(expansion))
+
+    def step():
+        for stat in statistics.values():
+            stat.summary()
+        return 1
+
+    return step
+
+
+@dataclass
+class Benchmark:
+    name: str
+
+    # sets up the benchmark, returning a step which does some work
+    # and returns how many units it did
+    setup: Callable[[], Callable[[], int]]
+
+    # what the step counts, and what one call of it is if that's of interest
+    unit: str
+    call_unit: str | None = None
+
+    def run(self, min_time=DEFAULT_MIN_TIME):
+        calls, units = measure(self.setup(), min_time=min_time)
+        rates = {f"{self.unit}_per_second": units}
+        if self.call_unit:
+            rates[f"{self.call_unit}_per_second"] = calls
+        return rates
+
+
+def expansion_benchmarks(path, missions):
+    with open(path) as f:
+        expansion = Expansion.from_json(json.load(f))
+    prefix = Path(path).stem
+
+    modes = {
+        "full": {},
+        "common": {"mission": create_common_mission(expansion)["cards"]},
+        "max_opened": {"max_opened": MAX_OPENED},
+    }
+    if expansion.name in missions:
+        modes["mission"] = {"mission": missions[expansion.name]}
+
+    for mode, options in modes.items():
+        setup = partial(simulate_step, expansion, **options)
+        yield Benchmark(f"simulate/{prefix}/{mode}", setup, "packs", "runs")
+
+    variants = expansion.variants
+    yield Benchmark(
+        f"open/{prefix}", partial(open_step, expansion.open, variants), "packs"
+    )
+    yield Benchmark(
+        f"open_compiled/{prefix}",
+        partial(open_step, expansion.compiled.open, variants),
+        "packs",
+    )
+    yield Benchmark(f"add/{prefix}", partial(add_step, expansion), "packs")
+    yield Benchmark(
+        f"statistics_add/{prefix}", partial(statistics_add_step, expansion), "results"
+    )
+    yield Benchmark(
+        f"statistics_summary/{prefix}",
+        partial(statistics_summary_step, expansion),
+        "summaries",
+    )
+
+
+def run_benchmarks(paths, missions, *, pattern="*", min_time=DEFAULT_MIN_TIME):
+    """
+    Run the benchmarks with names matching a glob pattern, returning a baseline.
+    """
+    results = {}
+    for path in paths:
+        for benchmark in expansion_benchmarks(path, missions):
+            if fnmatch(benchmark.name, pattern):
+                results[benchmark.name] = benchmark.run(min_time)
+
+    return {
+        "version": BENCHMARK_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "min_time": min_time,
+        "benchmarks": results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare rates in both baselines, returning rows of
+    (benchmark, rate, baseline, current, relative change, regressed).
+    """
+    if baseline["version"] != current["version"]:
+        raise ValueError("Benchmarks are from different versions")
+
+    rows = []
+    for name, rates in current["benchmarks"].items():
+        for rate, value in rates.items():
+            old = baseline["benchmarks"].get(name, {}).get(rate)
+            if old:
+                change = value / old - 1
+                rows.append((name, rate, old, value, change, change < -threshold))
+    return rows
+
+
+def format_comparison(rows) -> str:
+    lines = []
+    for name, rate, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{name} {rate}: {old:.1f} -> {new:.1f} ({change:+.1%}){flag}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = ArgumentParser(description="benchmark the simulation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "expansions",
+        nargs="?",
+        default=DEFAULT_DIRECTORY,
+        help="directory of, or glob matching, expansion data jsons",
+    )
+    run_parser.add_argument(
+        "--missions",
+        default=str(DATA_DIRECTORY / "missions"),
+        help="directory of mission jsons, the first for each expansion is benchmarked",
+    )
+    run_parser.add_argument(
+        "-k", "--filter", default="*", help="glob of benchmark names to run"
+    )
+    run_parser.add_argument(
+        "--min-time",
+        default=DEFAULT_MIN_TIME,
+        type=float,
+        help="seconds to spend measuring each benchmark",
+    )
+    run_parser.add_argument("-o", "--output", help="path to save the results to")
+    run_parser.add_argument("--compare", help="path to a baseline to compare against")
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="compare saved benchmark results"
+    )
+    compare_parser.add_argument("baseline", help="path to the baseline results")
+    compare_parser.add_argument("current", help="path to the results to check")
+
+    for p in (run_parser, compare_parser):
+        p.add_argument(
+            "--threshold",
+            default=DEFAULT_THRESHOLD,
+            type=float,
+            help="relative slowdown that counts as a regression",
+        )
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        paths = find_expansions(args.expansions)
+        if not paths:
+            parser.error(f"no expansions found for {args.expansions}")
+
+        current = run_benchmarks(
+            paths,
+            find_missions(args.missions),
+            pattern=args.filter,
+            min_time=args.min_time,
+        )
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+
+        if not args.compare:
+            for name, rates in current["benchmarks"].items():
+                print(name, " ".join(f"{k}={v:.1f}" for k, v in rates.items()))
+            return
+        baseline_path = args.compare
+    else:
+        baseline_path = args.baseline
+        with open(args.current) as f:
+            current = json.load(f)
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    print(format_comparison(rows))
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
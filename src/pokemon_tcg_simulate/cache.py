@@ -0,0 +1,76 @@
+"""
+On-disk cache of simulation results, keyed by the inputs that affect them.
+
+Entries are checkpoints (see `checkpoint.Checkpoint`), so an entry with
+fewer runs than requested can be topped up rather than recomputed. Entries
+not signed with the cache directory's key are ignored, and recomputed.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from pokemon_tcg_simulate.checkpoint import Checkpoint
+
+# bump when a change to the simulation changes its results
+ENGINE_VERSION = 2
+
+# default limit on the total size of the cache, in bytes
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def cache_key(expansion_data: dict, options: dict) -> str:
+    """
+    Hash of the normalised inputs of a simulation, including the seed in options.
+    """
+    inputs = {
+        "engine_version": ENGINE_VERSION,
+        "expansion": expansion_data,
+        "options": options,
+    }
+    normalised = json.dumps(inputs, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalised.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Directory of cached results, evicting the least recently used entries
+    once the total size is over `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.gz"
+
+    def load(self, key: str) -> Checkpoint | None:
+        path = self.path(key)
+        if not path.exists():
+            return None
+
+        # reading counts as use, for eviction
+        path.touch()
+        try:
+            return Checkpoint.load(str(path))
+        except ValueError:
+            return None
+
+    def save(self, key: str, checkpoint: Checkpoint):
+        checkpoint.save(str(self.path(key)))
+        self.evict(keep=key)
+
+    def evict(self, keep: str | None = None):
+        entries = sorted(
+            (p for p in self.directory.glob("*.gz") if p.stem != keep),
+            key=lambda p: p.stat().st_mtime,
+        )
+        total = sum(p.stat().st_size for p in self.directory.glob("*.gz"))
+
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink()
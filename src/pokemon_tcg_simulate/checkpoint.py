@@ -0,0 +1,108 @@
+"""
+Checkpoints of long simulation jobs, so they can be resumed or extended.
+
+A checkpoint holds the accumulated statistics, the number of runs they
+cover and the random state, as a gzipped pickle, signed (see `signing`) so
+only checkpoints this simulator wrote are unpickled.
+"""
+
+import gzip
+import pickle
+import random
+import time
+from dataclasses import dataclass
+
+from pokemon_tcg_simulate.runner import (
+    create_statistics,
+    empty_statistics,
+    merge_statistics,
+)
+from pokemon_tcg_simulate.signing import read_signed, write_signed
+
+# bump when the checkpoint contents change
+CHECKPOINT_VERSION = 2
+
+# seconds between checkpoints
+DEFAULT_INTERVAL = 60
+
+# runs between chances to checkpoint
+CHUNK_RUNS = 100
+
+
+@dataclass(kw_only=True)
+class Checkpoint:
+    # accumulated statistics, as from runner.create_statistics
+    statistics: dict
+
+    # number of runs in the statistics
+    runs: int = 0
+
+    # expansion and options the runs were made with, which must match to carry on
+    expansion: str | None = None
+    options: dict
+
+    # state of the random module after the last run
+    random_state: tuple | None = None
+
+    @classmethod
+    def create(cls, options: dict, expansion: str | None = None):
+        statistics = create_statistics(
+            buy_cards=options.get("buy_cards", True),
+            max_opened=options.get("max_opened"),
+            importance_tilt=options.get("importance_tilt"),
+            control_variates=options.get("control_variates", False),
+            progress_at=options.get("progress_at"),
+        )
+        return cls(statistics=statistics, options=options, expansion=expansion)
+
+    def save(self, path: str):
+        write_signed(path, gzip.compress(pickle.dumps((CHECKPOINT_VERSION, self))))
+
+    @classmethod
+    def load(cls, path: str):
+        # raises ValueError unless it's signed, before unpickling anything
+        version, checkpoint = pickle.loads(gzip.decompress(read_signed(path)))
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {version}")
+        return checkpoint
+
+    def restore_random_state(self):
+        if self.random_state is not None:
+            random.setstate(self.random_state)
+
+
+def checkpointed(
+    run_round,
+    checkpoint: Checkpoint,
+    path: str | None,
+    *,
+    every: float = DEFAULT_INTERVAL,
+    chunk: int = CHUNK_RUNS,
+):
+    """
+    Wrap `run_round(runs, statistics)` to add runs to the checkpoint in
+    chunks, saving it to `path` every `every` seconds.
+
+    Each chunk is run into fresh statistics and merged once it finishes,
+    so an interrupted chunk leaves the checkpoint as of the last whole one.
+    """
+    last = time.monotonic()
+
+    def inner(runs):
+        nonlocal last
+
+        while runs > 0:
+            size = min(runs, chunk) if path else runs
+            partial = empty_statistics(checkpoint.statistics)
+            run_round(size, partial)
+
+            merge_statistics(checkpoint.statistics, partial)
+            checkpoint.runs += size
+            checkpoint.random_state = random.getstate()
+            runs -= size
+
+            if path and time.monotonic() - last >= every:
+                checkpoint.save(path)
+                last = time.monotonic()
+
+    return inner
@@ -1,42 +1,63 @@
+from array import array
+from collections import Counter
 from dataclasses import dataclass, field
+from itertools import repeat
 
-from pokemon_tcg_simulate.expansion import ANY, Rarity
+from pokemon_tcg_simulate.expansion import ANY, CompiledExpansion, Rarity
 
 
-@dataclass
 class Variant:
-    # how many cards are in the variant
-    size: int
+    __slots__ = ("size", "seen", "counts", "total", "_full")
 
-    # number of unique cards collected
-    unique: int = field(init=False, default=0)
+    def __init__(self, size: int):
+        # how many cards are in the variant
+        self.size = size
 
-    # total cards collected, including duplicated
-    total: int = field(init=False, default=0)
+        # bitmask of cards collected at least once
+        self.seen = 0
 
-    # number collected of each card in the variant
-    collection: list[int] = field(init=False)
+        # number collected of each card in the variant
+        self.counts = array("l", bytes(size * array("l").itemsize))
 
-    def __post_init__(self):
-        self.collection = [0 for _ in range(self.size)]
+        # total cards collected, including duplicated
+        self.total = 0
+
+        self._full = (1 << size) - 1
+
+    def __repr__(self):
+        return f"Variant(size={self.size}, collection={self.collection})"
+
+    @property
+    def unique(self):
+        # number of unique cards collected
+        return self.seen.bit_count()
+
+    @property
+    def collection(self):
+        return list(self.counts)
+
+    @collection.setter
+    def collection(self, counts):
+        self.counts = array("l", counts)
+        self.seen = sum(1 << i for i, c in enumerate(counts) if c > 0)
 
     @property
     def completed(self):
-        return self.size == self.unique
+        return self.seen == self._full
 
     def __len__(self):
-        return self.unique
+        return self.seen.bit_count()
 
     def __contains__(self, item):
-        return self.collection[item] > 0
+        return self.seen >> item & 1 == 1
 
     def __getitem__(self, item):
-        return self.collection[item]
+        return self.counts[item]
 
     def add(self, item, count=1):
-        if self.collection[item] == 0:
-            self.unique += 1
-        self.collection[item] += count
+        if count > 0:
+            self.seen |= 1 << item
+        self.counts[item] += count
         self.total += 1
 
 
@@ -54,14 +75,32 @@ class RarityCollection:
     # how many packs were opened to complete the set
     completed_at: int | None = field(init=False, default=None)
 
+    # running count of missing cards by variant
+    missing: dict[str, int] = field(init=False)
+
     def __post_init__(self):
         counts = self.rarity.counts
         if isinstance(counts, int):
             counts = {ANY: counts}
 
         self.collected = {v: Variant(c) for v, c in counts.items()}
+        self.missing = dict(counts)
+        self._remaining = sum(counts.values())
+
+    def _recount(self):
+        self.missing = {v: 0 for v in self.collected}
+        for variant, _ in self.iter_missing():
+            self.missing[variant] += 1
+        self._remaining = sum(self.missing.values())
+
+    def _take_missing(self, variant: str, card: int):
+        # called before adding a card, returns whether it counts towards completion
+        return not self.collected[variant].seen >> card & 1
 
     def add(self, item: tuple[str, int], opened: int):
+        """
+        Add a card, returning its variant if it was missing, otherwise None.
+        """
         variant, card = item
 
         if variant not in self.collected and list(self.rarity.counts.keys()) == [ANY]:
@@ -70,14 +109,26 @@ class RarityCollection:
             card = list(self.rarity.rare_counts.keys()).index(variant)
             variant = ANY  # TODO: is this sound?
 
+        return self.add_card(variant, card, opened)
+
+    def add_card(self, variant: str, card: int, opened: int):
+        # as add, for a card already resolved to where it's collected
+        missing = self._take_missing(variant, card)
         self.collected[variant].add(card)
 
-        if self.completed_at is None and self.remaining() == 0:
+        if missing:
+            self.missing[variant] -= 1
+            self._remaining -= 1
+
+        if self.completed_at is None and self._remaining == 0:
             self.completed_at = opened
 
+        return variant if missing else None
+
     def buy(self, item: tuple[str, int], opened: int):
-        self.add(item, opened)
+        variant = self.add(item, opened)
         self.bought.append(item)
+        return variant
 
     def count(self, variant: str | None = None):
         return variant_sum(self, variant, key=len)
@@ -90,12 +141,18 @@ class RarityCollection:
 
     def iter_missing(self):
         for variant, count in self.rarity.counts.items():
-            yield from (
-                (variant, i) for i in range(count) if i not in self.collected[variant]
-            )
+            seen = self.collected[variant].seen
+            yield from ((variant, i) for i in range(count) if not seen >> i & 1)
 
     def remaining(self, variant: str | None = None):
-        return self.rarity.count(variant) - self.count(variant)
+        if variant is None:
+            return self._remaining
+
+        any_missing = self.missing.get(ANY, 0)
+        if variant == ANY:
+            return any_missing
+
+        return any_missing + self.missing.get(variant, 0)
 
     def remaining_cost(self, variant: str | None = None):
         return self.rarity.cost * self.remaining(variant)
@@ -112,6 +169,8 @@ class RarityCollection:
                 for i, num in enumerate(count):
                     self.collected[variant].add(i, num)
 
+        self._recount()
+
         if self.remaining() == 0:
             self.completed_at = 0
 
@@ -144,22 +203,46 @@ class MissionRarityCollection(RarityCollection):
             if isinstance(count, int):
                 self.mission[variant] = [1 for _ in range(count)]
 
+        self._recount()
+
+    def _recount(self):
+        # copies still needed of each card, in mission order
+        self._wanted = {}
+        for variant, count in self.mission.items():
+            collected = self.collected[variant]
+            self._wanted[variant] = {
+                inx: need - collected[inx]
+                for inx, need in enumerate(count)
+                if need > collected[inx]
+            }
+
+        self.missing = {
+            v: sum(self._wanted.get(v, {}).values()) for v in self.collected
+        }
+        self._remaining = sum(self.missing.values())
+
+    def _take_missing(self, variant: str, card: int):
+        wanted = self._wanted.get(variant)
+        if not wanted or card not in wanted:
+            return False
+
+        if wanted[card] == 1:
+            del wanted[card]
+        else:
+            wanted[card] -= 1
+        return True
+
     def iter_missing(self, variant=None):
         if variant is not None:
-            mission = [(variant, self.mission.get(variant, []))]
-            if variant != ANY and ANY in self.mission:
-                mission.append((ANY, self.mission[ANY]))
+            variants = [variant]
+            if variant != ANY:
+                variants.append(ANY)
         else:
-            mission = self.mission.items()
+            variants = self._wanted
 
-        for variant, count in mission:
-            for inx, need in enumerate(count):
-                have = self.collected[variant][inx]
-                if need > have:
-                    yield from ((variant, inx) for _ in range(need - have))
-
-    def remaining(self, variant=None):
-        return sum(1 for _ in self.iter_missing(variant))
+        for variant in variants:
+            for inx, need in self._wanted.get(variant, {}).items():
+                yield from repeat((variant, inx), need)
 
 
 @dataclass(kw_only=True)
@@ -176,20 +259,108 @@ class Collection:
     # how many packs were opened to collect all common cards
     all_common_at: int | None = None
 
+    # running totals across rarities, kept up to date by add and buy
+    _remaining_cost: int = field(init=False, repr=False, compare=False)
+    _missing: Counter = field(init=False, repr=False, compare=False)
+    _incomplete: int = field(init=False, repr=False, compare=False)
+    _incomplete_common: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._recount()
+
+    def _recount(self):
+        self._remaining_cost = 0
+        self._missing = Counter()
+        self._incomplete = 0
+        self._incomplete_common = 0
+
+        for collected in self.collected.values():
+            self._remaining_cost += collected.remaining_cost()
+            self._missing.update(collected.missing)
+            if collected.completed_at is None:
+                self._incomplete += 1
+                if collected.rarity.common:
+                    self._incomplete_common += 1
+
+    def _add(self, collected: RarityCollection, item: tuple[str, int], buy=False):
+        incomplete = collected.completed_at is None
+
+        if buy:
+            variant = collected.buy(item, self.opened)
+        else:
+            variant = collected.add(item, self.opened)
+
+        self._update(collected, variant, incomplete)
+
+    def _update(self, collected: RarityCollection, variant, incomplete):
+        if variant is not None:
+            self._missing[variant] -= 1
+            self._remaining_cost -= collected.rarity.cost
+
+        if incomplete and collected.completed_at is not None:
+            self._incomplete -= 1
+            if collected.rarity.common:
+                self._incomplete_common -= 1
+
     def add(self, pulled: list[tuple[str, tuple[str, int]]]):
         for rarity, pull in pulled:
             if rarity in self.collected:
-                self.collected[rarity].add(pull, self.opened)
+                self._add(self.collected[rarity], pull)
+
+    def index_cards(self, compiled: CompiledExpansion):
+        """
+        Map card IDs of a compiled expansion to where they are collected,
+        for add_ids.
+        """
+        self._cards = []
+        for rarity, card in compiled.cards:
+            collected = self.collected.get(rarity)
+            self._cards.append(collected and (collected, *card))
+
+    def add_ids(self, pulled: list[int]):
+        for card in pulled:
+            if entry := self._cards[card]:
+                collected, variant, index = entry
+                incomplete = collected.completed_at is None
+                missing = collected.add_card(variant, index, self.opened)
+                self._update(collected, missing, incomplete)
 
     def buy(self, picked: tuple[str, tuple[str, int]]):
         rarity, card = picked
-        self.collected[rarity].buy(card, self.opened)
+        self._add(self.collected[rarity], card, buy=True)
         self.pack_points -= self.collected[rarity].rarity.cost
 
+    def buy_remaining(self):
+        for collected in self.collected.values():
+            # buying changes what's missing
+            for missing in list(collected.iter_missing()):
+                if self.pack_points < collected.rarity.cost:
+                    # likely a programming error
+                    raise RuntimeError("Ran out of points")
+
+                self._add(collected, missing, buy=True)
+                self.pack_points -= collected.rarity.cost
+
+    def required_pack_points(self):
+        return self._remaining_cost
+
+    def completed_all(self):
+        return self._incomplete == 0
+
+    def completed_common(self):
+        # TODO: incorrectly treats star1+1 as common
+        return self._incomplete_common == 0
+
+    def completed_variant(self, variant):
+        if variant == ANY:
+            return self._missing[ANY] == 0
+        return self._missing[ANY] + self._missing[variant] == 0
+
     def load_initial_state(self, initial_state):
         self.pack_points = initial_state.get("pack_points", 0)
         for rarity, counts in initial_state["collected"].items():
             self.collected[rarity].load_initial_state(counts)
+        self._recount()
 
     @classmethod
     def from_json(cls, expansion, mission=None):
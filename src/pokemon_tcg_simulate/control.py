@@ -0,0 +1,280 @@
+"""
+Control variates, for a more precise average packs opened from fewer runs.
+
+Every run counts the cards of each rarity it pulls, less the number expected
+from the rates for the packs it opened, and the cards of each rarity it pulls
+at least once, less their summed chances of turning up in each pack before
+they did. Both are martingales, so by Wald's identity (optional stopping)
+they have an expected value of zero however long the run goes on, and they
+correlate with the packs opened: runs which pull the rare cards early finish
+sooner.
+Regressing packs opened on them and subtracting the fit removes that part of
+the variance from the average.
+"""
+
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.expansion import CompiledExpansion, Expansion, capped_weights
+from pokemon_tcg_simulate.output import avg
+
+# relative size of pivot below which a control is dropped as redundant
+TOLERANCE = 1e-9
+
+
+def expected_pulls(compiled: CompiledExpansion, variant: str) -> list[float]:
+    """
+    Expected number of cards of each rarity in a pack of a variant.
+    """
+    expansion = compiled.expansion
+    expected = [0.0] * len(expansion.rarities)
+
+    weights = capped_weights(expansion.booster_rates.values())
+    total = sum(weights)
+    for booster, weight in zip(expansion.booster_rates, weights):
+        p = weight / total
+        if booster in ("regular", "plus_one"):
+            size = expansion.cards_per_pack + (booster == "plus_one")
+            for pos in range(size):
+                slot = compiled.slot_weights(pos, variant) or []
+                slot_total = sum(slot)
+                for card, w in enumerate(slot):
+                    if w:
+                        expected[compiled.rarity_of[card]] += p * w / slot_total
+        elif booster == "rare":
+            cards = compiled._rare_cards[variant]
+            for card in cards:
+                expected[compiled.rarity_of[card]] += p * 5 / len(cards)
+        elif booster == "themed_rare":
+            for card in compiled._themed_cards[variant]:
+                expected[compiled.rarity_of[card]] += p
+
+    return expected
+
+
+def first_pull_rates(compiled: CompiledExpansion, variant: str) -> list[float]:
+    """
+    Chance of each card ID being in a pack of a variant, at least once.
+    """
+    expansion = compiled.expansion
+    rates = [0.0] * len(compiled.cards)
+
+    weights = capped_weights(expansion.booster_rates.values())
+    total = sum(weights)
+    for booster, weight in zip(expansion.booster_rates, weights):
+        p = weight / total
+        if booster in ("regular", "plus_one"):
+            size = expansion.cards_per_pack + (booster == "plus_one")
+            missed = [1.0] * len(compiled.cards)
+            for pos in range(size):
+                slot = compiled.slot_weights(pos, variant) or []
+                slot_total = sum(slot)
+                for card, w in enumerate(slot):
+                    missed[card] *= 1 - w / slot_total
+            for card, m in enumerate(missed):
+                rates[card] += p * (1 - m)
+        elif booster == "rare":
+            cards = compiled._rare_cards[variant]
+            for card in set(cards):
+                share = cards.count(card) / len(cards)
+                rates[card] += p * (1 - (1 - share) ** 5)
+        elif booster == "themed_rare":
+            for card in set(compiled._themed_cards[variant]):
+                rates[card] += p
+
+    return rates
+
+
+class ControlledExpansion(CompiledExpansion):
+    """
+    Compiled expansion keeping track of what's pulled, for the controls of a run.
+
+    Call `reset` before each run, and `controls` after it.
+    """
+
+    def __init__(self, expansion: Expansion):
+        super().__init__(expansion)
+        self._expected = {v: expected_pulls(self, v) for v in expansion.variants}
+        self._first_rates = {v: first_pull_rates(self, v) for v in expansion.variants}
+        self.reset()
+
+    def reset(self):
+        # packs opened of each variant
+        self._packs = Counter()
+
+        # cards pulled of each rarity
+        self._pulled = [0] * len(self.expansion.rarities)
+
+        # card ID -> packs opened of each variant, up to its first pull
+        self._first = {}
+
+    def controls(self) -> list[float]:
+        """
+        For each rarity, the cards pulled less the number expected, then the
+        cards pulled at least once less the sum of their chances of being
+        first pulled in each pack up to then (or the end of the run).
+        """
+        pulls = [float(c) for c in self._pulled]
+        for variant, packs in self._packs.items():
+            for r, e in enumerate(self._expected[variant]):
+                pulls[r] -= packs * e
+
+        first = [0.0] * len(self.expansion.rarities)
+        for card, r in enumerate(self.rarity_of):
+            packs = self._first.get(card)
+            if packs is not None:
+                first[r] += 1
+            for variant, n in (packs or self._packs).items():
+                first[r] -= n * self._first_rates[variant][card]
+
+        return pulls + first
+
+    def open(self, variant, rng=random):
+        return self.open_booster(self.pick_booster(rng), variant, rng)
+
+    def open_booster(self, booster, variant, rng=random):
+        # packs opened either way are tracked
+        pulled = super().open_booster(booster, variant, rng)
+        self._packs[variant] += 1
+        for card in pulled:
+            self._pulled[self.rarity_of[card]] += 1
+            if card not in self._first:
+                self._first[card] = self._packs.copy()
+        return pulled
+
+
+def regression(cov, cross, tolerance=TOLERANCE):
+    """
+    Least squares coefficients from the covariances of the controls, and
+    their covariances with what's being fit.
+
+    Controls with no variance, or which are a combination of earlier ones,
+    are given a coefficient of zero.
+    """
+    k = len(cross)
+    a = [list(row) + [c] for row, c in zip(cov, cross)]
+    used = []
+
+    # Gauss-Jordan elimination, pivoting down the diagonal
+    for j in range(k):
+        if a[j][j] <= tolerance * max(cov[j][j], 1e-300):
+            continue
+        used.append(j)
+
+        pivot = a[j][j]
+        a[j] = [x / pivot for x in a[j]]
+        for i in range(k):
+            if i != j and a[i][j]:
+                factor = a[i][j]
+                a[i] = [x - factor * y for x, y in zip(a[i], a[j])]
+
+    coefficients = [0.0] * k
+    for j in used:
+        coefficients[j] = a[j][k]
+    return coefficients
+
+
+@dataclass(kw_only=True)
+class ControlVariateStatistics:
+    """
+    Packs opened, with sums of the controls of each run (see
+    ControlledExpansion) for the control variate estimate of the average.
+    """
+
+    # histogram of number of packs opened
+    opened_hist: Counter = field(init=False, default_factory=Counter)
+
+    runs: int = field(init=False, default=0)
+
+    # sums of the controls, their products with each other and with packs opened
+    sum_controls: list[float] = field(init=False, default_factory=list)
+    sum_products: list[list[float]] = field(init=False, default_factory=list)
+    sum_cross: list[float] = field(init=False, default_factory=list)
+
+    def add(self, result: Collection, controls: list[float]):
+        if not self.runs:
+            k = len(controls)
+            self.sum_controls = [0.0] * k
+            self.sum_products = [[0.0] * k for _ in range(k)]
+            self.sum_cross = [0.0] * k
+
+        self.runs += 1
+        self.opened_hist.update([result.opened])
+        for i, c in enumerate(controls):
+            self.sum_controls[i] += c
+            self.sum_cross[i] += c * result.opened
+            row = self.sum_products[i]
+            for j, d in enumerate(controls):
+                row[j] += c * d
+
+    def merge(self, other: "ControlVariateStatistics"):
+        if not other.runs:
+            return
+        if not self.runs:
+            self.sum_controls = list(other.sum_controls)
+            self.sum_products = [list(row) for row in other.sum_products]
+            self.sum_cross = list(other.sum_cross)
+        else:
+            for i in range(len(self.sum_controls)):
+                self.sum_controls[i] += other.sum_controls[i]
+                self.sum_cross[i] += other.sum_cross[i]
+                for j in range(len(self.sum_controls)):
+                    self.sum_products[i][j] += other.sum_products[i][j]
+
+        self.runs += other.runs
+        self.opened_hist.update(other.opened_hist)
+
+    def estimate(self):
+        """
+        Control variate average packs opened, its standard error, and the
+        fraction of the variance removed, or Nones with too few runs.
+        """
+        n = self.runs
+        k = len(self.sum_controls)
+        if n < k + 2:
+            return None, None, None
+
+        mean = sum(x * c for x, c in self.opened_hist.items()) / n
+        var = sum(c * (x - mean) ** 2 for x, c in self.opened_hist.items()) / (n - 1)
+        means = [s / n for s in self.sum_controls]
+        cov = [
+            [
+                (self.sum_products[i][j] - n * means[i] * means[j]) / (n - 1)
+                for j in range(k)
+            ]
+            for i in range(k)
+        ]
+        cross = [(self.sum_cross[i] - n * means[i] * mean) / (n - 1) for i in range(k)]
+
+        beta = regression(cov, cross)
+        # the controls have expectation zero, so their average is pure noise
+        adjusted = mean - sum(b * m for b, m in zip(beta, means))
+
+        residual = max(var - sum(b * c for b, c in zip(beta, cross)), 0.0)
+        used = sum(1 for b in beta if b)
+        error = (residual * (n - 1) / (n - used - 1) / n) ** 0.5
+        removed = 1 - residual / var if var else 0.0
+        return adjusted, error, removed
+
+    def summary(self):
+        adjusted, error, removed = self.estimate()
+        return {
+            "average_opened": {
+                "value": avg(self.opened_hist),
+                "description": "Average packs opened",
+            },
+            "adjusted_average_opened": {
+                "value": adjusted,
+                "description": "Average packs opened, with control variates",
+            },
+            "adjusted_stderr": {
+                "value": error,
+                "description": "Standard error of the adjusted average",
+            },
+            "variance_removed": {
+                "value": removed,
+                "description": "Fraction of the variance removed by the controls",
+            },
+        }
@@ -0,0 +1,462 @@
+"""
+Exact packs-to-complete distributions, instead of simulating.
+
+`solve` handles collections without buying cards, and `solve_mission` small
+missions with buying.
+
+Without buying, completing a rarity is a coupon collector problem: packs are
+independent, so the chance of still missing every card in a set S after n
+packs is a product over packs, and inclusion-exclusion over S gives the chance
+of having every card
+
+    P(T <= n) = sum_S (-1)^|S| prod_packs P(pack has no card in S)
+
+Cards with the same pull probabilities in every slot of every booster are
+interchangeable, so S only matters through how many of each such class of
+cards it holds. Classes only pulled in one variant's packs are summed
+separately per variant, which keeps the number of terms small.
+
+`solve` only handles expansions with one variant: the simulation drops
+completed variants from the rotation, which depends on every rarity at once.
+It only gives the distribution for each rarity. Rarities compete for the same
+slots, so completing them isn't independent, and summing over every missing
+card at once has far too many terms, so there's no exact overall distribution.
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import product
+from math import comb
+
+import numpy as np
+
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.expansion import ANY, Expansion, capped_weights
+from pokemon_tcg_simulate.simulation import (
+    BUY_STRATEGIES,
+    MAX_PACK_POINTS,
+    VariantIterator,
+)
+
+# stop once the chance of not having completed is below this
+TAIL = 1e-12
+
+# packs computed at a time
+CHUNK_SIZE = 4096
+
+# give up on anything taking longer than this
+MAX_PACKS = 10_000_000
+
+# terms with an inclusion-exclusion sum larger than this (in absolute terms)
+# have lost too much precision to float cancellation, and are treated as 0,
+# i.e. far too early to have completed
+MAX_CONDITION = 1e8
+
+# limit on the number of inclusion-exclusion terms per variant
+MAX_TERMS = 2_000_000
+
+
+@dataclass(kw_only=True)
+class ExactResult:
+    # cdf[n] = probability of having completed each rarity within n packs,
+    # all the same length
+    rarity_cdf: dict[str, np.ndarray]
+
+    def summary(self):
+        return {
+            "average_opened_by_rarity": {
+                "value": {
+                    rarity: expected(cdf) for rarity, cdf in self.rarity_cdf.items()
+                },
+                "description": "Average opened by rarity",
+            },
+        }
+
+    def dump_cdfs(self, file=None):
+        print(",".join(["opened", *self.rarity_cdf]), file=file)
+        size = max((len(cdf) for cdf in self.rarity_cdf.values()), default=0)
+        for i in range(size):
+            print(
+                ",".join(
+                    [str(i), *(f"{cdf[i]:.6g}" for cdf in self.rarity_cdf.values())]
+                ),
+                file=file,
+            )
+
+
+def expected(cdf: np.ndarray | None):
+    if cdf is None:
+        return None
+    return float((1 - cdf).sum())
+
+
+def pack_models(expansion: Expansion):
+    """
+    Per variant, a list of (probability, draws) for each booster type, where
+    draws[d, c] is the chance of draw d in the pack being card ID c.
+    """
+    compiled = expansion.compiled
+    size = len(compiled.cards)
+    rates = capped_weights(expansion.booster_rates.values())
+    total = sum(rates)
+
+    def regular(variant, cards):
+        draws = np.zeros((cards, size))
+        for pos in range(cards):
+            weights = compiled.slot_weights(pos, variant)
+            draws[pos] = weights
+            draws[pos] /= draws[pos].sum()
+        return draws
+
+    def rare(variant):
+        pool = compiled._rare_cards[variant]
+        draw = np.bincount(pool, minlength=size) / len(pool)
+        return np.tile(draw, (5, 1))
+
+    def themed_rare(variant):
+        cards = compiled._themed_cards[variant]
+        draws = np.zeros((len(cards), size))
+        draws[np.arange(len(cards)), cards] = 1
+        return draws
+
+    models = {}
+    for variant in expansion.variants:
+        boosters = {
+            "regular": lambda: regular(variant, expansion.cards_per_pack),
+            "rare": lambda: rare(variant),
+            "plus_one": lambda: regular(variant, expansion.cards_per_pack + 1),
+            "themed_rare": lambda: themed_rare(variant),
+        }
+        models[variant] = [
+            (rate / total, boosters[booster]())
+            for booster, rate in zip(expansion.booster_rates, rates)
+            if rate
+        ]
+    return models
+
+
+def _terms(sizes):
+    # every (k_1, ..., k_j) with 0 <= k_i <= sizes[i], and its signed weight
+    if np.prod([s + 1 for s in sizes], dtype=float) > MAX_TERMS:
+        raise ValueError("Too many cards to solve exactly")
+
+    terms = list(product(*(range(s + 1) for s in sizes)))
+    ks = np.array(terms, dtype=float).reshape(len(terms), len(sizes))
+    weights = np.ones(len(ks))
+    for i, s in enumerate(sizes):
+        k = ks[:, i].astype(int)
+        weights *= np.array([float(comb(s, x)) for x in range(s + 1)])[k] * (-1.0) ** k
+    return ks, weights
+
+
+def _rotation_counts(n: np.ndarray, variants: int):
+    # packs of each variant in the first n packs of the rotation
+    return [(n - i + variants - 1) // variants for i in range(variants)]
+
+
+def completion_cdf(models, cards: list[int], variants: list[str]):
+    """
+    cdf[n] of having pulled every card in `cards` within n packs,
+    opening `variants` in rotation.
+    """
+    if not cards:
+        return np.ones(1)
+
+    # per-card probabilities of every draw of every booster of every variant,
+    # noting which columns belong to which (variant, booster)
+    columns, spans = [], []
+    offset = 0
+    for i, v in enumerate(variants):
+        for rate, draws in models[v]:
+            columns.append(draws[:, cards])
+            spans.append((i, rate, slice(offset, offset + len(draws))))
+            offset += len(draws)
+
+    signatures = np.concatenate(columns).T
+    classes, inverse = np.unique(signatures, axis=0, return_inverse=True)
+    sizes = np.bincount(inverse.ravel(), minlength=len(classes))
+
+    # which variants' packs can pull each class
+    used = np.zeros((len(variants), len(classes)), dtype=bool)
+    for i, _, span in spans:
+        used[i] |= classes[:, span].any(axis=1)
+
+    if not used.any(axis=0).all():
+        raise ValueError("Some cards can never be pulled")
+
+    shared = np.flatnonzero(used.sum(axis=0) > 1)
+    shared_ks, shared_weights = _terms(sizes[shared])
+
+    # per variant, probability of a pack missing every card picked by the terms
+    misses = []
+    for i in range(len(variants)):
+        private = np.flatnonzero(used[i] & (used.sum(axis=0) == 1))
+        private_ks, private_weights = _terms(sizes[private])
+
+        miss = 0
+        for _, rate, span in (x for x in spans if x[0] == i):
+            draws = classes[:, span]
+            hit = (shared_ks @ draws[shared])[:, None, :] + (
+                private_ks @ draws[private]
+            )[None, :, :]
+            miss = miss + rate * np.clip(1 - hit, 0, 1).prod(axis=2)
+        misses.append((miss, private_weights))
+
+    cdf = []
+    start = 0
+    while start < MAX_PACKS:
+        n = np.arange(start, start + CHUNK_SIZE)
+        counts = _rotation_counts(n, len(variants))
+
+        total = shared_weights[:, None]
+        condition = np.abs(shared_weights)[:, None]
+        for (miss, weights), m in zip(misses, counts):
+            powers = miss[:, :, None] ** m[None, None, :]
+            total = total * np.einsum("j,ijn->in", weights, powers)
+            condition = condition * np.einsum("j,ijn->in", np.abs(weights), powers)
+
+        chunk = total.sum(axis=0)
+        chunk[condition.sum(axis=0) > MAX_CONDITION] = 0
+        cdf.append(np.clip(chunk, 0, 1))
+
+        if 1 - chunk[-1] < TAIL:
+            break
+        start += CHUNK_SIZE
+    else:
+        raise ValueError("Not expected to complete within the max number of packs")
+
+    cdf = np.maximum.accumulate(np.concatenate(cdf))
+    last = np.searchsorted(cdf, 1 - TAIL)
+    return cdf[: last + 1]
+
+
+def solve(
+    expansion: Expansion,
+    *,
+    mission: dict | None = None,
+    initial_state: dict | None = None,
+):
+    """
+    Exact distribution of packs opened to complete each rarity of a collection
+    without buying, for expansions with one variant.
+    """
+    if len([v for v in expansion.variants if v != ANY]) > 1:
+        raise ValueError(
+            "Exact solver without buying doesn't support expansions with"
+            " variants, as completed variants are dropped from the rotation"
+        )
+
+    collection = Collection.from_json(expansion, mission=mission)
+    if initial_state:
+        collection.load_initial_state(initial_state)
+
+    compiled = expansion.compiled
+    models = pack_models(expansion)
+
+    variants = [v for v in expansion.variants if v != ANY] or [ANY]
+
+    rarity_cdf = {}
+    for name, collected in collection.collected.items():
+        missing = Counter(collected.iter_missing())
+        if any(need > 1 for need in missing.values()):
+            raise ValueError("Exact solver only supports needing one copy of a card")
+
+        cards = [compiled.offsets[name, v] + i for v, i in missing]
+        rarity_cdf[name] = completion_cdf(models, cards, variants)
+
+    # completed by the end of the longest cdf
+    size = max((len(cdf) for cdf in rarity_cdf.values()), default=1)
+
+    def pad(cdf):
+        return np.pad(cdf, (0, size - len(cdf)), constant_values=1)
+
+    return ExactResult(rarity_cdf={name: pad(cdf) for name, cdf in rarity_cdf.items()})
+
+
+# --- Missions with buying ---
+
+# limit on the number of (cards still needed) combinations for solve_mission
+MAX_NEEDED_STATES = 100_000
+
+
+@dataclass(kw_only=True)
+class MissionResult:
+    # pmf[n] = probability of completing after exactly n packs
+    opened: np.ndarray
+
+    # pmf[n] = probability of buying exactly n cards of each rarity
+    bought: dict[str, np.ndarray]
+
+    def summary(self):
+        return {
+            "average_opened": {
+                "value": float(np.arange(len(self.opened)) @ self.opened),
+                "description": "Average packs opened",
+            },
+            "opened_percentiles": {
+                "value": {
+                    p: int(np.searchsorted(np.cumsum(self.opened), p / 100 - TAIL))
+                    for p in (50, 75, 90, 95)
+                },
+                "description": "Packs opened percentiles",
+            },
+            "average_bought_by_rarity": {
+                "value": {
+                    rarity: float(np.arange(len(pmf)) @ pmf)
+                    for rarity, pmf in self.bought.items()
+                },
+                "description": "Average bought by rarity",
+            },
+        }
+
+    def dump_cdfs(self, file=None):
+        print("opened,ALL", file=file)
+        for i, p in enumerate(np.cumsum(self.opened)):
+            print(f"{i},{p:.6g}", file=file)
+
+
+def _pack_outcomes(models, variant, cards, caps):
+    # probability of pulling each combination of copies of the cards in a pack,
+    # counting at most caps[i] copies of each
+    outcomes = defaultdict(float)
+    for rate, draws in models[variant]:
+        hits = draws[:, cards]
+        dist = {(0,) * len(cards): rate}
+        for draw in hits:
+            miss = 1 - draw.sum()
+            nxt = defaultdict(float)
+            for outcome, p in dist.items():
+                if miss > 0:
+                    nxt[outcome] += p * miss
+                for i in np.flatnonzero(draw):
+                    pulled = list(outcome)
+                    pulled[i] = min(pulled[i] + 1, caps[i])
+                    nxt[tuple(pulled)] += p * draw[i]
+            dist = nxt
+        for outcome, p in dist.items():
+            outcomes[outcome] += p
+    return list(outcomes.items())
+
+
+def solve_mission(
+    expansion: Expansion,
+    mission: dict,
+    *,
+    initial_state: dict | None = None,
+    buy_strategy: str = "rarest",
+):
+    """
+    Exact distribution of packs opened and cards bought to complete a mission,
+    following the buy rules of `simulation.simulate`.
+
+    The chain is over the copies still needed of each card, pack points,
+    the variant rotation and the cards bought so far, so is only practical
+    for missions with a handful of cards.
+    """
+    collection = Collection.from_json(expansion, mission=mission)
+    pack_points = 0
+    if initial_state:
+        collection.load_initial_state(initial_state)
+        pack_points = collection.pack_points
+
+    compiled = expansion.compiled
+    rarities = list(collection.collected)
+
+    # cards still needed, in the order they'd be bought
+    cards, keys, needs, rarity_of = [], [], [], []
+    for r, (name, collected) in enumerate(collection.collected.items()):
+        for (variant, i), need in Counter(collected.iter_missing()).items():
+            cards.append(compiled.offsets[name, variant] + i)
+            keys.append(variant)
+            needs.append(need)
+            rarity_of.append(r)
+
+    if np.prod([n + 1 for n in needs], dtype=float) > MAX_NEEDED_STATES:
+        raise ValueError("Mission too large to solve exactly")
+
+    costs = [collection.collected[name].rarity.cost for name in rarities]
+    models = pack_models(expansion)
+
+    variants = VariantIterator(expansion.variants).variants
+    outcomes = {v: _pack_outcomes(models, v, cards, needs) for v in variants}
+
+    # rarities in the order cards are bought at the pack point cap
+    strategy = BUY_STRATEGIES[buy_strategy]
+    buy_order = {
+        v: [
+            rarities.index(name)
+            for name, _ in sorted(collection.collected.items(), key=strategy(v))
+        ]
+        for v in variants
+    }
+
+    def buy(needed, points, bought, variant):
+        needed, bought = list(needed), list(bought)
+
+        required = sum(costs[rarity_of[i]] * n for i, n in enumerate(needed))
+        if required <= points:
+            points -= required
+            for i, n in enumerate(needed):
+                bought[rarity_of[i]] += n
+                needed[i] = 0
+
+        if points == MAX_PACK_POINTS and any(needed):
+            r = next(
+                r
+                for r in buy_order[variant]
+                if any(n for i, n in enumerate(needed) if rarity_of[i] == r)
+            )
+            i = next(i for i, n in enumerate(needed) if n and rarity_of[i] == r)
+            needed[i] -= 1
+            points -= costs[r]
+            bought[r] += 1
+
+        return tuple(needed), points, tuple(bought)
+
+    opened = [0.0]
+    bought_pmf = [defaultdict(float) for _ in rarities]
+
+    states = {(tuple(needs), pack_points, tuple(variants), (0,) * len(rarities)): 1.0}
+    while states:
+        if len(opened) > MAX_PACKS:
+            raise ValueError("Not expected to complete within the max number of packs")
+
+        opened.append(0.0)
+        nxt = defaultdict(float)
+        for (needed, points, rotation, bought), p in states.items():
+            variant = rotation[0]
+            rotation = rotation[1:] + rotation[:1]
+
+            for pulled, q in outcomes[variant]:
+                state = buy(
+                    tuple(max(n - x, 0) for n, x in zip(needed, pulled)),
+                    points + 5,
+                    bought,
+                    variant,
+                )
+                if not any(state[0]):
+                    opened[-1] += p * q
+                    for r, b in enumerate(state[2]):
+                        bought_pmf[r][b] += p * q
+                    continue
+
+                remaining = rotation
+                if not any(
+                    n for n, key in zip(state[0], keys) if key in (ANY, variant)
+                ):
+                    remaining = tuple(v for v in rotation if v != variant)
+
+                nxt[state[0], state[1], remaining, state[2]] += p * q
+
+        # drop states that will practically never happen
+        states = {s: p for s, p in nxt.items() if p > TAIL * 1e-3}
+        if sum(states.values()) < TAIL:
+            break
+
+    return MissionResult(
+        opened=np.array(opened),
+        bought={
+            name: np.array([pmf[b] for b in range(max(pmf) + 1)])
+            for name, pmf in zip(rarities, bought_pmf)
+        },
+    )
@@ -1,5 +1,6 @@
 import random
 from dataclasses import dataclass, field
+from functools import cached_property
 from itertools import accumulate, chain
 
 ANY = "_any_"
@@ -18,6 +19,51 @@ DEFAULT_BOOSTER_RATE = {
 }
 
 
+class AliasTable:
+    """
+    Walker/Vose alias table, for sampling a discrete distribution in constant time.
+    """
+
+    __slots__ = ("prob", "alias", "size")
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("Weights must add up to more than zero")
+
+        scaled = [w * self.size / total for w in weights]
+        self.prob = [1.0] * self.size
+        self.alias = list(range(self.size))
+
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] += scaled[s] - 1
+            (small if scaled[g] < 1 else large).append(g)
+
+    def sample(self, rng=random):
+        u = rng.random() * self.size
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+
+def capped_weights(rates, cap=100):
+    """
+    Weights for picking from percentage rates.
+
+    Rates past the cap can never be picked, and if the rates add up to less
+    than the cap (e.g. rounding) the rest are scaled up to fill the gap.
+    """
+    weights = []
+    for p, total in zip(rates, accumulate(rates)):
+        weights.append(max(0, min(p, cap - total + p)))
+    return weights
+
+
 @dataclass
 class Rarity:
     # name of rarity type
@@ -70,7 +116,9 @@ class Rarity:
             if isinstance(self.offering_rate, float):
                 self.offering_rate = (0,) * 5 + (self.offering_rate,)
         elif len(self.offering_rate) < MAX_CARDS_PER_PACK:
-            self.offering_rate += (0,) * (MAX_CARDS_PER_PACK - len(self.offering_rate))
+            # a new tuple, so json data passed in isn't changed
+            padding = (0,) * (MAX_CARDS_PER_PACK - len(self.offering_rate))
+            self.offering_rate = (*self.offering_rate, *padding)
 
     def iter_rare_cards(self, variant):
         if not self.rare:
@@ -91,8 +139,8 @@ class Rarity:
 
         return sum(self.counts.values())
 
-    def pick(self, variant):
-        p = random.randint(0, self.count(variant) - 1)
+    def pick(self, variant, rng=random):
+        p = rng.randint(0, self.count(variant) - 1)
         if p >= self._any_count:
             return (variant, p - self._any_count)
         return (ANY, p)
@@ -113,6 +161,21 @@ class Expansion:
             for p in range(MAX_CARDS_PER_PACK)
         ]
 
+        # constant time sampling of rarity by position
+        self._slot_tables = [
+            (
+                AliasTable(capped_weights([x.offering_rate[p] for x in self.rarities]))
+                if any(x.offering_rate[p] for x in self.rarities)
+                else None
+            )
+            for p in range(MAX_CARDS_PER_PACK)
+        ]
+
+        if not any(self.booster_rates.values()):
+            raise ValueError("Check your booster probabilities")
+        self._boosters = list(self.booster_rates)
+        self._booster_table = AliasTable(capped_weights(self.booster_rates.values()))
+
         self._rare_cards = {
             v: tuple(
                 chain.from_iterable(
@@ -136,57 +199,163 @@ class Expansion:
         }
         return Expansion(**kwargs)
 
-    def pick_booster(self):
-        r = 100 * random.random()
-
-        p = 0
-        for booster, prob in self.booster_rates.items():
-            p += prob
-            if r <= p:
-                return booster
-
-        if p == 0:
-            raise Exception("Infinite loop! Check your booster probabilities")
-
-        # shouldn't happen (rounding error?)
-        return self.pick_booster()
-
-    def open_rare(self, variant):
-        return random.choices(self._rare_cards[variant], k=5)
+    def pick_booster(self, rng=random):
+        return self._boosters[self._booster_table.sample(rng)]
 
-    def _pick(self, pos, variant):
-        r = 100 * random.random()
+    def open_rare(self, variant, rng=random):
+        return rng.choices(self._rare_cards[variant], k=5)
 
-        for i, p in enumerate(self._cum_prob[pos]):
-            if r <= p:
-                rarity = self.rarities[i]
-                break
-        else:
-            # due to rounding, sometimes probabilities don't add to 100
-            # if we fail to pick, retry
-            return self._pick(pos, variant)
+    def _pick(self, pos, variant, rng):
+        rarity = self.rarities[self._slot_tables[pos].sample(rng)]
+        return rarity.name, rarity.pick(variant, rng)
 
-        return rarity.name, rarity.pick(variant)
+    def open_regular(self, variant, rng=random):
+        return [self._pick(i, variant, rng) for i in range(self.cards_per_pack)]
 
-    def open_regular(self, variant):
-        return [self._pick(i, variant) for i in range(self.cards_per_pack)]
+    def open_regular_plus_one(self, variant, rng=random):
+        return [self._pick(i, variant, rng) for i in range(self.cards_per_pack + 1)]
 
-    def open_regular_plus_one(self, variant):
-        return [self._pick(i, variant) for i in range(self.cards_per_pack + 1)]
-
-    def open_themed_rare(self, variant):
+    def open_themed_rare(self, variant, rng=random):
         # assuming only one rarity appears in themed rare
         rarity = next(r for r in self.rarities if r.themed_rare)
         return [(rarity.name, (variant, i)) for i in range(rarity.count(variant))]
-    
-    def open(self, variant):
-        booster = self.pick_booster()
+
+    def open(self, variant, rng=random):
+        """
+        Open a pack of a variant, drawing from `rng` (by default, the random module).
+        """
+        booster = self.pick_booster(rng)
         return {
             "regular": self.open_regular,
             "rare": self.open_rare,
             "plus_one": self.open_regular_plus_one,
             "themed_rare": self.open_themed_rare,
-        }[booster](variant)
+        }[booster](variant, rng)
+
+    @cached_property
+    def compiled(self):
+        return CompiledExpansion(self)
+
+
+class CompiledExpansion:
+    """
+    Expansion with every card given a dense integer ID.
+
+    IDs run through the rarities in order, then each variant in `counts` order,
+    then the card index. Opening a pack gives a list of IDs.
+    """
+
+    def __init__(self, expansion: Expansion):
+        self.expansion = expansion
+
+        # ID -> (rarity, (variant, index))
+        self.cards = []
+
+        # (rarity, variant) -> ID of first card
+        self.offsets = {}
+
+        # ID -> index of rarity in expansion.rarities
+        self.rarity_of = []
+
+        for i, rarity in enumerate(expansion.rarities):
+            for variant, count in rarity.counts.items():
+                self.offsets[rarity.name, variant] = len(self.cards)
+                self.cards.extend((rarity.name, (variant, c)) for c in range(count))
+                self.rarity_of.extend(i for _ in range(count))
+
+        # per variant, alias table over card IDs for each position
+        self._slot_tables = {
+            v: [self._slot_table(p, v) for p in range(MAX_CARDS_PER_PACK)]
+            for v in expansion.variants
+        }
+
+        self._rare_cards = {
+            v: [self.card_id(name, card) for name, card in cards]
+            for v, cards in expansion._rare_cards.items()
+        }
+
+        themed = next((r for r in expansion.rarities if r.themed_rare), None)
+        self._themed_cards = {
+            v: [self.card_id(themed.name, (v, i)) for i in range(themed.count(v))]
+            for v in expansion.variants
+            if themed is not None
+        }
+
+        self._boosters = [
+            {
+                "regular": self.open_regular,
+                "rare": self.open_rare,
+                "plus_one": self.open_regular_plus_one,
+                "themed_rare": self.open_themed_rare,
+            }[booster]
+            for booster in expansion.booster_rates
+        ]
+
+    def _slot_table(self, pos, variant):
+        weights = self.slot_weights(pos, variant)
+        return weights and AliasTable(weights)
+
+    def slot_weights(self, pos, variant):
+        """
+        Weight of pulling each card ID at a position in a pack of a variant,
+        or None if nothing can be pulled there.
+        """
+        rates = capped_weights([r.offering_rate[pos] for r in self.expansion.rarities])
+        if not any(rates):
+            return None
+
+        weights = [0.0] * len(self.cards)
+        for rarity, rate in zip(self.expansion.rarities, rates):
+            if not rate:
+                continue
+
+            count = rarity.count(variant)
+            if count == 0:
+                raise ValueError(f"No {rarity.name} cards to pick for {variant}")
+
+            for key in {ANY, variant}:
+                start = self.offsets.get((rarity.name, key))
+                if start is not None:
+                    for c in range(rarity.counts[key]):
+                        weights[start + c] = rate / count
+
+        return weights
+
+    def card_id(self, rarity_name: str, card: tuple[str, int]) -> int:
+        variant, index = card
+        if (rarity_name, variant) not in self.offsets:
+            rarity = next(r for r in self.expansion.rarities if r.name == rarity_name)
+            if list(rarity.counts) == [ANY]:
+                # crown cards are variant locked in rare boosters only,
+                # cf. RarityCollection.add
+                index = list(rarity.rare_counts).index(variant)
+                variant = ANY
+
+        return self.offsets[rarity_name, variant] + index
+
+    def open_regular(self, variant, rng=random):
+        tables = self._slot_tables[variant]
+        return [tables[i].sample(rng) for i in range(self.expansion.cards_per_pack)]
+
+    def open_regular_plus_one(self, variant, rng=random):
+        tables = self._slot_tables[variant]
+        return [tables[i].sample(rng) for i in range(self.expansion.cards_per_pack + 1)]
+
+    def open_rare(self, variant, rng=random):
+        return rng.choices(self._rare_cards[variant], k=5)
+
+    def open_themed_rare(self, variant, rng=random):
+        return list(self._themed_cards[variant])
+
+    def pick_booster(self, rng=random):
+        # index into expansion.booster_rates
+        return self.expansion._booster_table.sample(rng)
+
+    def open_booster(self, booster, variant, rng=random):
+        return self._boosters[booster](variant, rng)
+
+    def open(self, variant, rng=random):
+        return self._boosters[self.pick_booster(rng)](variant, rng)
 
 
 def create_common_mission(expansion: Expansion):
@@ -0,0 +1,137 @@
+"""
+Importance sampling, for the tail of the packs opened distribution.
+
+The unlucky runs are the ones where the rarest cards don't turn up, so plain
+simulation needs a huge number of runs to see enough of them. A tilted
+expansion draws the tail cards it hasn't drawn yet (and rare boosters, while
+there are any) at `tilt` times their rate, so with a tilt below one unlucky
+runs become common. Each run is then weighted by the likelihood ratio of its
+draws, the probability under the real rates over the probability under the
+tilted ones, which makes weighted estimates unbiased.
+
+Only cards not yet drawn are tilted, as duplicates don't change the outcome,
+so the weight of a run depends on a few first pulls rather than compounding
+over every pack.
+"""
+
+import math
+import random
+
+from pokemon_tcg_simulate.expansion import CompiledExpansion, Expansion, capped_weights
+
+# boosters tilted along with the tail cards
+RARE_BOOSTERS = ("rare", "themed_rare")
+
+
+def tail_rarities(expansion: Expansion) -> set[str]:
+    """
+    The most expensive rare rarities, e.g. crowns.
+
+    With buying, these drive the tail: each one missing costs a full load of
+    pack points. Tilting cheaper ones too adds more to the spread of weights
+    than it does to the tail.
+    """
+    rare = [r for r in expansion.rarities if r.rare]
+    cost = max((r.cost for r in rare), default=None)
+    return {r.name for r in rare if r.cost == cost}
+
+
+class TiltedExpansion(CompiledExpansion):
+    """
+    Compiled expansion drawing the tail cards it hasn't drawn yet, of the
+    tail rarities (by default from tail_rarities), at `tilt` times their rate,
+    adding the log likelihood ratio of every draw to `log_weight`.
+
+    Tilted draws are made by redrawing with probability 1 - tilt, so with a
+    tilt of one this opens exactly the same packs as CompiledExpansion.
+    Call `reset` before each run, and `likelihood_ratio` after it.
+    """
+
+    def __init__(self, expansion: Expansion, tilt: float, rarities=None):
+        if not 0 < tilt <= 1:
+            raise ValueError("The tilt must be more than zero and at most one")
+        super().__init__(expansion)
+
+        self.tilt = tilt
+        self.rarities = tail_rarities(expansion) if rarities is None else rarities
+        self.log_weight = 0.0
+
+        tail = [r.name in self.rarities for r in expansion.rarities]
+        self._tail = {c for c, r in enumerate(self.rarity_of) if tail[r]}
+        self._missing = set(self._tail)
+
+        # variant -> per position, probability of each tail card
+        self._tail_rates = {}
+        for v in expansion.variants:
+            self._tail_rates[v] = []
+            for p in range(len(self._slot_tables[v])):
+                weights = self.slot_weights(p, v)
+                rates = {}
+                if weights:
+                    total = sum(weights)
+                    rates = {c: weights[c] / total for c in self._tail if weights[c]}
+                self._tail_rates[v].append(rates)
+
+        rates = capped_weights(expansion.booster_rates.values())
+        rare = [i for i, b in enumerate(expansion.booster_rates) if b in RARE_BOOSTERS]
+        self._rare_boosters = set(rare)
+        self._rare_booster_rate = sum(rates[i] for i in rare) / sum(rates)
+
+    def reset(self):
+        self.log_weight = 0.0
+        self._missing = set(self._tail)
+
+    def likelihood_ratio(self) -> float:
+        return math.exp(self.log_weight)
+
+    def _tilted(self, table, tilted, rate, rng):
+        # draw from the table, with `tilted` items at tilt times their `rate`
+        tilt = self.tilt
+        while True:
+            item = table.sample(rng)
+            if item not in tilted or tilt == 1 or rng.random() < tilt:
+                break
+
+        # p / q = (1 - (1 - tilt) * rate) / (tilt if tilted else 1)
+        self.log_weight += math.log(1 - (1 - tilt) * rate)
+        if item in tilted:
+            self.log_weight -= math.log(tilt)
+        return item
+
+    def _open_slots(self, variant, size, rng):
+        tables = self._slot_tables[variant]
+        rates = self._tail_rates[variant]
+        missing = self._missing
+
+        pulled = []
+        for i in range(size):
+            if missing and rates[i]:
+                rate = sum(rates[i].get(c, 0) for c in missing)
+                card = self._tilted(tables[i], missing, rate, rng)
+                missing.discard(card)
+            else:
+                card = tables[i].sample(rng)
+            pulled.append(card)
+        return pulled
+
+    def open_regular(self, variant, rng=random):
+        return self._open_slots(variant, self.expansion.cards_per_pack, rng)
+
+    def open_regular_plus_one(self, variant, rng=random):
+        return self._open_slots(variant, self.expansion.cards_per_pack + 1, rng)
+
+    def open_rare(self, variant, rng=random):
+        pulled = super().open_rare(variant, rng)
+        self._missing.difference_update(pulled)
+        return pulled
+
+    def open_themed_rare(self, variant, rng=random):
+        pulled = super().open_themed_rare(variant, rng)
+        self._missing.difference_update(pulled)
+        return pulled
+
+    def pick_booster(self, rng=random):
+        table = self.expansion._booster_table
+        if not self._missing:
+            return table.sample(rng)
+        return self._tilted(table, self._rare_boosters, self._rare_booster_rate, rng)
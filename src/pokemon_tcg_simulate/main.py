@@ -1,22 +1,78 @@
+import importlib.util
 import json
+import random
+import signal
+import sys
 import time
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
 
-from pokemon_tcg_simulate.collection import Collection
-from pokemon_tcg_simulate.expansion import Expansion, create_common_mission
+from pokemon_tcg_simulate.cache import DEFAULT_MAX_BYTES, ResultCache
+from pokemon_tcg_simulate.cache import cache_key as make_cache_key
+from pokemon_tcg_simulate.checkpoint import (
+    CHUNK_RUNS,
+    DEFAULT_INTERVAL,
+    Checkpoint,
+    checkpointed,
+)
 from pokemon_tcg_simulate.output import (
-    BoughtStatistics,
-    CardStatistics,
-    OpenedStatistics,
-    report_opened_histograms,
+    PairedStatistics,
     format_markdown,
+    histogram_format,
+    report_opened_histograms,
+    report_progress,
 )
-from pokemon_tcg_simulate.simulation import simulate
+from pokemon_tcg_simulate.profiling import ProfileStatistics
+from pokemon_tcg_simulate.registry import DEFAULT_DIRECTORY, load_expansion, load_rules
+from pokemon_tcg_simulate.rng import BACKENDS
+from pokemon_tcg_simulate.simulation import BUY_STRATEGIES
+from pokemon_tcg_simulate.targets import create_targets, load_missions, run_targets
+from pokemon_tcg_simulate.trace import Trace, TraceWriter, replay
+from pokemon_tcg_simulate.runner import (
+    Z_95,
+    create_pool,
+    create_statistics,
+    precision,
+    run,
+    run_paired,
+    run_parallel,
+    run_until,
+)
+
+
+def pack_counts(value: str) -> tuple[int, ...]:
+    # comma separated counts, or start:stop:step ranges including the stop
+    counts = []
+    try:
+        for part in value.split(","):
+            start, _, rest = part.partition(":")
+            if not rest:
+                counts.append(int(start))
+                continue
+            stop, _, step = rest.partition(":")
+            counts.extend(range(int(start), int(stop) + 1, int(step or 1)))
+    except ValueError:
+        raise ArgumentTypeError(f"invalid pack counts: {value}")
+    if not counts or min(counts) < 1:
+        raise ArgumentTypeError("pack counts must be at least 1")
+    return tuple(sorted(set(counts)))
 
 
 def main():
     parser = ArgumentParser()
-    parser.add_argument("expansion_json", help="path to an expansion data json")
+    parser.add_argument(
+        "expansion_json",
+        help="path to an expansion data json, or the name of an expansion"
+        " in --expansions-dir",
+    )
+    parser.add_argument(
+        "--expansions-dir",
+        default=DEFAULT_DIRECTORY,
+        help="directory to look up expansions by name in",
+    )
+    parser.add_argument(
+        "--compiled-cache",
+        help="directory to cache compiled expansions in, for faster startup",
+    )
     parser.add_argument("-i", "--initial-state", help="path to initial state json")
 
     mission_group = parser.add_mutually_exclusive_group()
@@ -27,98 +83,692 @@ def main():
         action="store_true",
         help="stop simulation when all common are collected",
     )
+    mission_group.add_argument(
+        "--targets",
+        nargs="+",
+        metavar="PATH",
+        help="simulate every mission for the expansion in these jsons or directories,"
+        " plus the full set and all common cards, on the same packs",
+    )
 
     parser.add_argument(
         "-r", "--runs", default=100, type=int, help="number of simulations to run"
     )
     parser.add_argument("--max-opened", type=int, help="max packs to open")
+    parser.add_argument(
+        "--progress-at",
+        type=pack_counts,
+        metavar="COUNTS",
+        help="snapshot the cards collected at each of these packs opened, as"
+        " 10,20,50 or start:stop:step, for the curve of collection progress",
+    )
+
+    target_group = parser.add_mutually_exclusive_group()
+    target_group.add_argument(
+        "--target-stderr",
+        type=float,
+        help="keep running until the standard error of the average packs opened"
+        " is below this (--runs is the first round)",
+    )
+    target_group.add_argument(
+        "--target-ci",
+        type=float,
+        help="as --target-stderr, for the half width of the 95%% confidence interval",
+    )
+    parser.add_argument(
+        "--target-percentiles",
+        nargs="+",
+        type=float,
+        default=[],
+        help="percentiles of packs opened which must also reach the target",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="stop starting new rounds of runs after this many seconds",
+    )
     parser.add_argument(
         "--no-buy", action="store_false", dest="buy", help="do not buy cards"
     )
+    parser.add_argument(
+        "--buy-strategy",
+        choices=BUY_STRATEGIES,
+        default="rarest",
+        help="which card to buy when at the pack point cap",
+    )
+    parser.add_argument(
+        "--compare-strategies",
+        nargs="+",
+        choices=BUY_STRATEGIES,
+        metavar="STRATEGY",
+        help="simulate each run with each buy strategy on the same packs, and"
+        " report the differences from the first",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["serial", "batch"],
+        default="serial",
+        help="simulate runs one at a time, or in numpy batches",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="seed for reproducible runs, each drawing from its own stream",
+    )
+    parser.add_argument(
+        "--rng",
+        choices=BACKENDS,
+        default="random",
+        help="generator for seeded runs, stdlib Mersenne Twister or numpy PCG64",
+    )
+    parser.add_argument(
+        "--importance-tilt",
+        type=float,
+        help="importance sample the unlucky tail, drawing crowns not yet pulled"
+        " at this fraction of their rate and weighting runs to compensate"
+        " (e.g. 0.3)",
+    )
+    parser.add_argument(
+        "--control-variates",
+        action="store_true",
+        help="also report the average packs opened adjusted by control variates,"
+        " which is more precise for the same runs",
+    )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="solve exactly instead of simulating: with --no-buy, packs opened to"
+        " complete each rarity of a set with one variant, or with buying, packs"
+        " opened for a small mission",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="number of runs advanced together by the batch engine",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=1,
+        type=int,
+        help="number of worker processes to split runs across",
+    )
+    parser.add_argument(
+        "--checkpoint", help="path to periodically save progress to, and on SIGINT"
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        default=DEFAULT_INTERVAL,
+        type=float,
+        help="seconds between checkpoints",
+    )
+    resume_group = parser.add_mutually_exclusive_group()
+    resume_group.add_argument(
+        "--resume",
+        help="carry on from a checkpoint until there are --runs runs in total",
+    )
+    resume_group.add_argument(
+        "--extend", help="add --runs more runs to the results in a checkpoint"
+    )
+    parser.add_argument(
+        "--cache",
+        help="directory to cache results in, reusing or topping up earlier runs"
+        " with the same inputs",
+    )
+    parser.add_argument(
+        "--cache-size",
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        type=int,
+        help="max size of the cache in MB, evicting the least recently used",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report time spent in each phase of the simulation, and event counts",
+    )
+    trace_group = parser.add_mutually_exclusive_group()
+    trace_group.add_argument(
+        "--record-trace",
+        metavar="PATH",
+        help="write every pack pulled to a binary trace file, for --replay-trace",
+    )
+    trace_group.add_argument(
+        "--replay-trace",
+        metavar="PATH",
+        help="simulate each run in a trace file from its recorded packs, instead"
+        " of pulling new ones (--runs is ignored)",
+    )
     parser.add_argument("--json", action="store_true", help="output results as JSON")
-    parser.add_argument("-o", "--output-histograms", help="path to dump histograms to")
+    parser.add_argument(
+        "-o",
+        "--output-histograms",
+        help="path to dump histograms to, a .csv, or sparse if it ends .npz or"
+        " .csv.gz (a .csv of CDFs with --exact)",
+    )
 
     args = parser.parse_args()
 
-    # --- Setup ---
+    needs_numpy = {
+        "the batch engine": args.engine == "batch",
+        "--exact": args.exact,
+        "--rng numpy": args.rng == "numpy",
+        "-o .npz": str(args.output_histograms).endswith(".npz") and not args.exact,
+    }
+    if any(needs_numpy.values()) and importlib.util.find_spec("numpy") is None:
+        feature = next(k for k, v in needs_numpy.items() if v)
+        parser.error(f"{feature} requires numpy")
+
+    target_stderr = args.target_stderr
+    if args.target_ci is not None:
+        target_stderr = args.target_ci / Z_95
+
+    adaptive = target_stderr is not None or args.time_budget is not None
+    if target_stderr is not None and args.max_opened:
+        parser.error("precision targets do not support --max-opened")
+    if args.rng != "random" and args.seed is None and not args.compare_strategies:
+        # unseeded runs draw from the random module
+        parser.error(f"--rng {args.rng} needs --seed")
+
+    if args.target_percentiles and target_stderr is None:
+        parser.error("--target-percentiles needs --target-stderr or --target-ci")
+
+    if args.cache and (args.resume or args.extend):
+        parser.error("--cache can't be used with --resume or --extend")
+
+    if args.profile and (args.exact or args.engine == "batch"):
+        parser.error("--profile only supports the serial engine")
+
+    if args.importance_tilt is not None:
+        unsupported = {
+            "--exact": args.exact,
+            "the batch engine": args.engine == "batch",
+            "--max-opened": bool(args.max_opened),
+            "precision targets": adaptive,
+            "--profile": args.profile,
+            "--compare-strategies": bool(args.compare_strategies),
+        }
+        if used := [k for k, v in unsupported.items() if v]:
+            parser.error(f"--importance-tilt can't be used with {', '.join(used)}")
+        if not 0 < args.importance_tilt <= 1:
+            parser.error("--importance-tilt must be more than 0 and at most 1")
 
-    with open(args.expansion_json) as f:
-        data = json.load(f)
-        expansion = Expansion.from_json(data)
+    if args.control_variates:
+        unsupported = {
+            "--exact": args.exact,
+            "the batch engine": args.engine == "batch",
+            "--max-opened": bool(args.max_opened),
+            "--importance-tilt": args.importance_tilt is not None,
+            "--profile": args.profile,
+            "--compare-strategies": bool(args.compare_strategies),
+        }
+        if used := [k for k, v in unsupported.items() if v]:
+            parser.error(f"--control-variates can't be used with {', '.join(used)}")
 
-    initial_state = None
-    if args.initial_state:
-        with open(args.initial_state) as f:
-            initial_state = json.load(f)
+    if args.targets:
+        unsupported = {
+            "--initial-state": bool(args.initial_state),
+            "--exact": args.exact,
+            "the batch engine": args.engine == "batch",
+            "--workers": args.workers > 1,
+            "precision targets": adaptive,
+            "checkpoints": bool(args.checkpoint or args.resume or args.extend),
+            "--cache": bool(args.cache),
+            "--profile": args.profile,
+            "--importance-tilt": args.importance_tilt is not None,
+            "--control-variates": args.control_variates,
+            "--compare-strategies": bool(args.compare_strategies),
+        }
+        if used := [k for k, v in unsupported.items() if v]:
+            parser.error(f"--targets can't be used with {', '.join(used)}")
 
-    mission = None
-    if args.mission:
-        with open(args.mission) as f:
-            mission = json.load(f)
+    if args.compare_strategies:
+        unsupported = {
+            "--no-buy": not args.buy,
+            "--exact": args.exact,
+            "the batch engine": args.engine == "batch",
+            "--workers": args.workers > 1,
+            "precision targets": adaptive,
+            "checkpoints": bool(args.checkpoint or args.resume or args.extend),
+            "--cache": bool(args.cache),
+            "--profile": args.profile,
+        }
+        if used := [k for k, v in unsupported.items() if v]:
+            parser.error(f"--compare-strategies can't be used with {', '.join(used)}")
+        if len(set(args.compare_strategies)) < 2:
+            parser.error("--compare-strategies needs at least two strategies")
 
-    if args.stop_at_common:
-        mission = create_common_mission(expansion)
+    trace_option = None
+    if args.record_trace:
+        trace_option = "--record-trace"
+    elif args.replay_trace:
+        trace_option = "--replay-trace"
 
-    mission = mission and mission["cards"]
+    if trace_option:
+        unsupported = {
+            "--exact": args.exact,
+            "the batch engine": args.engine == "batch",
+            "--workers": args.workers > 1,
+            "checkpoints": bool(args.checkpoint or args.resume or args.extend),
+            "--cache": bool(args.cache),
+            "--profile": args.profile,
+            "--importance-tilt": args.importance_tilt is not None,
+            "--control-variates": args.control_variates,
+            "--targets": bool(args.targets),
+            "--compare-strategies": bool(args.compare_strategies),
+        }
+        if args.replay_trace:
+            unsupported["precision targets"] = adaptive
+            unsupported["--seed"] = args.seed is not None
+        if used := [k for k, v in unsupported.items() if v]:
+            parser.error(f"{trace_option} can't be used with {', '.join(used)}")
+
+    if args.progress_at:
+        unsupported = {
+            "--exact": args.exact,
+            "the batch engine": args.engine == "batch",
+            "--importance-tilt": args.importance_tilt is not None,
+            "--control-variates": args.control_variates,
+            "--targets": bool(args.targets),
+            "--compare-strategies": bool(args.compare_strategies),
+        }
+        if used := [k for k, v in unsupported.items() if v]:
+            parser.error(f"--progress-at can't be used with {', '.join(used)}")
+        if args.max_opened and args.progress_at[-1] > args.max_opened:
+            parser.error("--progress-at can't go past --max-opened")
+
+    if args.output_histograms:
+        try:
+            suffix = histogram_format(args.output_histograms)
+        except ValueError as e:
+            parser.error(e.args[0])
+        unsupported = {
+            "--targets": bool(args.targets),
+            "--compare-strategies": bool(args.compare_strategies),
+        }
+        if used := [k for k, v in unsupported.items() if v]:
+            parser.error(f"-o can't be used with {', '.join(used)}")
+        if args.exact and suffix != ".csv":
+            parser.error("--exact writes CDFs, so -o must be a .csv")
+        if args.max_opened and not args.exact:
+            parser.error("-o needs packs opened to complete, so can't use --max-opened")
+
+    if args.exact and args.max_opened:
+        parser.error("--exact does not support --max-opened")
+
+    if args.exact and args.buy and not args.mission:
+        parser.error("--exact with buying cards needs a mission")
+
+    # --- Setup ---
+
+    try:
+        data, expansion = load_expansion(
+            args.expansion_json, args.expansions_dir, args.compiled_cache
+        )
+    except KeyError as e:
+        parser.error(e.args[0])
+    initial_state, mission = load_rules(
+        expansion, args.initial_state, args.mission, args.stop_at_common
+    )
 
     results = {}
     results["metadata"] = {
         "expansion": expansion.name,
-        "runs": args.runs,
+        "runs": None if args.exact else args.runs,
         "mission": mission and mission.get("mission"),
     }
 
+    if args.exact:
+        try:
+            report_exact(expansion, mission, initial_state, args, results)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
     # --- Simulation ---
 
     start = time.time()
 
-    statistics = {}
+    options = {
+        "mission": mission,
+        "initial_state": initial_state,
+        "buy_cards": args.buy,
+        "buy_strategy": args.buy_strategy,
+        "max_opened": args.max_opened,
+        "seed": args.seed,
+        "rng_backend": args.rng,
+        "importance_tilt": args.importance_tilt,
+        "control_variates": args.control_variates,
+        "progress_at": args.progress_at,
+        # the engines draw different streams, so runs of one can't carry on
+        # (or be cached for) the other; the batch size only matters to batches
+        "engine": args.engine,
+        "batch_size": args.batch_size if args.engine == "batch" else None,
+    }
+
+    if args.compare_strategies:
+        report_comparison(expansion, options, args, results, start)
+        return
+
+    if args.targets:
+        missions = load_missions(args.targets, expansion)
+        if not missions:
+            parser.error(
+                f"no missions for {expansion.name} in {' '.join(args.targets)}"
+            )
+        report_targets(expansion, missions, options, args, results, start)
+        return
 
-    if args.max_opened:
-        statistics["cards"] = CardStatistics()
+    if args.replay_trace:
+        try:
+            report_replay(expansion, options, args, results, start)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
+    runs = args.runs
+    checkpoint = None
+    if resume := args.resume or args.extend:
+        try:
+            checkpoint = Checkpoint.load(resume)
+        except ValueError as e:
+            parser.error(str(e))
+        if (checkpoint.expansion, checkpoint.options) != (expansion.name, options):
+            parser.error("the checkpoint was made with different options")
+
+    cache = cache_key = None
+    if args.cache:
+        cache = ResultCache(args.cache, max_bytes=args.cache_size * 1024 * 1024)
+        cache_key = make_cache_key(data, options)
+        checkpoint = cache.load(cache_key)
+
+    if checkpoint is None:
+        checkpoint = Checkpoint.create(options, expansion=expansion.name)
+    elif not args.extend:
+        # top up to the requested runs
+        runs = max(args.runs - checkpoint.runs, 0)
+    checkpoint.restore_random_state()
+
+    statistics = checkpoint.statistics
+    if args.profile:
+        statistics.setdefault("profile", ProfileStatistics())
     else:
-        statistics["opened"] = OpenedStatistics()
-    if args.buy:
-        statistics["bought"] = BoughtStatistics()
+        statistics.pop("profile", None)
+    previous_runs = checkpoint.runs
+    # without a checkpoint of its own, a run checkpoints into the cache
+    checkpoint_path = args.checkpoint or resume
+    if cache and not checkpoint_path:
+        checkpoint_path = str(cache.path(cache_key))
 
-    for _ in range(args.runs):
-        # Create a new collection for each run
-        # as collection is mutated during simulation
-        collection = Collection.from_json(expansion, mission=mission)
+    pool = None
+    if args.workers > 1:
+        # one pool for every round, so the expansion is only sent once
+        pool = create_pool(expansion, statistics, workers=args.workers, **options)
 
-        if initial_state:
-            collection.load_initial_state(initial_state)
+    record = None
+    if args.record_trace:
+        record = TraceWriter(args.record_trace, expansion.compiled, data)
 
-        result = simulate(
-            expansion,
-            collection,
-            buy_cards=args.buy,
-            max_opened=args.max_opened,
-        )
+    def run_round(runs, statistics):
+        # seeded runs are numbered on from those already done
+        first_run = checkpoint.runs
+        if pool is not None:
+            run_parallel(
+                expansion,
+                runs,
+                statistics,
+                workers=args.workers,
+                first_run=first_run,
+                pool=pool,
+            )
+        else:
+            run(
+                expansion,
+                runs,
+                statistics,
+                first_run=first_run,
+                record=record,
+                **options,
+            )
+
+    chunk = CHUNK_RUNS
+    if args.engine == "batch":
+        from pokemon_tcg_simulate.batch import DEFAULT_BATCH_SIZE
+
+        chunk = args.batch_size or DEFAULT_BATCH_SIZE
+
+    run_round = checkpointed(
+        run_round,
+        checkpoint,
+        checkpoint_path,
+        every=args.checkpoint_every,
+        chunk=chunk * args.workers,
+    )
+
+    # pre-emption usually sends SIGTERM, treat it like ctrl-c
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    try:
+        if adaptive:
+            run_until(
+                run_round,
+                statistics,
+                runs=runs,
+                target_stderr=target_stderr,
+                percentiles=args.target_percentiles,
+                time_budget=args.time_budget,
+            )
+        else:
+            run_round(runs)
+    except KeyboardInterrupt:
+        if checkpoint_path:
+            checkpoint.save(checkpoint_path)
+            print(
+                f"Interrupted after {checkpoint.runs} runs,"
+                f" saved checkpoint to {checkpoint_path}",
+                file=sys.stderr,
+            )
+        sys.exit(130)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if record is not None:
+            record.close()
 
-        for stat in statistics.values():
-            stat.add(result)
+    if cache:
+        cache.save(cache_key, checkpoint)
+    if args.checkpoint or resume:
+        checkpoint.save(checkpoint_path)
+
+    results["metadata"]["runs"] = checkpoint.runs
+    runs = checkpoint.runs - previous_runs
 
     # --- Results ---
 
     end = time.time()
     results["runtime"] = {
         "total": end - start,
-        "per_run": (end - start) / args.runs,
+        "per_run": (end - start) / runs if runs else None,
     }
 
     results["statistics"] = {name: stat.summary() for name, stat in statistics.items()}
 
+    if adaptive and "opened" in statistics:
+        results["precision"] = report_precision(
+            statistics, checkpoint.runs, args.target_percentiles
+        )
+
+    report_statistics(statistics, args, results)
+
+
+def report_statistics(statistics, args, results):
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    else:
+        for name, stat in results["statistics"].items():
+            if name != "progress":
+                print(format_markdown(stat))
+        if "progress" in statistics:
+            report_progress(statistics["progress"])
+        if "precision" in results:
+            print(format_markdown(results["precision"]))
+
+    if args.output_histograms:
+        report_opened_histograms(statistics["opened"], args.output_histograms)
+
+
+def report_precision(statistics, runs, percentiles):
+    errors = precision(
+        statistics["opened"],
+        percentiles,
+        controls=statistics.get("control_variates"),
+    )
+    report = {
+        "runs": {"value": runs, "description": "Runs"},
+        "average_opened_stderr": {
+            "value": errors.pop("average"),
+            "description": "Standard error of average packs opened",
+        },
+    }
+    if errors:
+        report["percentile_stderr"] = {
+            "value": {f"{p:g}": e for p, e in errors.items()},
+            "description": "Standard error of packs opened percentiles",
+        }
+    return report
+
+
+def report_comparison(expansion, options, args, results, start):
+    # pairing needs a seed, so pick one if none was given
+    seed = options["seed"]
+    if seed is None:
+        seed = random.randrange(2**32)
+    results["metadata"]["seed"] = seed
+
+    statistics = PairedStatistics(
+        strategies=list(dict.fromkeys(args.compare_strategies))
+    )
+    run_paired(
+        expansion,
+        args.runs,
+        statistics,
+        seed=seed,
+        mission=options["mission"],
+        initial_state=options["initial_state"],
+        max_opened=options["max_opened"],
+        rng_backend=options["rng_backend"],
+    )
+
+    end = time.time()
+    results["runtime"] = {"total": end - start, "per_run": (end - start) / args.runs}
+    results["comparison"] = statistics.summary()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_markdown(results["comparison"]))
+
+
+def report_targets(expansion, missions, options, args, results, start):
+    targets = create_targets(expansion, missions)
+    statistics = {
+        name: create_statistics(
+            buy_cards=options["buy_cards"], max_opened=options["max_opened"]
+        )
+        for name in targets
+    }
+    opened, read = run_targets(
+        expansion,
+        args.runs,
+        statistics,
+        targets=targets,
+        buy_cards=options["buy_cards"],
+        buy_strategy=options["buy_strategy"],
+        max_opened=options["max_opened"],
+        seed=options["seed"],
+        rng_backend=options["rng_backend"],
+    )
+
+    end = time.time()
+    results["runtime"] = {"total": end - start, "per_run": (end - start) / args.runs}
+    results["packs"] = {
+        "opened": {"value": opened, "description": "Packs opened"},
+        "separately": {
+            "value": read,
+            "description": "Packs opened simulating each target separately",
+        },
+    }
+    results["targets"] = {
+        name: {n: s.summary() for n, s in stats.items()}
+        for name, stats in statistics.items()
+    }
+
     if args.json:
         print(json.dumps(results, indent=2))
+        return
 
+    for name, summaries in results["targets"].items():
+        print(f"## {name}\n")
+        for summary in summaries.values():
+            print(format_markdown(summary))
+    print(format_markdown(results["packs"]))
+
+
+def report_replay(expansion, options, args, results, start):
+    statistics = create_statistics(
+        buy_cards=options["buy_cards"],
+        max_opened=options["max_opened"],
+        progress_at=options["progress_at"],
+    )
+    with Trace(args.replay_trace) as trace:
+        replay(
+            expansion,
+            trace,
+            statistics,
+            mission=options["mission"],
+            initial_state=options["initial_state"],
+            buy_cards=options["buy_cards"],
+            buy_strategy=options["buy_strategy"],
+            max_opened=options["max_opened"],
+        )
+
+        runs = len(trace)
+
+    end = time.time()
+    results["metadata"]["runs"] = runs
+    results["runtime"] = {
+        "total": end - start,
+        "per_run": (end - start) / runs if runs else None,
+    }
+    results["statistics"] = {name: stat.summary() for name, stat in statistics.items()}
+    report_statistics(statistics, args, results)
+
+
+def report_exact(expansion, mission, initial_state, args, results):
+    from pokemon_tcg_simulate.exact import solve, solve_mission
+
+    start = time.time()
+    if args.buy:
+        result = solve_mission(
+            expansion,
+            mission,
+            initial_state=initial_state,
+            buy_strategy=args.buy_strategy,
+        )
+    else:
+        result = solve(expansion, mission=mission, initial_state=initial_state)
+    results["runtime"] = {"total": time.time() - start}
+
+    results["statistics"] = {"opened": result.summary()}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
     else:
-        for stat in results["statistics"].values():
-            print(format_markdown(stat))
+        print(format_markdown(results["statistics"]["opened"]))
 
     if args.output_histograms:
         with open(args.output_histograms, "w") as f:
-            report_opened_histograms(statistics, file=f)
+            result.dump_cdfs(file=f)
 
 
 if __name__ == "__main__":
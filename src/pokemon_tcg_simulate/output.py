@@ -1,10 +1,25 @@
+import csv
+import gzip
 from collections import Counter, defaultdict
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
 from pokemon_tcg_simulate.collection import Collection
 
+if TYPE_CHECKING:
+    from pokemon_tcg_simulate.batch import BatchResult
+
 # TODO: CardStatistics; dupes, missing, etc.
 
+# percentiles reported by WeightedOpenedStatistics, out to the unlucky tail
+WEIGHTED_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+# header of sparse histogram csvs, one row for each non-zero count
+SPARSE_COLUMNS = ["histogram", "opened", "count"]
+
+# files histograms can be written to: dense csv, sparse gzipped csv and numpy
+HISTOGRAM_SUFFIXES = (".csv", ".csv.gz", ".npz")
+
 
 @dataclass(kw_only=True)
 class OpenedStatistics:
@@ -28,6 +43,27 @@ class OpenedStatistics:
                     self.rarity_hist[rarity] = Counter()
                 self.rarity_hist[rarity].update([collection.completed_at])
 
+    def add_batch(self, result: "BatchResult"):
+        self.opened_hist.update(result.opened.tolist())
+        self.common_opened_hist.update(
+            x for x in result.all_common_at.tolist() if x >= 0
+        )
+
+        for i, rarity in enumerate(result.rarities):
+            completed = [x for x in result.completed_at[:, i].tolist() if x >= 0]
+            if completed:
+                if rarity not in self.rarity_hist:
+                    self.rarity_hist[rarity] = Counter()
+                self.rarity_hist[rarity].update(completed)
+
+    def merge(self, other: "OpenedStatistics"):
+        self.opened_hist.update(other.opened_hist)
+        self.common_opened_hist.update(other.common_opened_hist)
+        for rarity, hist in other.rarity_hist.items():
+            if rarity not in self.rarity_hist:
+                self.rarity_hist[rarity] = Counter()
+            self.rarity_hist[rarity].update(hist)
+
     def summary(self):
         return {
             "average_opened": {
@@ -86,6 +122,39 @@ class CardStatistics:
             if count > 0:
                 self.duplicates_by_rarity[rarity].update([collection.total() / count])
 
+    def add_batch(self, result: "BatchResult"):
+        unique = result.unique.tolist()
+        total = result.total.tolist()
+        remaining = result.remaining.tolist()
+
+        for run in range(result.runs):
+            self.common_collected.update(
+                [sum(c for c, rare in zip(unique[run], result.rare) if not rare)]
+            )
+            self.total_collected.update([sum(unique[run])])
+
+            for i, rarity in enumerate(result.rarities):
+                count = unique[run][i]
+                size = result.size[i]
+                if size > 0:
+                    self.cards_by_rarity[rarity].update([count / size])
+                    self.cards_missing_by_rarity[rarity].update(
+                        [remaining[run][i] / size]
+                    )
+                if count > 0:
+                    self.duplicates_by_rarity[rarity].update([total[run][i] / count])
+
+    def merge(self, other: "CardStatistics"):
+        self.common_collected.update(other.common_collected)
+        self.total_collected.update(other.total_collected)
+        for mine, theirs in (
+            (self.cards_by_rarity, other.cards_by_rarity),
+            (self.cards_missing_by_rarity, other.cards_missing_by_rarity),
+            (self.duplicates_by_rarity, other.duplicates_by_rarity),
+        ):
+            for rarity, hist in theirs.items():
+                mine[rarity].update(hist)
+
     def summary(self):
         return {
             "common_collected": {
@@ -120,6 +189,52 @@ class CardStatistics:
         }
 
 
+@dataclass(kw_only=True)
+class ProgressStatistics:
+    """
+    Card statistics at each of several numbers of packs opened, from
+    snapshots taken during each run, for the curve of collection progress.
+
+    Runs which finish before a checkpoint count as they finished.
+    """
+
+    # numbers of packs opened to snapshot the collection at
+    checkpoints: tuple[int, ...] = ()
+
+    # card statistics at each checkpoint
+    curve: dict[int, CardStatistics] = field(init=False)
+
+    def __post_init__(self):
+        self.checkpoints = tuple(sorted(set(self.checkpoints)))
+        self.curve = {c: CardStatistics() for c in self.checkpoints}
+
+    def observe(self, collection: Collection):
+        # called by the simulation when it opens one of the checkpoints
+        self.curve[collection.opened].add(collection)
+
+    def add(self, result: Collection):
+        for checkpoint in self.checkpoints:
+            if checkpoint > result.opened:
+                self.curve[checkpoint].add(result)
+
+    def merge(self, other: "ProgressStatistics"):
+        for checkpoint, stats in other.curve.items():
+            self.curve[checkpoint].merge(stats)
+
+    def summary(self):
+        return {
+            "progress": {
+                "value": {
+                    checkpoint: {
+                        name: stat["value"] for name, stat in stats.summary().items()
+                    }
+                    for checkpoint, stats in self.curve.items()
+                },
+                "description": "Cards collected by packs opened",
+            },
+        }
+
+
 @dataclass(kw_only=True)
 class BoughtStatistics:
     # number of cards bought for each rarity
@@ -135,6 +250,17 @@ class BoughtStatistics:
             if collection.bought:
                 self.bought[rarity] += len(collection.bought)
 
+    def add_batch(self, result: "BatchResult"):
+        self.runs += result.runs
+        for i, rarity in enumerate(result.rarities):
+            if bought := int(result.bought[:, i].sum()):
+                self.bought[rarity] += bought
+
+    def merge(self, other: "BoughtStatistics"):
+        self.runs += other.runs
+        for rarity, count in other.bought.items():
+            self.bought[rarity] += count
+
     def summary(self):
         return {
             "average_bought_by_rarity": {
@@ -148,6 +274,172 @@ class BoughtStatistics:
         }
 
 
+@dataclass(kw_only=True)
+class PairedStatistics:
+    """
+    Packs opened by several buy strategies on the same runs, with the
+    difference of each from the first strategy, run by run.
+    """
+
+    strategies: list[str]
+
+    # histogram of packs opened by each strategy
+    opened_hist: dict[str, Counter] = field(init=False)
+
+    # histogram of packs opened minus the first strategy's, in the same run
+    difference_hist: dict[str, Counter] = field(init=False)
+
+    # number of cards bought by each strategy
+    bought: dict[str, int] = field(init=False)
+
+    def __post_init__(self):
+        self.opened_hist = {s: Counter() for s in self.strategies}
+        self.difference_hist = {s: Counter() for s in self.strategies[1:]}
+        self.bought = dict.fromkeys(self.strategies, 0)
+
+    def add(self, results: dict[str, Collection]):
+        baseline = results[self.strategies[0]].opened
+        for strategy, result in results.items():
+            self.opened_hist[strategy].update([result.opened])
+            self.bought[strategy] += sum(
+                len(c.bought) for c in result.collected.values()
+            )
+            if strategy in self.difference_hist:
+                self.difference_hist[strategy].update([result.opened - baseline])
+
+    def merge(self, other: "PairedStatistics"):
+        for strategy, hist in other.opened_hist.items():
+            self.opened_hist[strategy].update(hist)
+            self.bought[strategy] += other.bought[strategy]
+        for strategy, hist in other.difference_hist.items():
+            self.difference_hist[strategy].update(hist)
+
+    def summary(self, z: float = 1.96):
+        baseline = self.strategies[0]
+        runs = self.opened_hist[baseline].total()
+
+        differences = {}
+        for strategy, hist in self.difference_hist.items():
+            mean, paired = avg(hist), stderr(hist)
+            unpaired = None
+            if paired is not None:
+                unpaired = (
+                    stderr(self.opened_hist[strategy]) ** 2
+                    + stderr(self.opened_hist[baseline]) ** 2
+                ) ** 0.5
+            differences[strategy] = {
+                "mean": mean,
+                "stderr": paired,
+                "ci95": paired and [mean - z * paired, mean + z * paired],
+                "unpaired_stderr": unpaired,
+                # runs needed apart for the same precision, per paired run
+                "pairing_gain": paired and unpaired and (unpaired / paired) ** 2,
+            }
+
+        return {
+            "average_opened": {
+                "value": {s: avg(h) for s, h in self.opened_hist.items()},
+                "description": "Average packs opened by strategy",
+            },
+            "average_bought": {
+                "value": (
+                    {s: b / runs for s, b in self.bought.items()} if runs else None
+                ),
+                "description": "Average cards bought by strategy",
+            },
+            "paired_difference": {
+                "value": differences,
+                "description": f"Packs opened compared to {baseline}, run by run",
+            },
+        }
+
+
+@dataclass(kw_only=True)
+class WeightedOpenedStatistics:
+    """
+    Packs opened by importance sampled runs, each weighted by its likelihood
+    ratio (see importance.TiltedExpansion).
+    """
+
+    # summed weights of runs by number of packs opened
+    opened_hist: Counter = field(init=False, default_factory=Counter)
+
+    # summed squared weights by number of packs opened, for standard errors
+    opened_sq_hist: Counter = field(init=False, default_factory=Counter)
+
+    runs: int = field(init=False, default=0)
+
+    def add(self, result: Collection, weight: float = 1.0):
+        self.runs += 1
+        self.opened_hist[result.opened] += weight
+        self.opened_sq_hist[result.opened] += weight * weight
+
+    def merge(self, other: "WeightedOpenedStatistics"):
+        self.runs += other.runs
+        self.opened_hist.update(other.opened_hist)
+        self.opened_sq_hist.update(other.opened_sq_hist)
+
+    def tail_probability(self, opened: int):
+        """
+        Estimated probability of opening more than `opened` packs,
+        and its (delta method) standard error.
+
+        Like the average and percentiles, this is self-normalised, divided
+        by the summed weights rather than the runs, so it agrees with them:
+        more than the p-th percentile has probability 1 - p, less where runs
+        pile up on the percentile itself.
+        """
+        if self.runs < 2:
+            return None, None
+        total = self.opened_hist.total()
+        total_sq = self.opened_sq_hist.total()
+        tail = sum(w for k, w in self.opened_hist.items() if k > opened)
+        tail_sq = sum(w for k, w in self.opened_sq_hist.items() if k > opened)
+        p = tail / total
+        var = ((1 - p) ** 2 * tail_sq + p * p * (total_sq - tail_sq)) / total**2
+        # as for stderr, so unweighted runs give the same
+        var *= self.runs / (self.runs - 1)
+        return p, var**0.5
+
+    def summary(self):
+        total = self.opened_hist.total()
+        effective = total**2 / self.opened_sq_hist.total() if total else None
+
+        tails = {}
+        for p in WEIGHTED_PERCENTILES:
+            value = quantile(self.opened_hist, p / 100)
+            if value is not None:
+                probability, error = self.tail_probability(value)
+                tails[f"{p:g}"] = {
+                    "opened": value,
+                    "probability": probability,
+                    "stderr": error,
+                }
+
+        return {
+            "average_opened": {
+                "value": (
+                    sum(k * w for k, w in self.opened_hist.items()) / total
+                    if total
+                    else None
+                ),
+                "description": "Average packs opened",
+            },
+            "opened_percentiles": {
+                "value": {p: v["opened"] for p, v in tails.items()},
+                "description": "Percentiles of packs opened",
+            },
+            "tail_probability": {
+                "value": tails,
+                "description": "Probability of opening more than each percentile",
+            },
+            "effective_runs": {
+                "value": effective,
+                "description": "Effective number of runs, from the spread of weights",
+            },
+        }
+
+
 def format_markdown(stats: dict) -> str:
     # TODO: round numbers to 2 decimal places
     lines = []
@@ -177,13 +469,45 @@ def report_opened_percentiles(stats: OpenedStatistics, file=None):
         print(f"{rarity}, {', '.join(map(str, percentiles(hist)))}", file=file)
 
 
-def report_opened_histograms(stats: OpenedStatistics, file=None):
+def report_progress(stats: ProgressStatistics, file=None):
+    summaries = {c: s.summary() for c, s in stats.curve.items()}
+    rarities = list(
+        dict.fromkeys(
+            r for s in summaries.values() for r in s["cards_by_rarity"]["value"]
+        )
+    )
+
+    print("\n# Progress\n", file=file)
+    columns = [
+        f"{rarity} {column}"
+        for rarity in rarities
+        for column in ("collected", "missing", "duplicates")
+    ]
+    print(", ".join(["Opened", "total", "common", *columns]), file=file)
+    for checkpoint, summary in summaries.items():
+        row = [
+            checkpoint,
+            summary["total_collected"]["value"],
+            summary["common_collected"]["value"],
+        ]
+        for rarity in rarities:
+            for name in (
+                "cards_by_rarity",
+                "cards_missing_by_rarity",
+                "duplicates_by_rarity",
+            ):
+                row.append(summary[name]["value"].get(rarity))
+        print(", ".join(map(str, row)), file=file)
+
+
+def report_opened_histograms(stats: OpenedStatistics, path: str):
+    # weighted statistics only keep packs opened overall
     histograms = {
         "ALL": stats.opened_hist,
-        "COMMON": stats.common_opened_hist,
-        **stats.rarity_hist,
+        "COMMON": getattr(stats, "common_opened_hist", Counter()),
+        **getattr(stats, "rarity_hist", {}),
     }
-    dump_histograms(histograms, file=file)
+    write_histograms(histograms, path)
 
 
 def avg(counter: Counter):
@@ -192,6 +516,42 @@ def avg(counter: Counter):
     return None
 
 
+def stderr(counter: Counter):
+    # standard error of the average
+    total = counter.total()
+    if total < 2:
+        return None
+    mean = sum(k * v for k, v in counter.items()) / total
+    var = sum(v * (k - mean) ** 2 for k, v in counter.items()) / (total - 1)
+    return (var / total) ** 0.5
+
+
+def quantile(counter: Counter, q: float):
+    # smallest value with at least q of the counts at or below it
+    target = q * counter.total()
+    s = 0
+    for value, count in sorted(counter.items()):
+        s += count
+        if s >= target:
+            return value
+    return None
+
+
+def percentile_stderr(counter: Counter, p: float, z: float = 1.96):
+    """
+    Approximate standard error of a percentile, from the width of the
+    confidence interval on its rank.
+    """
+    total = counter.total()
+    if total < 2:
+        return None
+    q = p / 100
+    spread = z * (q * (1 - q) / total) ** 0.5
+    lower = quantile(counter, max(q - spread, 0))
+    upper = quantile(counter, min(q + spread, 1))
+    return (upper - lower) / (2 * z)
+
+
 def percentiles(counter: Counter):
     # TODO: configurable percentiles
     values = sorted(counter.items())
@@ -212,12 +572,119 @@ def percentiles(counter: Counter):
     return results
 
 
-def dump_histograms(histograms: list[Counter], file=None):
-    upper = max(max(h.keys()) for h in histograms.values())
+def dump_histograms(histograms: dict[str, Counter], file=None):
+    # dense, a row for every number of packs opened up to the largest
+    upper = max((max(h, default=0) for h in histograms.values()), default=0)
     keys = list(histograms)
 
-    print(",".join(["opened", *keys]), file=file)
-    for i in range(upper + 1):
-        print(
-            ",".join(map(str, [i] + [histograms[k].get(i, 0) for k in keys])), file=file
+    rows = [",".join(["opened", *keys])]
+    rows.extend(
+        ",".join(map(str, [i] + [histograms[k].get(i, 0) for k in keys]))
+        for i in range(upper + 1)
+    )
+    print("\n".join(rows), file=file)
+
+
+def sparse_columns(histograms: dict[str, Counter]):
+    """
+    Histograms as columns of the index of the histogram, packs opened and
+    count, for the non-zero counts only.
+    """
+    index, opened, counts = [], [], []
+    for i, hist in enumerate(histograms.values()):
+        for value, count in sorted(hist.items()):
+            if count:
+                index.append(i)
+                opened.append(value)
+                counts.append(count)
+    return index, opened, counts
+
+
+def histogram_format(path: str) -> str:
+    """
+    Which of HISTOGRAM_SUFFIXES a histogram file is, raising ValueError for
+    any other file.
+    """
+    # longest first, so a .csv.gz isn't taken for a .csv
+    for suffix in sorted(HISTOGRAM_SUFFIXES, key=len, reverse=True):
+        if str(path).endswith(suffix):
+            return suffix
+    raise ValueError(
+        f"{path} isn't a histogram file, it must end {', '.join(HISTOGRAM_SUFFIXES)}"
+    )
+
+
+def write_histograms(histograms: dict[str, Counter], path: str):
+    """
+    Write histograms by name, sparse and in one write for `.npz` (needs numpy)
+    and `.csv.gz`, or as a dense `.csv`.
+    """
+    path = str(path)
+    names = list(histograms)
+    suffix = histogram_format(path)
+
+    if suffix == ".npz":
+        import numpy as np
+
+        index, opened, counts = sparse_columns(histograms)
+        np.savez_compressed(
+            path,
+            names=np.array(names, dtype=str),
+            histogram=np.array(index, dtype=np.int32),
+            opened=np.array(opened, dtype=np.int64),
+            count=np.array(counts),
         )
+    elif suffix == ".csv.gz":
+        rows = [",".join(SPARSE_COLUMNS)]
+        rows.extend(
+            f"{names[i]},{value},{count}"
+            for i, value, count in zip(*sparse_columns(histograms))
+        )
+        with gzip.open(path, "wt") as f:
+            f.write("\n".join(rows) + "\n")
+    else:
+        with open(path, "w") as f:
+            dump_histograms(histograms, file=f)
+
+
+def _number(value: str):
+    # counts are integers, or floats for weighted histograms
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def load_histograms(path: str) -> dict[str, Counter]:
+    """
+    Histograms by name, as written by write_histograms (or dump_histograms).
+    """
+    path = str(path)
+    histograms = {}
+    suffix = histogram_format(path)
+
+    if suffix == ".npz":
+        import numpy as np
+
+        with np.load(path) as data:
+            names = data["names"].tolist()
+            histograms = {name: Counter() for name in names}
+            columns = (data[c].tolist() for c in ("histogram", "opened", "count"))
+            for i, value, count in zip(*columns):
+                histograms[names[i]][value] = count
+        return histograms
+
+    opener = gzip.open if suffix == ".csv.gz" else open
+    with opener(path, "rt", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        if header == SPARSE_COLUMNS:
+            for name, value, count in reader:
+                histograms.setdefault(name, Counter())[int(value)] = _number(count)
+        else:
+            histograms = {name: Counter() for name in header[1:]}
+            for value, *counts in reader:
+                for name, count in zip(header[1:], counts):
+                    if count := _number(count):
+                        histograms[name][int(value)] = count
+    return histograms
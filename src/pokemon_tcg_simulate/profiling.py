@@ -0,0 +1,102 @@
+"""
+Where the time goes in `simulate`, by phase, with counters of what happened.
+
+Given a profile, `simulate` laps a PhaseTimer after each phase of a pack and
+opens packs through ProfiledPacks, without changing its draws or decisions,
+so seeded runs give the same results either way.
+"""
+
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from pokemon_tcg_simulate.collection import Collection
+
+PHASES = ("setup", "open", "add", "buy", "completion", "rotation")
+
+
+@dataclass(kw_only=True)
+class ProfileStatistics:
+    # seconds spent in each phase of simulate, including the timer overhead
+    phases: Counter = field(init=False, default_factory=Counter)
+
+    # packs opened by booster type
+    boosters: Counter = field(init=False, default_factory=Counter)
+
+    # buy_remaining_triggered, bought_at_cap, variants_removed
+    counters: Counter = field(init=False, default_factory=Counter)
+
+    runs: int = field(init=False, default=0)
+    packs: int = field(init=False, default=0)
+
+    def add(self, result: Collection):
+        # the phases and counters are filled in by simulate
+        self.runs += 1
+        self.packs += result.opened
+
+    def merge(self, other: "ProfileStatistics"):
+        self.phases.update(other.phases)
+        self.boosters.update(other.boosters)
+        self.counters.update(other.counters)
+        self.runs += other.runs
+        self.packs += other.packs
+
+    def summary(self):
+        packs = self.packs or 1
+        return {
+            "phase_seconds": {
+                "value": {p: self.phases[p] for p in PHASES},
+                "description": "Seconds spent in each phase",
+            },
+            "phase_us_per_pack": {
+                "value": {p: 1e6 * self.phases[p] / packs for p in PHASES},
+                "description": "Microseconds per pack in each phase",
+            },
+            "packs_by_booster": {
+                "value": dict(self.boosters),
+                "description": "Packs opened by booster type",
+            },
+            "counters": {
+                "value": dict(self.counters),
+                "description": "Event counts",
+            },
+        }
+
+
+class PhaseTimer:
+    """
+    Adds the time since the last lap to a phase of a profile.
+    """
+
+    def __init__(self, profile: ProfileStatistics):
+        self.phases = profile.phases
+        self.counters = profile.counters
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] += now - self._last
+        self._last = now
+
+    def count(self, event: str):
+        self.counters[event] += 1
+
+
+class ProfiledPacks:
+    """
+    Opens packs from a compiled expansion, counting them by booster type.
+
+    Stands in for a compiled expansion in `simulate`.
+    """
+
+    def __init__(self, compiled, profile: ProfileStatistics):
+        self.compiled = compiled
+        self.cards = compiled.cards
+        self.boosters = profile.boosters
+        self._names = list(compiled.expansion.booster_rates)
+
+    def open(self, variant, rng):
+        # the same draws as CompiledExpansion.open
+        booster = self.compiled.pick_booster(rng)
+        self.boosters[self._names[booster]] += 1
+        return self.compiled.open_booster(booster, variant, rng)
@@ -0,0 +1,165 @@
+"""
+Look up expansions by name, and keep compiled expansions in a cache.
+
+Names are matched ignoring case and punctuation, against both the file name
+and the name in the data, so "Mythical Island" and "mythical_island" are the
+same expansion. Cached expansions are pickled with their compiled sampling
+tables, keyed by a hash of the data and of this package's source, so editing
+either rebuilds them. Each is signed (see `signing`), and only unpickled if
+the signature matches.
+
+The command line tools load an expansion, initial state and mission with
+`load_expansion` and `load_rules`.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+from functools import cache
+from pathlib import Path
+
+from pokemon_tcg_simulate.expansion import Expansion, create_common_mission
+from pokemon_tcg_simulate.signing import read_signed, write_signed
+
+# data in the repository, found from the package so commands work from anywhere
+DATA_DIRECTORY = Path(__file__).resolve().parents[2] / "data"
+DEFAULT_DIRECTORY = str(DATA_DIRECTORY / "expansions")
+
+
+def normalise_name(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+@cache
+def source_fingerprint() -> str:
+    """
+    Hash of this package's source, so cached expansions are rebuilt when the
+    code that compiles them changes.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(path.name.encode() + b"\0" + path.read_bytes())
+    return digest.hexdigest()
+
+
+def read_expansion(path, cache_dir=None) -> tuple[dict, Expansion]:
+    """
+    Expansion data from a json file, and the expansion compiled from it,
+    from the cache if it's there.
+    """
+    path = Path(path)
+    raw = path.read_bytes()
+    data = json.loads(raw)
+    if cache_dir is None:
+        return data, Expansion.from_json(data)
+
+    # entries are named by the resolved path of their file, so stale copies
+    # of a different file with the same name are left alone
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    source = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:16]
+    digest = hashlib.sha256(raw + source_fingerprint().encode()).hexdigest()
+    prefix = f"{path.stem}-{source}"
+    cached = cache_dir / f"{prefix}-{digest[:16]}.pickle"
+
+    try:
+        return data, pickle.loads(read_signed(cached))
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError):
+        pass
+
+    expansion = Expansion.from_json(data)
+    expansion.compiled  # noqa: B018, built now so it's cached too
+
+    # drop copies for older versions of the data or code
+    for stale in cache_dir.glob(f"{prefix}-*.pickle"):
+        stale.unlink()
+
+    write_signed(cached, pickle.dumps(expansion, protocol=pickle.HIGHEST_PROTOCOL))
+
+    return data, expansion
+
+
+class ExpansionRegistry:
+    """
+    Expansions in a directory of json files, by name.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, cache_dir=None):
+        self.directory = Path(directory)
+        self.cache_dir = cache_dir
+        self._names = None
+
+    def _by_name(self):
+        # read lazily, most lookups are by file name
+        if self._names is None:
+            self._names = {}
+            for path in sorted(self.directory.glob("*.json")):
+                with open(path) as f:
+                    name = json.load(f)["name"]
+                self._names[normalise_name(name)] = (name, path)
+        return self._names
+
+    def names(self) -> list[str]:
+        return [name for name, _ in self._by_name().values()]
+
+    def find(self, name: str) -> Path:
+        key = normalise_name(name)
+        for path in self.directory.glob("*.json"):
+            if normalise_name(path.stem) == key:
+                return path
+
+        if key in self._by_name():
+            return self._by_name()[key][1]
+
+        raise KeyError(f"Unknown expansion {name!r}")
+
+    def read(self, name: str) -> tuple[dict, Expansion]:
+        return read_expansion(self.find(name), self.cache_dir)
+
+    def load(self, name: str) -> Expansion:
+        return self.read(name)[1]
+
+
+def load_expansion(
+    name, directory=DEFAULT_DIRECTORY, cache_dir=None
+) -> tuple[dict, Expansion]:
+    """
+    Read an expansion from a json file, or by name from a directory of them.
+
+    Raises KeyError, with the names there, if it's neither.
+    """
+    path = name
+    if not os.path.exists(path):
+        registry = ExpansionRegistry(directory)
+        try:
+            path = registry.find(name)
+        except KeyError:
+            raise KeyError(
+                f"no expansion file or name {name},"
+                f" expected one of: {', '.join(registry.names())}"
+            ) from None
+    return read_expansion(path, cache_dir)
+
+
+def load_rules(
+    expansion: Expansion, initial_state=None, mission=None, stop_at_common=False
+) -> tuple[dict | None, dict | None]:
+    """
+    The initial state and mission cards to simulate with, from json files,
+    or the mission of all common cards.
+    """
+    state = None
+    if initial_state:
+        with open(initial_state) as f:
+            state = json.load(f)
+
+    cards = None
+    if mission:
+        with open(mission) as f:
+            cards = json.load(f)
+    if stop_at_common:
+        cards = create_common_mission(expansion)
+
+    return state, cards and cards["cards"]
@@ -0,0 +1,76 @@
+"""
+Random number generators for seeded simulations.
+
+A generator is anything with the `random.Random` methods the simulation
+uses (`random`, `randint`, `choices`). Unseeded runs share the `random`
+module's global state, while seeded runs each get their own generator,
+derived from the seed and the index of the run. So a run gives the same
+result however the runs are split between workers, chunks or resumed jobs.
+"""
+
+import hashlib
+import random
+
+BACKENDS = ("random", "numpy")
+
+# doubles drawn at a time by NumpyRandom
+BUFFER_SIZE = 1024
+
+
+class NumpyRandom(random.Random):
+    """
+    `random.Random` drawing from a numpy bit generator.
+
+    The other methods are derived from `random` and `getrandbits`.
+    """
+
+    def __init__(self, bit_generator):
+        import numpy as np
+
+        self._generator = np.random.Generator(bit_generator)
+        self._buffer = []
+        self._next = 0
+        super().__init__()
+
+    def seed(self, *args, **kwargs):
+        # seeded by the bit generator
+        pass
+
+    def random(self):
+        if self._next == len(self._buffer):
+            self._buffer = self._generator.random(BUFFER_SIZE).tolist()
+            self._next = 0
+
+        self._next += 1
+        return self._buffer[self._next - 1]
+
+    def getrandbits(self, k):
+        size = (k + 7) // 8
+        bits = int.from_bytes(self._generator.bytes(size), "little")
+        return bits >> (size * 8 - k)
+
+
+def seed_sequence(seed: int, index: int):
+    """
+    numpy seed sequence for the stream at `index` of a seed.
+    """
+    import numpy as np
+
+    return np.random.SeedSequence(seed, spawn_key=(index,))
+
+
+def run_rng(seed: int, index: int, backend: str = "random"):
+    """
+    Independent generator for the run at `index` of a seeded job.
+    """
+    if backend == "numpy":
+        import numpy as np
+
+        return NumpyRandom(np.random.PCG64(seed_sequence(seed, index)))
+
+    if backend != "random":
+        raise ValueError(f"Unknown random backend {backend}")
+
+    # hash, so nearby seeds and indices don't give related streams
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return random.Random(int.from_bytes(digest, "little"))
@@ -0,0 +1,408 @@
+"""
+Run many simulations and accumulate their statistics.
+"""
+
+import json
+import random
+import time
+from dataclasses import replace
+from itertools import accumulate
+
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.control import ControlledExpansion, ControlVariateStatistics
+from pokemon_tcg_simulate.expansion import Expansion
+from pokemon_tcg_simulate.output import (
+    BoughtStatistics,
+    CardStatistics,
+    OpenedStatistics,
+    PairedStatistics,
+    ProgressStatistics,
+    WeightedOpenedStatistics,
+    percentile_stderr,
+    stderr,
+)
+from pokemon_tcg_simulate.rng import run_rng, seed_sequence
+from pokemon_tcg_simulate.simulation import simulate
+
+# chunks of runs handed to each worker, for load balancing
+CHUNKS_PER_WORKER = 4
+
+# z score for a 95% confidence interval
+Z_95 = 1.96
+
+
+def create_statistics(
+    *,
+    buy_cards=True,
+    max_opened=None,
+    importance_tilt=None,
+    control_variates=False,
+    progress_at=None,
+):
+    # the other statistics don't take weights
+    if importance_tilt is not None:
+        return {"opened": WeightedOpenedStatistics()}
+
+    statistics = {}
+
+    if max_opened:
+        statistics["cards"] = CardStatistics()
+    else:
+        statistics["opened"] = OpenedStatistics()
+    if buy_cards:
+        statistics["bought"] = BoughtStatistics()
+    if progress_at:
+        statistics["progress"] = ProgressStatistics(checkpoints=progress_at)
+    if control_variates:
+        statistics["control_variates"] = ControlVariateStatistics()
+
+    return statistics
+
+
+def empty_statistics(statistics):
+    # fresh statistics of the same kinds and settings, for partial results
+    return {name: replace(stat) for name, stat in statistics.items()}
+
+
+def merge_statistics(statistics, other):
+    # NOTE: mutates the statistics
+    for name, stat in other.items():
+        statistics[name].merge(stat)
+    return statistics
+
+
+def run(
+    expansion,
+    runs,
+    statistics,
+    *,
+    mission=None,
+    initial_state=None,
+    buy_cards=True,
+    buy_strategy="rarest",
+    max_opened=None,
+    engine="serial",
+    batch_size=None,
+    seed=None,
+    rng_backend="random",
+    first_run=0,
+    importance_tilt=None,
+    control_variates=False,
+    progress_at=None,
+    record=None,
+):
+    # NOTE: mutates the statistics
+    # with a seed, each run draws from its own stream, by index from first_run
+    # with an importance tilt, each run is added with its likelihood ratio,
+    # and with control variates, the control_variates statistics with its controls
+    # progress_at is already in the progress statistics, as from create_statistics
+    # record is a trace.TraceWriter to write the packs of each run to
+    if engine == "batch":
+        # statistics the batch engine supports have an add_batch
+        unsupported = [
+            n for n, stat in statistics.items() if not hasattr(stat, "add_batch")
+        ]
+        if unsupported:
+            raise ValueError(
+                f"The batch engine doesn't support the {', '.join(unsupported)}"
+                " statistics"
+            )
+
+        from pokemon_tcg_simulate.batch import simulate_batch
+
+        # batches share a stream, so this is only reproducible for the same chunks
+        rng = None if seed is None else seed_sequence(seed, first_run)
+        for result in simulate_batch(
+            expansion,
+            runs,
+            mission=mission,
+            initial_state=initial_state,
+            buy_cards=buy_cards,
+            buy_strategy=buy_strategy,
+            max_opened=max_opened,
+            batch_size=batch_size,
+            rng=rng,
+        ):
+            for stat in statistics.values():
+                stat.add_batch(result)
+
+        return statistics
+
+    tilted = controlled = None
+    if importance_tilt is not None:
+        from pokemon_tcg_simulate.importance import TiltedExpansion
+
+        tilted = TiltedExpansion(expansion, importance_tilt)
+    elif control_variates:
+        controlled = ControlledExpansion(expansion)
+    compiled = tilted or controlled
+    if record is not None:
+        from pokemon_tcg_simulate.trace import TraceRecorder
+
+        # replays don't know the packs were tilted or controlled
+        if compiled is not None:
+            raise ValueError(
+                "Traces can't be recorded with an importance tilt or control variates"
+            )
+        compiled = TraceRecorder(expansion.compiled, record)
+
+    # progress snapshots are taken as the runs pass each checkpoint
+    progress = statistics.get("progress")
+    observe_at = set(progress.checkpoints) if progress else ()
+    observe = progress and progress.observe
+
+    for index in range(first_run, first_run + runs):
+        if tilted is not None:
+            tilted.reset()
+        if controlled is not None:
+            controlled.reset()
+
+        # Create a new collection for each run
+        # as collection is mutated during simulation
+        collection = Collection.from_json(expansion, mission=mission)
+
+        if initial_state:
+            collection.load_initial_state(initial_state)
+
+        result = simulate(
+            expansion,
+            collection,
+            buy_cards=buy_cards,
+            buy_strategy=buy_strategy,
+            max_opened=max_opened,
+            rng=random if seed is None else run_rng(seed, index, rng_backend),
+            profile=statistics.get("profile"),
+            compiled=compiled,
+            observe_at=observe_at,
+            observe=observe,
+        )
+        if record is not None:
+            record.end_run()
+
+        if tilted is not None:
+            weight = tilted.likelihood_ratio()
+            for stat in statistics.values():
+                stat.add(result, weight)
+        elif controlled is not None:
+            controls = controlled.controls()
+            for name, stat in statistics.items():
+                if name == "control_variates":
+                    stat.add(result, controls)
+                else:
+                    stat.add(result)
+        else:
+            for stat in statistics.values():
+                stat.add(result)
+
+    return statistics
+
+
+def run_paired(
+    expansion,
+    runs,
+    statistics: PairedStatistics,
+    *,
+    seed,
+    first_run=0,
+    mission=None,
+    initial_state=None,
+    max_opened=None,
+    rng_backend="random",
+):
+    """
+    Simulate each run with every strategy in the statistics, all drawing
+    from the same seeded stream (common random numbers), so differences
+    between strategies aren't swamped by differences in luck.
+    """
+    # NOTE: mutates the statistics
+    for index in range(first_run, first_run + runs):
+        results = {}
+        for strategy in statistics.strategies:
+            collection = Collection.from_json(expansion, mission=mission)
+            if initial_state:
+                collection.load_initial_state(initial_state)
+
+            results[strategy] = simulate(
+                expansion,
+                collection,
+                buy_strategy=strategy,
+                max_opened=max_opened,
+                rng=run_rng(seed, index, rng_backend),
+            )
+
+        statistics.add(results)
+
+    return statistics
+
+
+# --- Adaptive run count ---
+
+
+def precision(
+    stats: OpenedStatistics,
+    percentiles=(),
+    controls: ControlVariateStatistics | None = None,
+):
+    """
+    Standard error of the average packs opened, and of each percentile.
+
+    With control variate statistics, the average's is that of the adjusted
+    average.
+    """
+    average = stderr(stats.opened_hist)
+    if controls is not None:
+        average = controls.estimate()[1]
+
+    return {
+        "average": average,
+        **{p: percentile_stderr(stats.opened_hist, p) for p in percentiles},
+    }
+
+
+def run_until(
+    run_round,
+    statistics,
+    *,
+    runs,
+    target_stderr=None,
+    percentiles=(),
+    time_budget=None,
+):
+    """
+    Call `run_round(n)` until the average packs opened (and percentiles)
+    reach the target standard error, or the time budget in seconds is spent.
+
+    The first round is `runs`, after which rounds are sized from the current
+    precision, at most doubling the runs each time. Returns the number of runs.
+    """
+    start = time.monotonic()
+    total = 0
+    size = max(runs, 1)
+
+    while True:
+        run_round(size)
+        total += size
+
+        elapsed = time.monotonic() - start
+        remaining = time_budget - elapsed if time_budget is not None else None
+
+        needed = 2 * total
+        if target_stderr is not None:
+            errors = precision(
+                statistics["opened"],
+                percentiles,
+                controls=statistics.get("control_variates"),
+            ).values()
+            if None not in errors:
+                worst = max(errors)
+                if worst <= target_stderr:
+                    break
+                # stderr shrinks with the square root of runs
+                needed = total * (worst / target_stderr) ** 2
+
+        size = min(max(int(needed) - total, 1), total)
+        if remaining is not None:
+            per_run = max(elapsed, 1e-9) / total
+            size = min(size, int(remaining / per_run))
+            if size < 1:
+                break
+        elif target_stderr is None:
+            break
+
+    return total
+
+
+# --- Process pool ---
+
+# set once per worker process by _init_worker
+_worker_expansion = None
+_worker_options = None
+_worker_statistics = None
+
+# expansions a worker has loaded from json data sent with its tasks
+_worker_loaded = {}
+
+
+def _init_worker(expansion, options, statistics):
+    global _worker_expansion, _worker_options, _worker_statistics
+
+    # forked workers inherit the parent's random state
+    random.seed()
+
+    _worker_expansion = expansion
+    _worker_options = options
+    _worker_statistics = statistics
+
+
+def _load_expansion(data):
+    # tasks of the same expansion only load it once per worker
+    key = json.dumps(data, sort_keys=True)
+    if key not in _worker_loaded:
+        _worker_loaded[key] = Expansion.from_json(data)
+    return _worker_loaded[key]
+
+
+def _run_chunk(chunk):
+    data, first_run, runs = chunk
+    expansion = _worker_expansion if data is None else _load_expansion(data)
+    statistics = empty_statistics(_worker_statistics)
+    return run(expansion, runs, statistics, first_run=first_run, **_worker_options)
+
+
+def split_runs(runs, chunks):
+    size, extra = divmod(runs, chunks)
+    return [size + (i < extra) for i in range(chunks) if size + (i < extra)]
+
+
+def create_pool(expansion, statistics, *, workers, **options):
+    """
+    Pool of worker processes for `run_parallel`, each set up once with the
+    options and the kinds of statistics to return, so the pool can be reused
+    for many rounds of runs with the same options.
+
+    `expansion` is sent to each worker already compiled, or with None, each
+    call to `run_parallel` sends the json data of its expansion with its
+    tasks, so one pool can run many expansions.
+    """
+    # slow to import, and most runs don't need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(expansion, options, empty_statistics(statistics)),
+    )
+
+
+def run_parallel(
+    expansion, runs, statistics, *, workers, first_run=0, pool=None, **options
+):
+    """
+    Split runs across a pool of worker processes.
+
+    Workers return partial statistics, which are merged into `statistics`.
+    `expansion` is either an Expansion, or its json data which each worker
+    loads. `pool` is one from `create_pool` with the same options (and with
+    no expansion, for json data), otherwise a pool is created for just
+    these runs.
+    """
+    data = expansion if isinstance(expansion, dict) else None
+    if pool is None:
+        initial = None if data is not None else expansion
+        with create_pool(initial, statistics, workers=workers, **options) as pool:
+            return run_parallel(
+                expansion,
+                runs,
+                statistics,
+                workers=workers,
+                first_run=first_run,
+                pool=pool,
+            )
+
+    sizes = split_runs(runs, workers * CHUNKS_PER_WORKER)
+    chunks = zip(accumulate(sizes, initial=first_run), sizes)
+    tasks = ((data, first, size) for first, size in chunks)
+    for partial in pool.map(_run_chunk, tasks):
+        merge_statistics(statistics, partial)
+
+    return statistics
@@ -0,0 +1,82 @@
+"""
+Sign pickled files with a key kept next to them, so only files written by
+this simulator (with access to the key) are ever unpickled.
+
+Cached expansions, cached results and checkpoints are all signed. A
+directory's key is made on first use, as a `.key` file only readable by its
+owner, and a signed file is the HMAC-SHA256 of its contents, then the contents.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+from pathlib import Path
+
+# file in a directory holding the key its files are signed with
+KEY_FILE = ".key"
+
+# bytes of the signature at the start of a signed file
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+def signing_key(directory) -> bytes:
+    """
+    Key for signing the files in a directory, made on first use.
+    """
+    directory = Path(directory)
+    path = directory / KEY_FILE
+    if not path.exists():
+        # linked into place whole, so a concurrent reader never sees it part written
+        tmp = directory / f"{KEY_FILE}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(secrets.token_bytes(32))
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink()
+    return path.read_bytes()
+
+
+def sign(key: bytes, payload: bytes) -> bytes:
+    return hmac.new(key, payload, hashlib.sha256).digest() + payload
+
+
+def verify(key: bytes, signed: bytes) -> bytes | None:
+    """
+    The payload of a signed file, or None if it wasn't signed with the key.
+    """
+    signature, payload = signed[:SIGNATURE_SIZE], signed[SIGNATURE_SIZE:]
+    expected = hmac.new(key, payload, hashlib.sha256).digest()
+    if payload and hmac.compare_digest(signature, expected):
+        return payload
+    return None
+
+
+def write_signed(path, payload: bytes):
+    """
+    Sign and write a file, with the key of its directory.
+
+    Writes then renames, so a kill mid-write leaves the last copy.
+    """
+    path = Path(path)
+    signed = sign(signing_key(path.parent), payload)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(signed)
+    os.replace(tmp, path)
+
+
+def read_signed(path) -> bytes:
+    """
+    The payload of a signed file, raising ValueError if it wasn't signed
+    with the key of its directory.
+    """
+    path = Path(path)
+    payload = verify(signing_key(path.parent), path.read_bytes())
+    if payload is None:
+        raise ValueError(f"{path} isn't signed with the key in {path.parent}")
+    return payload
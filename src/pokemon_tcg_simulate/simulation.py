@@ -1,7 +1,9 @@
+import random
 from collections import deque
 
-from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.collection import Collection, RarityCollection
 from pokemon_tcg_simulate.expansion import ANY
+from pokemon_tcg_simulate.profiling import PhaseTimer, ProfiledPacks
 
 # max pack points that can be held at a time
 MAX_PACK_POINTS = 2_500
@@ -20,16 +22,38 @@ def most_expensive(collection_item):
 def rarest(variant):
     # the individual card you're least likely to pull
     def inner(collection_item):
-        return max(collection_item[1].rarity.offering_rate) / collection_item[
-            1
-        ].rarity.count(variant)
+        rarity = collection_item[1].rarity
+        count = rarity.count(variant)
+        return max(rarity.offering_rate) / count if count else float("inf")
 
     return inner
 
 
+def by_cost(variant):
+    return most_expensive
+
+
+# which card to buy at the pack point cap:
+# name -> function of the variant opened, giving a sort key for pick_from_remaining
+BUY_STRATEGIES = {
+    "rarest": rarest,
+    "most_expensive": by_cost,
+}
+
+
+def rarity_order(rarities, strategy, variant):
+    """
+    Indices of rarities in the order a buy strategy picks from them.
+    """
+    key = BUY_STRATEGIES[strategy](variant)
+    items = [(r.name, RarityCollection(rarity=r)) for r in rarities]
+    return sorted(range(len(items)), key=lambda i: key(items[i]))
+
+
 def buy_remaining(collection, pack_points, opened):
     for collected in collection.values():
-        for missing in collected.iter_missing():
+        # buying changes what's missing
+        for missing in list(collected.iter_missing()):
             if pack_points < collected.rarity.cost:
                 # likely a programming error
                 raise RuntimeError("Ran out of points")
@@ -77,42 +101,88 @@ class VariantIterator:
             self.variants.remove(variant)
 
 
-def simulate(expansion, collection: Collection, *, buy_cards=True, max_opened=None):
+def simulate(
+    expansion,
+    collection: Collection,
+    *,
+    buy_cards=True,
+    max_opened=None,
+    rng=random,
+    profile=None,
+    buy_strategy="rarest",
+    compiled=None,
+    max_pack_points=MAX_PACK_POINTS,
+    observe_at=(),
+    observe=None,
+):
     # NOTE: mutates the collection object
+    # rng is anything with the random.Random methods, by default the random module
+    # compiled is what packs are opened from, by default expansion.compiled
+    # observe(collection) is called once each of the packs in observe_at are opened
+    # profile is a profiling.ProfileStatistics to add the time of each phase to
     collected = collection.collected
+    strategy = BUY_STRATEGIES[buy_strategy]
+
+    # with a profile, time each phase and count what happens
+    timer = PhaseTimer(profile) if profile is not None else None
+
+    compiled = compiled or expansion.compiled
+    if timer and hasattr(compiled, "pick_booster"):
+        compiled = ProfiledPacks(compiled, profile)
+    collection.index_cards(compiled)
 
     # TODO: configurable variant generator (cf simulate_mission)
     variants = VariantIterator(expansion.variants)
+    if timer:
+        timer.lap("setup")
+
     for variant in variants:
-        pulled = expansion.open(variant)
+        if timer:
+            timer.lap("rotation")
+
+        pulled = compiled.open(variant, rng)
+        if timer:
+            timer.lap("open")
 
         collection.opened += 1
         collection.pack_points += 5
 
-        collection.add(pulled)
+        collection.add_ids(pulled)
+        if timer:
+            timer.lap("add")
 
         if buy_cards:
-            if required_pack_points(collected) <= collection.pack_points:
-                collection.pack_points = buy_remaining(
-                    collected, collection.pack_points, collection.opened
-                )
-
-            if collection.pack_points == MAX_PACK_POINTS and not completed_all(
-                collected
+            if collection.required_pack_points() <= collection.pack_points:
+                collection.buy_remaining()
+                if timer:
+                    timer.count("buy_remaining_triggered")
+
+            if (
+                collection.pack_points == max_pack_points
+                and not collection.completed_all()
             ):
-                picked = pick_from_remaining(collected, rarest(variant))
+                picked = pick_from_remaining(collected, strategy(variant))
                 collection.buy(picked)
+                if timer:
+                    timer.count("bought_at_cap")
+        if timer:
+            timer.lap("buy")
 
-        if collection.all_common_at is None and completed_common(collected):
+        if collection.all_common_at is None and collection.completed_common():
             collection.all_common_at = collection.opened
 
-        if completed_all(collected):
-            break
+        if collection.opened in observe_at:
+            observe(collection)
 
-        if completed_variant(collected, variant):
+        done = collection.completed_all()
+        if not done and collection.completed_variant(variant):
             variants.remove(variant)
+            if timer:
+                timer.count("variants_removed")
+        if timer:
+            timer.lap("completion")
 
-        if max_opened is not None and collection.opened >= max_opened:
+        if done or (max_opened is not None and collection.opened >= max_opened):
             break
 
     return collection
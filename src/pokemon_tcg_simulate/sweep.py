@@ -0,0 +1,303 @@
+"""
+Sweep a grid of rules: starting pack points, max packs opened, the pack point
+cap and whether to buy cards, into one table.
+
+Every point draws from the same seeded stream for each run (common random
+numbers), so differences between points are down to the rules rather than
+luck. Points which only differ in max packs opened share one simulation,
+observed as it passes each of them, and without buying the pack points make
+no difference, so those points share one simulation too.
+"""
+
+import csv
+import json
+import random
+import sys
+from argparse import ArgumentParser
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from itertools import product
+
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.registry import DEFAULT_DIRECTORY, load_expansion, load_rules
+from pokemon_tcg_simulate.rng import BACKENDS, run_rng
+from pokemon_tcg_simulate.runner import create_statistics
+from pokemon_tcg_simulate.simulation import BUY_STRATEGIES, MAX_PACK_POINTS, simulate
+
+# columns of the table, after the point
+COLUMNS = ("average_opened", "total_collected", "average_bought")
+
+
+@dataclass(frozen=True)
+class SweepPoint:
+    # pack points to start with, or None for those in the initial state
+    pack_points: int | None = None
+
+    max_opened: int | None = None
+    max_pack_points: int = MAX_PACK_POINTS
+    buy_cards: bool = True
+
+    def rules(self):
+        # points with the same rules differ only in when they stop,
+        # and pack points only matter when buying
+        if not self.buy_cards:
+            return SweepPoint(buy_cards=False)
+        return SweepPoint(
+            pack_points=self.pack_points, max_pack_points=self.max_pack_points
+        )
+
+
+def grid(
+    *,
+    pack_points=(None,),
+    max_opened=(None,),
+    max_pack_points=(MAX_PACK_POINTS,),
+    buy=(True,),
+):
+    """
+    Every combination of the values, as sweep points.
+    """
+    return [
+        SweepPoint(
+            pack_points=points, max_opened=opened, max_pack_points=cap, buy_cards=b
+        )
+        for points, opened, cap, b in product(
+            pack_points, max_opened, max_pack_points, buy
+        )
+    ]
+
+
+def _add(statistics, collection):
+    for stat in statistics.values():
+        stat.add(collection)
+
+
+def run_sweep(
+    expansion,
+    points: list[SweepPoint],
+    runs: int,
+    *,
+    seed: int,
+    first_run=0,
+    mission=None,
+    initial_state=None,
+    buy_strategy="rarest",
+    rng_backend="random",
+):
+    """
+    Statistics for each point, the same as runner.run gives for it alone
+    with the same seed.
+    """
+    statistics = {
+        p: create_statistics(buy_cards=p.buy_cards, max_opened=p.max_opened)
+        for p in points
+    }
+
+    groups = defaultdict(list)
+    for point in points:
+        groups[point.rules()].append(point)
+
+    for index in range(first_run, first_run + runs):
+        for rules, members in groups.items():
+            limits = [p.max_opened for p in members]
+            max_opened = None if None in limits else max(limits)
+
+            observed = defaultdict(list)
+            for point in members:
+                if point.max_opened is not None:
+                    observed[point.max_opened].append(point)
+
+            def observe(collection, observed=observed):
+                for point in observed[collection.opened]:
+                    _add(statistics[point], collection)
+
+            collection = Collection.from_json(expansion, mission=mission)
+            if initial_state:
+                collection.load_initial_state(initial_state)
+            if rules.pack_points is not None:
+                collection.pack_points = rules.pack_points
+
+            result = simulate(
+                expansion,
+                collection,
+                buy_cards=rules.buy_cards,
+                buy_strategy=buy_strategy,
+                max_opened=max_opened,
+                max_pack_points=rules.max_pack_points,
+                rng=run_rng(seed, index, rng_backend),
+                observe_at=observed.keys(),
+                observe=observe,
+            )
+
+            # points stopping after the run finished see how it finished
+            for point in members:
+                if point.max_opened is None or point.max_opened > result.opened:
+                    _add(statistics[point], result)
+
+    return statistics
+
+
+def table(statistics):
+    """
+    A row for each point, of its rules and the headline statistics.
+    """
+    rows = []
+    for point, stats in statistics.items():
+        summary = {}
+        for stat in stats.values():
+            summary.update(stat.summary())
+
+        bought = summary.get("average_bought_by_rarity", {}).get("value")
+        rows.append(
+            {
+                **asdict(point),
+                "average_opened": summary.get("average_opened", {}).get("value"),
+                "total_collected": summary.get("total_collected", {}).get("value"),
+                "average_bought": bought and sum(bought.values()),
+            }
+        )
+    return rows
+
+
+def write_table(rows, file):
+    writer = csv.DictWriter(file, fieldnames=[*asdict(SweepPoint()), *COLUMNS])
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def optional_int(value: str):
+    return None if value.lower() == "none" else int(value)
+
+
+def main():
+    parser = ArgumentParser(description="sweep the rules of the simulation")
+    parser.add_argument(
+        "expansion_json",
+        help="path to an expansion data json, or the name of an expansion"
+        " in --expansions-dir",
+    )
+    parser.add_argument(
+        "--expansions-dir",
+        default=DEFAULT_DIRECTORY,
+        help="directory to look up expansions by name in",
+    )
+    parser.add_argument("-i", "--initial-state", help="path to initial state json")
+
+    mission_group = parser.add_mutually_exclusive_group()
+    mission_group.add_argument("-m", "--mission", help="path to mission json")
+    mission_group.add_argument(
+        "-c",
+        "--stop-at-common",
+        action="store_true",
+        help="stop simulation when all common are collected",
+    )
+
+    parser.add_argument(
+        "-r", "--runs", default=100, type=int, help="number of simulations per point"
+    )
+    parser.add_argument(
+        "--pack-points",
+        nargs="+",
+        type=optional_int,
+        default=[None],
+        help="pack points to start with (none for those in the initial state)",
+    )
+    parser.add_argument(
+        "--max-opened",
+        nargs="+",
+        type=optional_int,
+        default=[None],
+        help="max packs to open (none to complete the collection)",
+    )
+    parser.add_argument(
+        "--max-pack-points",
+        nargs="+",
+        type=int,
+        default=[MAX_PACK_POINTS],
+        help="caps on pack points held, at which a card is bought",
+    )
+    parser.add_argument(
+        "--buy",
+        nargs="+",
+        choices=["yes", "no"],
+        default=["yes"],
+        help="whether to buy cards",
+    )
+    parser.add_argument(
+        "--buy-strategy",
+        choices=BUY_STRATEGIES,
+        default="rarest",
+        help="which card to buy when at the pack point cap",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="seed for the runs, shared by every point (random if not given)",
+    )
+    parser.add_argument(
+        "--rng",
+        choices=BACKENDS,
+        default="random",
+        help="generator for the runs, stdlib Mersenne Twister or numpy PCG64",
+    )
+    parser.add_argument("--json", action="store_true", help="output results as JSON")
+    parser.add_argument("-o", "--output", help="path to write the table to, as csv")
+
+    args = parser.parse_args()
+
+    for value in [*args.pack_points, *args.max_pack_points]:
+        if value is not None and value % 5:
+            parser.error("pack points go up in 5s, so must be a multiple of 5")
+
+    try:
+        _, expansion = load_expansion(args.expansion_json, args.expansions_dir)
+    except KeyError as e:
+        parser.error(e.args[0])
+    initial_state, mission = load_rules(
+        expansion, args.initial_state, args.mission, args.stop_at_common
+    )
+
+    seed = args.seed
+    if seed is None:
+        seed = random.randrange(2**32)
+
+    points = grid(
+        pack_points=args.pack_points,
+        max_opened=args.max_opened,
+        max_pack_points=args.max_pack_points,
+        buy=[b == "yes" for b in dict.fromkeys(args.buy)],
+    )
+    statistics = run_sweep(
+        expansion,
+        points,
+        args.runs,
+        seed=seed,
+        mission=mission,
+        initial_state=initial_state,
+        buy_strategy=args.buy_strategy,
+        rng_backend=args.rng,
+    )
+    rows = table(statistics)
+
+    if args.json:
+        results = {
+            "metadata": {"expansion": expansion.name, "runs": args.runs, "seed": seed},
+            "points": [
+                {
+                    "point": asdict(point),
+                    "statistics": {n: s.summary() for n, s in stats.items()},
+                }
+                for point, stats in statistics.items()
+            ],
+        }
+        print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            write_table(rows, f)
+    elif not args.json:
+        write_table(rows, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
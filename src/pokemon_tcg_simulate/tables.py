@@ -0,0 +1,142 @@
+"""
+Simulate every expansion in a directory, for the README results table.
+
+Each run records both when all common cards were collected and when the set
+was completed, so one set of runs per expansion gives both columns.
+"""
+
+import json
+from argparse import ArgumentParser
+from glob import glob
+from pathlib import Path
+
+from pokemon_tcg_simulate.expansion import Expansion
+from pokemon_tcg_simulate.output import avg
+from pokemon_tcg_simulate.registry import DEFAULT_DIRECTORY
+from pokemon_tcg_simulate.runner import (
+    create_pool,
+    create_statistics,
+    run,
+    run_parallel,
+)
+
+
+def find_expansions(pattern: str):
+    """
+    Expansion json files in a directory, or matching a glob.
+    """
+    path = Path(pattern)
+    if path.is_dir():
+        return sorted(str(p) for p in path.glob("*.json"))
+    return sorted(glob(pattern))
+
+
+def run_all(paths, runs, *, workers=1, buy_cards=True):
+    """
+    Simulate each expansion, splitting its runs across one pool of workers
+    shared by every expansion.
+
+    Returns {path: (expansion name, statistics)}, in the order of paths.
+    """
+    data, statistics = {}, {}
+    for path in paths:
+        with open(path) as f:
+            data[path] = json.load(f)
+        statistics[path] = create_statistics(buy_cards=buy_cards)
+
+    if workers == 1:
+        for path in paths:
+            expansion = Expansion.from_json(data[path])
+            run(expansion, runs, statistics[path], buy_cards=buy_cards)
+    else:
+        # each task sends its expansion's json data, loaded once per worker
+        template = create_statistics(buy_cards=buy_cards)
+        with create_pool(None, template, workers=workers, buy_cards=buy_cards) as pool:
+            for path in paths:
+                run_parallel(
+                    data[path], runs, statistics[path], workers=workers, pool=pool
+                )
+
+    return {path: (data[path]["name"], statistics[path]) for path in paths}
+
+
+def format_table(results) -> str:
+    rows = [
+        (
+            name,
+            avg(statistics["opened"].common_opened_hist),
+            avg(statistics["opened"].opened_hist),
+        )
+        for name, statistics in results.values()
+    ]
+
+    width = max([len("Expansion"), *(len(name) for name, *_ in rows)])
+    lines = [
+        f"| {'Expansion':<{width}} | Common | Complete |",
+        f"| {'-' * width} | -----: | -------: |",
+    ]
+    for name, common, complete in rows:
+        lines.append(f"| {name:<{width}} | {common:>6.0f} | {complete:>8.0f} |")
+    return "\n".join(lines)
+
+
+def summarise(results, runs):
+    return {
+        name: {
+            "file": path,
+            "runs": runs,
+            **{n: stat.summary() for n, stat in statistics.items()},
+        }
+        for path, (name, statistics) in results.items()
+    }
+
+
+def main():
+    parser = ArgumentParser(
+        description="simulate many expansions, and print a table of the results"
+    )
+    parser.add_argument(
+        "expansions",
+        nargs="?",
+        default=DEFAULT_DIRECTORY,
+        help="directory of, or glob matching, expansion data jsons",
+    )
+    parser.add_argument(
+        "-r", "--runs", default=1000, type=int, help="number of simulations to run"
+    )
+    parser.add_argument(
+        "--no-buy", action="store_false", dest="buy", help="do not buy cards"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=1,
+        type=int,
+        help="number of worker processes to split runs across",
+    )
+    parser.add_argument(
+        "-o", "--output", help="path to write the markdown table to (default: print it)"
+    )
+    parser.add_argument("--json", help="path to write a JSON summary to")
+
+    args = parser.parse_args()
+
+    paths = find_expansions(args.expansions)
+    if not paths:
+        parser.error(f"no expansions found for {args.expansions}")
+
+    results = run_all(paths, args.runs, workers=args.workers, buy_cards=args.buy)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(format_table(results) + "\n")
+    else:
+        print(format_table(results))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summarise(results, args.runs), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
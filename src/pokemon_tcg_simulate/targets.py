@@ -0,0 +1,140 @@
+"""
+Simulate several targets (missions, the full set, all common cards) from
+one stream of packs per run.
+
+Each target is simulated as if on its own, with its own buying and variant
+rotation, but reads its packs from a stream shared by every target in the
+run: the n-th pack of a variant is the same for all of them, and is only
+opened once. Packs of a variant are independent of each other, so every
+target still sees packs with the right distribution, and the first target
+sees exactly the packs a plain run with the same generator would.
+"""
+
+import json
+import random
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.expansion import create_common_mission
+from pokemon_tcg_simulate.rng import run_rng
+from pokemon_tcg_simulate.simulation import simulate
+
+# names of the targets added alongside missions
+FULL_SET = "full set"
+ALL_COMMON = "all common"
+
+
+class SharedPacks:
+    """
+    Packs of each variant, opened when first needed from a compiled expansion.
+    """
+
+    def __init__(self, compiled, rng=random):
+        self.compiled = compiled
+        self.rng = rng
+        self.packs = defaultdict(list)
+
+        # packs read by all readers, as many as simulating each alone would open
+        self.read = 0
+
+    @property
+    def opened(self):
+        return sum(len(packs) for packs in self.packs.values())
+
+    def reader(self):
+        return PackReader(self)
+
+
+class PackReader:
+    """
+    Reads through the packs of each variant in shared packs, in order.
+
+    Stands in for a compiled expansion in `simulate`.
+    """
+
+    def __init__(self, shared: SharedPacks):
+        self.shared = shared
+        self.cards = shared.compiled.cards
+        self._next = Counter()
+
+    def open(self, variant, rng=None):
+        # rng is unused, packs come from the shared generator
+        packs = self.shared.packs[variant]
+        index = self._next[variant]
+        if index == len(packs):
+            packs.append(self.shared.compiled.open(variant, self.shared.rng))
+        self._next[variant] += 1
+        self.shared.read += 1
+        return packs[index]
+
+
+def load_missions(paths, expansion) -> dict[str, dict]:
+    """
+    Mission cards by name, from mission jsons or directories of them,
+    skipping missions for other expansions.
+    """
+    missions = {}
+    for path in map(Path, paths):
+        files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+        for file in files:
+            with open(file) as f:
+                mission = json.load(f)
+            if mission["expansion"] == expansion.name:
+                missions[mission.get("mission", file.stem)] = mission["cards"]
+    return missions
+
+
+def create_targets(expansion, missions: dict[str, dict]) -> dict[str, dict | None]:
+    """
+    The missions, plus the full set and all common cards.
+    """
+    return {
+        **missions,
+        FULL_SET: None,
+        ALL_COMMON: create_common_mission(expansion)["cards"],
+    }
+
+
+def run_targets(
+    expansion,
+    runs,
+    statistics: dict[str, dict],
+    *,
+    targets: dict[str, dict | None],
+    buy_cards=True,
+    buy_strategy="rarest",
+    max_opened=None,
+    seed=None,
+    rng_backend="random",
+    first_run=0,
+):
+    """
+    Simulate each target, by name, on the same packs, adding to the
+    statistics for each.
+
+    Returns the number of packs opened, and the number read by all the
+    targets, which separate simulations of each would have opened.
+    """
+    # NOTE: mutates the statistics
+    opened = read = 0
+    for index in range(first_run, first_run + runs):
+        rng = random if seed is None else run_rng(seed, index, rng_backend)
+        shared = SharedPacks(expansion.compiled, rng)
+
+        for name, mission in targets.items():
+            result = simulate(
+                expansion,
+                Collection.from_json(expansion, mission=mission),
+                buy_cards=buy_cards,
+                buy_strategy=buy_strategy,
+                max_opened=max_opened,
+                compiled=shared.reader(),
+            )
+            for stat in statistics[name].values():
+                stat.add(result)
+
+        opened += shared.opened
+        read += shared.read
+
+    return opened, read
@@ -0,0 +1,266 @@
+"""
+Record the packs pulled in each run to a compact binary trace, and replay
+traces through the simulation in place of the random number generator.
+
+A trace is a small header, then fixed width records, one per pack:
+
+    magic, header length (uint32), header json (padded to 8 bytes), records
+
+Every field of a record is the same unsigned integer type (uint8, or uint16
+for expansions of 255 cards or more, in the header's byte order), so the
+records can be memory mapped as one flat array, or as a numpy array of shape
+(packs, width):
+
+    booster, variant, number of cards, card IDs (padded with END)
+
+where booster indexes `boosters` and variant indexes `variants` in the
+header, and card IDs are those of the CompiledExpansion. A record with a
+booster of END marks the end of each run.
+
+Replaying reads the packs of each variant in the order they were pulled,
+like `targets.PackReader`. Packs of a variant are independent of each
+other, so a replay with different rules (a mission, initial state, no
+buying) sees packs with the right distribution, as long as the trace has
+enough of them; recording the full set gives the most packs.
+"""
+
+import json
+import mmap
+import sys
+from array import array
+from collections import Counter, defaultdict
+
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.expansion import MAX_CARDS_PER_PACK, CompiledExpansion
+from pokemon_tcg_simulate.simulation import simulate
+
+MAGIC = b"PTCGTRC\x00"
+TRACE_VERSION = 1
+
+# fields of a record before the card IDs
+FIELDS = 3
+
+# header layout, before the json
+PREFIX = len(MAGIC) + 4
+
+
+def header_for(compiled: CompiledExpansion, data: dict | None = None) -> dict:
+    """
+    Header of a trace of an expansion, optionally with its json data so the
+    expansion can be loaded from the trace alone.
+    """
+    expansion = compiled.expansion
+    themed = max(map(len, compiled._themed_cards.values()), default=0)
+    return {
+        "version": TRACE_VERSION,
+        "expansion": expansion.name,
+        "boosters": list(expansion.booster_rates),
+        "variants": list(expansion.variants),
+        "cards": len(compiled.cards),
+        "typecode": "B" if len(compiled.cards) < 0xFF else "H",
+        "byteorder": sys.byteorder,
+        "width": FIELDS + max(MAX_CARDS_PER_PACK, 5, themed),
+        "data": data,
+    }
+
+
+def end_marker(typecode: str) -> int:
+    return (1 << 8 * array(typecode).itemsize) - 1
+
+
+class TraceWriter:
+    """
+    Writes packs to a trace file, buffered.
+    """
+
+    def __init__(self, path, compiled: CompiledExpansion, data: dict | None = None):
+        self.header = header_for(compiled, data)
+        self._width = self.header["width"]
+        self._end = end_marker(self.header["typecode"])
+        self._variants = {v: i for i, v in enumerate(self.header["variants"])}
+
+        raw = json.dumps(self.header).encode()
+        raw += b" " * (-(PREFIX + len(raw)) % 8)
+
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + len(raw).to_bytes(4, "little") + raw)
+
+        self.packs = 0
+        self.runs = 0
+
+    def write(self, booster: int, variant: str, pulled: list[int]):
+        padding = [self._end] * (self._width - FIELDS - len(pulled))
+        record = [booster, self._variants[variant], len(pulled), *pulled, *padding]
+        self._file.write(array(self.header["typecode"], record).tobytes())
+        self.packs += 1
+
+    def end_run(self):
+        record = [self._end] * self._width
+        self._file.write(array(self.header["typecode"], record).tobytes())
+        self.runs += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceRecorder:
+    """
+    Opens packs from a compiled expansion, writing each to a trace.
+
+    Stands in for a compiled expansion in `simulate`.
+    """
+
+    def __init__(self, compiled: CompiledExpansion, writer: TraceWriter):
+        self.compiled = compiled
+        self.cards = compiled.cards
+        self.writer = writer
+
+    def open(self, variant, rng):
+        # the same draws as CompiledExpansion.open
+        booster = self.compiled.pick_booster(rng)
+        pulled = self.compiled.open_booster(booster, variant, rng)
+        self.writer.write(booster, variant, pulled)
+        return pulled
+
+
+class Trace:
+    """
+    A memory mapped trace file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+        size = int.from_bytes(self._mmap[len(MAGIC) : PREFIX], "little")
+        self.header = json.loads(self._mmap[PREFIX : PREFIX + size])
+        if self.header["version"] != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version {self.header['version']}")
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError("The trace was recorded with a different byte order")
+
+        self.width = self.header["width"]
+        self.records = memoryview(self._mmap)[PREFIX + size :].cast(
+            self.header["typecode"]
+        )
+        self._end = end_marker(self.header["typecode"])
+
+    @property
+    def data(self) -> dict | None:
+        # expansion json data, if it was recorded
+        return self.header["data"]
+
+    def check(self, compiled: CompiledExpansion):
+        """
+        Raise ValueError unless the trace was recorded from this expansion.
+        """
+        expected = header_for(compiled)
+        for key in ("expansion", "boosters", "variants", "cards"):
+            if self.header[key] != expected[key]:
+                raise ValueError(f"The trace was recorded from a different {key}")
+
+    def __len__(self):
+        # number of runs, one end marker each
+        return self.records[:: self.width].tolist().count(self._end)
+
+    def runs(self):
+        """
+        Each run, as the list of packs (booster, variant, card IDs) pulled.
+        """
+        records, width = self.records, self.width
+        boosters, variants = self.header["boosters"], self.header["variants"]
+
+        packs = []
+        for start in range(0, len(records), width):
+            booster = records[start]
+            if booster == self._end:
+                yield packs
+                packs = []
+                continue
+            count = records[start + 2]
+            cards = records[start + FIELDS : start + FIELDS + count].tolist()
+            packs.append((boosters[booster], variants[records[start + 1]], cards))
+
+    def close(self):
+        self.records.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayPacks:
+    """
+    Reads through the recorded packs of each variant of a run, in order.
+
+    Stands in for a compiled expansion in `simulate`.
+    """
+
+    def __init__(self, compiled: CompiledExpansion, packs):
+        self.cards = compiled.cards
+        self.packs = defaultdict(list)
+        for _, variant, cards in packs:
+            self.packs[variant].append(cards)
+        self._next = Counter()
+
+    def open(self, variant, rng=None):
+        # rng is unused, packs come from the trace
+        index = self._next[variant]
+        if index == len(self.packs[variant]):
+            raise ValueError(f"The trace has too few packs of {variant} to replay")
+        self._next[variant] += 1
+        return self.packs[variant][index]
+
+
+def replay(
+    expansion,
+    trace: Trace,
+    statistics,
+    *,
+    mission=None,
+    initial_state=None,
+    buy_cards=True,
+    buy_strategy="rarest",
+    max_opened=None,
+):
+    """
+    Simulate each run of a trace from its recorded packs, adding to the
+    statistics.
+    """
+    # NOTE: mutates the statistics
+    compiled = expansion.compiled
+    trace.check(compiled)
+
+    progress = statistics.get("progress")
+    observe_at = set(progress.checkpoints) if progress else ()
+
+    for packs in trace.runs():
+        collection = Collection.from_json(expansion, mission=mission)
+        if initial_state:
+            collection.load_initial_state(initial_state)
+
+        result = simulate(
+            expansion,
+            collection,
+            buy_cards=buy_cards,
+            buy_strategy=buy_strategy,
+            max_opened=max_opened,
+            compiled=ReplayPacks(compiled, packs),
+            observe_at=observe_at,
+            observe=progress and progress.observe,
+        )
+        for stat in statistics.values():
+            stat.add(result)
+
+    return statistics
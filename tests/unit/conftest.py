@@ -0,0 +1,40 @@
+import pytest
+
+from pokemon_tcg_simulate.expansion import ANY, Expansion, Rarity
+
+
+@pytest.fixture(scope="session")
+def expansion():
+    # a crown and star rare tail, and diamonds with two variants
+    return Expansion(
+        name="Test",
+        variants=["A", "B"],
+        booster_rates={"regular": 90, "rare": 10},
+        rarities=(
+            Rarity(
+                name="crown",
+                cost=2500,
+                offering_rate=(0, 0, 0, 1, 4),
+                counts={ANY: 2},
+                rare=True,
+            ),
+            Rarity(
+                name="star",
+                cost=500,
+                offering_rate=(0, 0, 0, 4, 16),
+                counts={ANY: 3},
+                rare=True,
+            ),
+            Rarity(
+                name="diamond",
+                cost=70,
+                offering_rate=(100, 100, 100, 95, 80),
+                counts={ANY: 10, "A": 5, "B": 5},
+            ),
+        ),
+    )
+
+
+@pytest.fixture
+def mission():
+    return {"crown": 1, "diamond": {"A": 2}}
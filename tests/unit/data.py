@@ -0,0 +1,19 @@
+"""
+Expansion json data shared by the tests.
+"""
+
+from pokemon_tcg_simulate.expansion import ANY
+
+EXPANSION = {
+    "name": "Test",
+    # no rare cards to fill a rare booster
+    "booster_rates": {"regular": 100},
+    "rarities": [
+        {
+            "name": "diamond",
+            "cost": 70,
+            "offering_rate": [100, 100, 100, 100, 100],
+            "counts": {ANY: 10},
+        }
+    ],
+}
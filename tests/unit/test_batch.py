@@ -0,0 +1,141 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pokemon_tcg_simulate import batch  # noqa: E402
+from pokemon_tcg_simulate.expansion import ANY, Expansion, Rarity  # noqa: E402
+from pokemon_tcg_simulate.output import (  # noqa: E402
+    BoughtStatistics,
+    CardStatistics,
+    OpenedStatistics,
+)
+
+
+def diamond(counts):
+    return Rarity(
+        name="diamond",
+        cost=70,
+        offering_rate=(100, 100, 100, 100, 100),
+        counts=counts,
+    )
+
+
+def crown():
+    return Rarity(
+        name="crown",
+        cost=2500,
+        offering_rate=(0, 0, 0, 0, 0),
+        counts={ANY: 2},
+        rare_counts={"A": 1, "B": 1},
+        rare=True,
+    )
+
+
+class TestBatchLayout:
+    def test_columns(self):
+        exp = Expansion(
+            name="Test",
+            variants=["A", "B"],
+            rarities=(diamond({ANY: 2, "A": 1, "B": 3}),),
+        )
+        layout = batch.BatchLayout(exp)
+
+        assert layout.size == 6
+        assert layout.card_id("diamond", (ANY, 1)) == 1
+        assert layout.card_id("diamond", ("A", 0)) == 2
+        assert layout.card_id("diamond", ("B", 2)) == 5
+
+    def test_crown_columns(self):
+        exp = Expansion(name="Test", variants=["A", "B"], rarities=(crown(),))
+        layout = batch.BatchLayout(exp)
+
+        assert layout.card_id("crown", ("A", 0)) == 0
+        assert layout.card_id("crown", ("B", 0)) == 1
+        assert layout.rare_pool.tolist() == [[0], [1]]
+
+    def test_mission(self):
+        exp = Expansion(
+            name="Test",
+            variants=["A", "B"],
+            rarities=(diamond({"A": 2, "B": 2}), crown()),
+        )
+        layout = batch.BatchLayout(exp, mission={"diamond": {"B": [2, 1]}})
+
+        assert layout.tracked.tolist() == [True, False]
+        assert layout.need.tolist() == [0, 0, 2, 1, 0, 0]
+        assert layout.buy_order[0].tolist() == [2, 3]
+
+    def test_initial_counts(self):
+        exp = Expansion(name="Test", variants=[ANY], rarities=(diamond(3),))
+        layout = batch.BatchLayout(exp)
+        counts, loaded = layout.initial_counts({"collected": {"diamond": [2, 1]}})
+
+        assert counts.tolist() == [2, 1, 0]
+        assert loaded.tolist() == [True]
+
+
+class TestSimulateBatch:
+    def test_runs(self):
+        exp = Expansion(name="Test", variants=[ANY], rarities=(diamond(20),))
+        results = list(batch.simulate_batch(exp, 25, batch_size=10, rng=1))
+
+        assert [r.runs for r in results] == [10, 10, 5]
+        for result in results:
+            assert (result.opened >= 4).all()
+            assert (result.completed_at[:, 0] == result.opened).all()
+            assert (result.remaining == 0).all()
+
+    def test_buy_initial_pack_points(self):
+        exp = Expansion(name="Test", variants=[ANY], rarities=(diamond(100),))
+        initial_state = {"pack_points": 70 * 100, "collected": {}}
+        (result,) = batch.simulate_batch(exp, 5, initial_state=initial_state, rng=1)
+
+        assert result.opened.tolist() == [1] * 5
+        assert (result.bought[:, 0] >= 95).all()
+        assert (result.remaining == 0).all()
+
+    def test_no_buy(self):
+        exp = Expansion(name="Test", variants=[ANY], rarities=(diamond(10),))
+        initial_state = {"pack_points": 70 * 10, "collected": {}}
+        (result,) = batch.simulate_batch(
+            exp, 5, initial_state=initial_state, buy_cards=False, rng=1
+        )
+
+        assert (result.bought == 0).all()
+        assert (result.opened > 1).all()
+
+    def test_max_opened(self):
+        exp = Expansion(name="Test", variants=[ANY], rarities=(diamond(100),))
+        (result,) = batch.simulate_batch(exp, 5, max_opened=3, buy_cards=False, rng=1)
+
+        assert result.opened.tolist() == [3] * 5
+        assert (result.total[:, 0] == 15).all()
+        assert (result.completed_at == -1).all()
+
+    def test_mission(self):
+        exp = Expansion(
+            name="Test",
+            variants=["A", "B"],
+            rarities=(diamond({"A": 2, "B": 1}),),
+        )
+        (result,) = batch.simulate_batch(
+            exp, 10, mission={"diamond": {"B": 1}}, buy_cards=False, rng=1
+        )
+
+        # the first pack is an A pack, the second can only pull the B card
+        assert result.opened.tolist() == [2] * 10
+
+    def test_statistics(self):
+        exp = Expansion(name="Test", variants=[ANY], rarities=(diamond(10),))
+
+        opened = OpenedStatistics()
+        cards = CardStatistics()
+        bought = BoughtStatistics()
+        for result in batch.simulate_batch(exp, 20, rng=1):
+            opened.add_batch(result)
+            cards.add_batch(result)
+            bought.add_batch(result)
+
+        assert opened.opened_hist.total() == 20
+        assert cards.total_collected.total() == 20
+        assert bought.runs == 20
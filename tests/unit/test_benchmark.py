@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from pokemon_tcg_simulate import benchmark
+
+from .data import EXPANSION
+
+
+def test_measure():
+    calls, units = benchmark.measure(lambda: 3, min_time=0.003)
+    assert calls > 0
+    assert units == pytest.approx(3 * calls)
+
+
+def test_measure_resets():
+    counts = []
+
+    def step():
+        counts[-1] += 1
+        return 1
+
+    step.reset = lambda: counts.append(0)
+    benchmark.measure(step, min_time=0.003, repeat=3)
+    assert len(counts) == 3
+
+
+def test_run_benchmarks(tmp_path):
+    path = tmp_path / "test.json"
+    path.write_text(json.dumps(EXPANSION))
+    (tmp_path / "missions").mkdir()
+    mission = {"expansion": "Test", "cards": {"diamond": 3}}
+    (tmp_path / "missions" / "mission.json").write_text(json.dumps(mission))
+
+    missions = benchmark.find_missions(tmp_path / "missions")
+    assert missions == {"Test": {"diamond": 3}}
+
+    results = benchmark.run_benchmarks([str(path)], missions, min_time=0.003)
+    rates = results["benchmarks"]
+
+    assert set(rates) == {
+        "simulate/test/full",
+        "simulate/test/common",
+        "simulate/test/max_opened",
+        "simulate/test/mission",
+        "open/test",
+        "open_compiled/test",
+        "add/test",
+        "statistics_add/test",
+        "statistics_summary/test",
+    }
+    assert set(rates["simulate/test/full"]) == {"packs_per_second", "runs_per_second"}
+
+    filtered = benchmark.run_benchmarks(
+        [str(path)], missions, pattern="open*", min_time=0.003
+    )
+    assert set(filtered["benchmarks"]) == {"open/test", "open_compiled/test"}
+
+
+def test_compare():
+    def results(rates):
+        return {"version": benchmark.BENCHMARK_VERSION, "benchmarks": rates}
+
+    baseline = results(
+        {"a": {"packs_per_second": 100.0}, "b": {"packs_per_second": 100.0}}
+    )
+    current = results(
+        {
+            "a": {"packs_per_second": 85.0},
+            "b": {"packs_per_second": 95.0},
+            "c": {"packs_per_second": 1.0},
+        }
+    )
+
+    rows = benchmark.compare(baseline, current, threshold=0.1)
+    assert [(name, regressed) for name, *_, regressed in rows] == [
+        ("a", True),
+        ("b", False),
+    ]
+    assert rows[0][4] == pytest.approx(-0.15)
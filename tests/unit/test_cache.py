@@ -0,0 +1,59 @@
+import os
+
+from pokemon_tcg_simulate.cache import ResultCache, cache_key
+from pokemon_tcg_simulate.checkpoint import Checkpoint
+
+
+def test_cache_key():
+    options = {"buy_cards": True, "mission": None}
+    key = cache_key({"name": "A", "rarities": [1, 2]}, options)
+
+    # normalised, so key order doesn't matter
+    assert key == cache_key(
+        {"rarities": [1, 2], "name": "A"}, dict(reversed(options.items()))
+    )
+    assert key != cache_key(
+        {"name": "A", "rarities": [1, 2]}, {**options, "buy_cards": False}
+    )
+    assert key != cache_key({"name": "A", "rarities": [1, 2]}, {**options, "seed": 1})
+
+
+def test_cache_key_engine():
+    # seeded runs of the engines draw different streams
+    data = {"name": "A", "rarities": [1, 2]}
+    serial = {"seed": 1, "engine": "serial", "batch_size": None}
+    batch = {**serial, "engine": "batch"}
+    assert cache_key(data, serial) != cache_key(data, batch)
+    assert cache_key(data, batch) != cache_key(data, {**batch, "batch_size": 64})
+
+
+def test_load_save(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.load("key") is None
+
+    checkpoint = Checkpoint.create({"buy_cards": True})
+    checkpoint.runs = 5
+    cache.save("key", checkpoint)
+
+    assert cache.load("key").runs == 5
+
+    # entries it didn't sign are recomputed, not unpickled
+    signed = cache.path("key").read_bytes()
+    cache.path("key").write_bytes(b"\0" * 32 + signed[32:])
+    assert cache.load("key") is None
+
+
+def test_evict(tmp_path):
+    checkpoint = Checkpoint.create({"buy_cards": True})
+    cache = ResultCache(str(tmp_path))
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.save(key, checkpoint)
+        os.utime(cache.path(key), (i, i))
+
+    # loading marks an entry as recently used
+    cache.load("a")
+
+    cache.max_bytes = 2 * os.path.getsize(cache.path("a"))
+    cache.evict()
+
+    assert sorted(p.stem for p in tmp_path.glob("*.gz")) == ["a", "c"]
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from pokemon_tcg_simulate import runner
+from pokemon_tcg_simulate.checkpoint import Checkpoint, checkpointed
+from pokemon_tcg_simulate.expansion import Expansion
+
+from .data import EXPANSION
+
+
+def test_save_load(tmp_path):
+    path = str(tmp_path / "checkpoint.gz")
+    checkpoint = Checkpoint.create({"buy_cards": True})
+    runner.run(Expansion.from_json(EXPANSION), 5, checkpoint.statistics)
+    checkpoint.runs = 5
+    checkpoint.random_state = random.getstate()
+    checkpoint.save(path)
+
+    loaded = Checkpoint.load(path)
+    assert loaded.runs == 5
+    assert loaded.options == {"buy_cards": True}
+    assert loaded.statistics["opened"].opened_hist.total() == 5
+    assert loaded.random_state == checkpoint.random_state
+
+    # a checkpoint signed with another key isn't loaded
+    (tmp_path / ".key").write_bytes(b"other")
+    with pytest.raises(ValueError, match="signed"):
+        Checkpoint.load(path)
+
+
+def test_checkpointed(tmp_path):
+    path = str(tmp_path / "checkpoint.gz")
+    expansion = Expansion.from_json(EXPANSION)
+    checkpoint = Checkpoint.create({"buy_cards": True})
+    rounds = []
+
+    def run_round(runs, statistics):
+        rounds.append(runs)
+        runner.run(expansion, runs, statistics)
+
+    checkpointed(run_round, checkpoint, path, every=0, chunk=4)(10)
+
+    assert rounds == [4, 4, 2]
+    assert Checkpoint.load(path).runs == checkpoint.runs == 10
+    assert checkpoint.statistics["opened"].opened_hist.total() == 10
+
+
+def test_checkpointed_interrupted(tmp_path):
+    path = str(tmp_path / "checkpoint.gz")
+    expansion = Expansion.from_json(EXPANSION)
+    checkpoint = Checkpoint.create({"buy_cards": True})
+
+    def run_round(runs, statistics):
+        runner.run(expansion, runs, statistics)
+        if checkpoint.runs:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        checkpointed(run_round, checkpoint, path, chunk=4)(10)
+
+    # the partial second chunk isn't counted
+    assert checkpoint.runs == 4
+    assert checkpoint.statistics["opened"].opened_hist.total() == 4
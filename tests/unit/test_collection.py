@@ -6,7 +6,7 @@ from pokemon_tcg_simulate.collection import (
     RarityCollection,
     Variant,
 )
-from pokemon_tcg_simulate.expansion import ANY, Rarity
+from pokemon_tcg_simulate.expansion import ANY, Expansion, Rarity
 
 
 class TestVariant:
@@ -38,6 +38,29 @@ class TestVariant:
         assert v.collection == [0, 5, 0]
         assert v.unique == 1
 
+    def test_add_zero_count(self):
+        v = Variant(3)
+
+        v.add(1, 0)
+        assert 1 not in v
+        assert v.unique == 0
+
+    def test_seen(self):
+        v = Variant(4)
+
+        v.add(0)
+        v.add(2, 3)
+        assert v.seen == 0b0101
+        assert v.unique == 2
+
+    def test_set_collection(self):
+        v = Variant(3)
+
+        v.collection = [0, 2, 1]
+        assert v.seen == 0b110
+        assert v[1] == 2
+        assert len(v) == 2
+
     def test_contains(self):
         v = Variant(3)
 
@@ -152,6 +175,13 @@ class TestRarityCollection:
         c.add((ANY, 1), opened=2)
         assert c.completed_at == 2
 
+    def test_add_returns_missing_variant(self):
+        rarity = diamond({ANY: 1, "A": 1})
+        c = RarityCollection(rarity=rarity)
+        assert c.add(("A", 0), opened=1) == "A"
+        assert c.add(("A", 0), opened=2) is None
+        assert c.missing == {ANY: 1, "A": 0}
+
     def test_buy(self):
         rarity = diamond(2)
         c = RarityCollection(rarity=rarity)
@@ -267,7 +297,7 @@ class TestMissionRarityCollection:
         rarity = diamond({"A": 2, "B": 2})
         mission = {"A": [1, 1], "B": [1, 1]}
         mc = MissionRarityCollection(rarity=rarity, mission=mission)
-        mc.collected["A"].add(1)
+        mc.add(("A", 1), opened=1)
         missing = list(mc.iter_missing())
         assert missing == [("A", 0), ("B", 0), ("B", 1)]
 
@@ -275,7 +305,7 @@ class TestMissionRarityCollection:
         rarity = diamond({"A": 2, "B": 2})
         mission = {"A": [1, 1], "B": [1, 1]}
         mc = MissionRarityCollection(rarity=rarity, mission=mission)
-        mc.collected["A"].add(0)
+        mc.add(("A", 0), opened=1)
         missing = list(mc.iter_missing("A"))
         assert missing == [("A", 1)]
 
@@ -283,7 +313,7 @@ class TestMissionRarityCollection:
         rarity = diamond(3)
         mission = {ANY: [1, 2, 1]}
         mc = MissionRarityCollection(rarity=rarity, mission=mission)
-        mc.collected[ANY].add(1)
+        mc.add((ANY, 1), opened=1)
         missing = list(mc.iter_missing())
         assert missing == [(ANY, 0), (ANY, 1), (ANY, 2)]
 
@@ -291,8 +321,8 @@ class TestMissionRarityCollection:
         rarity = diamond({ANY: 2, "A": 2, "B": 2})
         mission = {ANY: [1], "A": [1, 2]}
         mc = MissionRarityCollection(rarity=rarity, mission=mission)
-        mc.collected["A"].add(1)
-        mc.collected["B"].add(0)  # doesn't contribute to mission
+        mc.add(("A", 1), opened=1)
+        mc.add(("B", 0), opened=1)  # doesn't contribute to mission
         assert mc.remaining() == 3
         assert mc.remaining_cost() == 3 * 70
 
@@ -300,7 +330,7 @@ class TestMissionRarityCollection:
         rarity = diamond({"A": 2, "B": 2})
         mission = {"A": [1, 1], "B": [1, 1]}
         mc = MissionRarityCollection(rarity=rarity, mission=mission)
-        mc.collected["A"].add(0)
+        mc.add(("A", 0), opened=1)
         assert mc.remaining("A") == 1
         assert mc.remaining("B") == 2
 
@@ -308,9 +338,37 @@ class TestMissionRarityCollection:
         rarity = diamond({ANY: 2, "A": 2})
         mission = {ANY: [1, 1], "A": [1, 1]}
         mc = MissionRarityCollection(rarity=rarity, mission=mission)
-        mc.collected[ANY].add(0)
+        mc.add((ANY, 0), opened=1)
         assert mc.remaining(ANY) == 1
 
+    def test_add_multiple_copies(self):
+        rarity = diamond(2)
+        mission = {ANY: [3, 1]}
+        mc = MissionRarityCollection(rarity=rarity, mission=mission)
+
+        assert mc.add((ANY, 0), opened=1) == ANY
+        assert mc.add((ANY, 0), opened=2) == ANY
+        assert mc.remaining() == 2
+        assert list(mc.iter_missing()) == [(ANY, 0), (ANY, 1)]
+
+        assert mc.add((ANY, 0), opened=3) == ANY
+        assert mc.add((ANY, 0), opened=4) is None
+        assert list(mc.iter_missing()) == [(ANY, 1)]
+
+        mc.buy((ANY, 1), opened=5)
+        assert mc.remaining() == 0
+        assert mc.completed_at == 5
+
+    def test_load_initial_state(self):
+        rarity = diamond(2)
+        mission = {ANY: [99, 1]}
+        mc = MissionRarityCollection(rarity=rarity, mission=mission)
+        mc.load_initial_state([50, 0])
+
+        assert mc.remaining() == 50
+        assert mc.missing == {ANY: 50}
+        assert mc.completed_at is None
+
 
 class TestCollection:
     def test_add(self):
@@ -320,6 +378,22 @@ class TestCollection:
         c.add([("diamond", (ANY, 1))])
         assert c.collected["diamond"].collected[ANY].collection == [0, 1, 0]
 
+    def test_add_ids(self):
+        rarity = diamond({ANY: 1, "A": 2})
+        exp = Expansion(name="Test", variants=["A"], rarities=(rarity,))
+        c = Collection.from_json(exp, mission={"diamond": {"A": [1, 1]}})
+        c.index_cards(exp.compiled)
+        c.opened = 1
+
+        # the ANY card isn't part of the mission
+        c.add_ids([0, 2, 2])
+        assert c.collected["diamond"].collected["A"].collection == [0, 2]
+        assert c.required_pack_points() == 70
+        assert not c.completed_all()
+
+        c.add_ids([1])
+        assert c.completed_all()
+
     def test_buy(self):
         rarity = diamond(3)
         c = Collection(collected={"diamond": RarityCollection(rarity=rarity)})
@@ -338,6 +412,68 @@ class TestCollection:
         assert c.pack_points == 50
         assert c.collected["diamond"].collected[ANY].collection == [2, 1, 0]
 
+    def test_required_pack_points(self):
+        rarity = diamond({ANY: 2, "A": 2})
+        c = Collection(collected={"diamond": RarityCollection(rarity=rarity)})
+        assert c.required_pack_points() == 4 * 70
+
+        c.add([("diamond", ("A", 1)), ("diamond", ("A", 1))])
+        assert c.required_pack_points() == 3 * 70
+
+    def test_buy_remaining(self):
+        rarity = diamond(3)
+        c = Collection(collected={"diamond": RarityCollection(rarity=rarity)})
+        c.add([("diamond", (ANY, 1))])
+        c.pack_points = 150
+        c.buy_remaining()
+        assert c.pack_points == 10
+        assert c.collected["diamond"].bought == [(ANY, 0), (ANY, 2)]
+        assert c.required_pack_points() == 0
+        assert c.completed_all()
+
+    def test_buy_remaining_not_enough_points(self):
+        rarity = diamond(3)
+        c = Collection(collected={"diamond": RarityCollection(rarity=rarity)})
+        c.pack_points = 100
+        with pytest.raises(RuntimeError):
+            c.buy_remaining()
+
+    def test_completed(self):
+        common = diamond({ANY: 1, "A": 1, "B": 1})
+        rare = Rarity(
+            name="star",
+            cost=400,
+            offering_rate=(0, 0, 0, 0, 100),
+            counts={"A": 1},
+            rare=True,
+        )
+        c = Collection(
+            collected={
+                "diamond": RarityCollection(rarity=common),
+                "star": RarityCollection(rarity=rare),
+            }
+        )
+
+        c.add([("diamond", (ANY, 0)), ("diamond", ("B", 0))])
+        assert c.completed_variant("B")
+        assert not c.completed_variant("A")
+        assert not c.completed_common()
+
+        c.add([("diamond", ("A", 0))])
+        assert c.completed_common()
+        assert not c.completed_all()
+
+        c.add([("star", ("A", 0))])
+        assert c.completed_variant("A")
+        assert c.completed_all()
+
+    def test_load_initial_state_completed(self):
+        rarity = diamond(3)
+        c = Collection(collected={"diamond": RarityCollection(rarity=rarity)})
+        c.load_initial_state({"collected": {"diamond": 3}})
+        assert c.required_pack_points() == 0
+        assert c.completed_all()
+
     def test_from_json_without_mission(self):
         class DummyExpansion:
             rarities = [diamond(2)]
@@ -0,0 +1,93 @@
+import pytest
+
+from pokemon_tcg_simulate import runner
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.control import (
+    ControlledExpansion,
+    ControlVariateStatistics,
+    expected_pulls,
+    first_pull_rates,
+    regression,
+)
+from pokemon_tcg_simulate.rng import run_rng
+from pokemon_tcg_simulate.simulation import simulate
+
+
+def test_expected_pulls(expansion):
+    compiled = expansion.compiled
+    crown, star, diamond = expected_pulls(compiled, "A")
+
+    # regular packs of 5, rare packs of 2 crowns and 3 stars
+    assert crown == pytest.approx(0.9 * 0.05 + 0.1 * 5 * 2 / 5)
+    assert star == pytest.approx(0.9 * 0.2 + 0.1 * 5 * 3 / 5)
+    assert crown + star + diamond == pytest.approx(5)
+
+
+def test_first_pull_rates(expansion):
+    compiled = expansion.compiled
+    rates = first_pull_rates(compiled, "A")
+    crown = compiled.card_id("crown", ("_any_", 0))
+    b_only = compiled.card_id("diamond", ("B", 0))
+
+    regular = 1 - (1 - 0.01 / 2) * (1 - 0.04 / 2)
+    assert rates[crown] == pytest.approx(0.9 * regular + 0.1 * (1 - 0.8**5))
+    assert rates[b_only] == 0
+
+
+def test_regression():
+    # y = 2 a + 3 b, with a control of no variance and a copy of a
+    cov = [[1, 0, 0, 1], [0, 2, 0, 0], [0, 0, 0, 0], [1, 0, 0, 1]]
+    cross = [2, 6, 0, 2]
+    assert regression(cov, cross) == pytest.approx([2, 3, 0, 0])
+
+
+def test_controls_average_zero(expansion):
+    compiled = ControlledExpansion(expansion)
+    statistics = []
+    for seed in range(200):
+        compiled.reset()
+        simulate(
+            expansion,
+            Collection.from_json(expansion),
+            rng=run_rng(seed, 0),
+            compiled=compiled,
+        )
+        statistics.append(compiled.controls())
+
+    for control in zip(*statistics):
+        mean = sum(control) / len(control)
+        spread = (sum((c - mean) ** 2 for c in control) / len(control)) ** 0.5
+        assert abs(mean) < 4 * spread / len(control) ** 0.5
+
+
+def test_statistics():
+    stats = ControlVariateStatistics()
+    other = ControlVariateStatistics()
+    # packs opened are 100 plus 3 times the control, exactly
+    for i, control in enumerate([-2, 1, 0, 3, -1, 1, -2]):
+        result = Collection(collected={}, opened=100 + 3 * control)
+        (stats if i % 2 else other).add(result, [control, 1.0])
+    stats.merge(other)
+
+    adjusted, error, removed = stats.estimate()
+    assert stats.runs == 7
+    assert adjusted == pytest.approx(100)
+    assert error == pytest.approx(0, abs=1e-6)
+    assert removed == pytest.approx(1)
+
+
+def test_run_controlled(expansion):
+    plain = runner.run(expansion, 10, runner.create_statistics(), seed=1)
+    statistics = runner.create_statistics(control_variates=True)
+    runner.run(expansion, 10, statistics, seed=1, control_variates=True)
+
+    # the controls only watch, so the runs are the same
+    assert list(statistics) == ["opened", "bought", "control_variates"]
+    assert statistics["opened"].opened_hist == plain["opened"].opened_hist
+    assert statistics["bought"] == plain["bought"]
+    controls = statistics["control_variates"]
+    assert controls.opened_hist == plain["opened"].opened_hist
+    assert controls.summary()["variance_removed"]["value"] > 0
+
+    errors = runner.precision(statistics["opened"], controls=controls)
+    assert errors["average"] == controls.estimate()[1]
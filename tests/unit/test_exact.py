@@ -0,0 +1,143 @@
+from io import StringIO
+from functools import partial
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pokemon_tcg_simulate import exact  # noqa: E402
+from pokemon_tcg_simulate.expansion import ANY, Expansion, Rarity  # noqa: E402
+
+
+def diamond(counts, offering_rate=(100,)):
+    return Rarity(name="diamond", cost=70, offering_rate=offering_rate, counts=counts)
+
+
+def single_slot(*rarities, variants=(ANY,)):
+    return Expansion(
+        name="Test",
+        variants=list(variants),
+        rarities=rarities,
+        booster_rates={"regular": 100},
+        cards_per_pack=1,
+    )
+
+
+def test_coupon_collector():
+    exp = single_slot(diamond(5))
+    result = exact.solve(exp)
+
+    # n * H(n) for equally likely cards, one per pack
+    expected = 5 * sum(1 / i for i in range(1, 6))
+    assert exact.expected(result.rarity_cdf["diamond"]) == pytest.approx(expected)
+
+
+def test_geometric():
+    exp = single_slot(
+        diamond(1, offering_rate=(20,)),
+        Rarity(name="gold", cost=50, offering_rate=(80,), counts=1),
+    )
+    result = exact.solve(exp, mission={"diamond": 1})
+
+    assert exact.expected(result.rarity_cdf["diamond"]) == pytest.approx(5)
+    assert result.rarity_cdf["diamond"][1] == pytest.approx(0.2)
+    assert list(result.rarity_cdf) == ["diamond"]
+
+
+def test_variants_unsupported():
+    # completed variants are dropped, which the solver can't model
+    exp = single_slot(diamond({"A": 1, "B": 1}), variants=("A", "B"))
+    with pytest.raises(ValueError, match="variants"):
+        exact.solve(exp)
+
+
+def test_only_rarities():
+    # rarities aren't independent, so there's no exact overall distribution
+    exp = single_slot(
+        diamond(1, offering_rate=(20,)),
+        Rarity(name="gold", cost=50, offering_rate=(80,), counts=1),
+    )
+    result = exact.solve(exp)
+    assert list(result.summary()) == ["average_opened_by_rarity"]
+    assert len(result.rarity_cdf["diamond"]) == len(result.rarity_cdf["gold"])
+
+    file = StringIO()
+    result.dump_cdfs(file=file)
+    assert file.getvalue().startswith("opened,diamond,gold\n0,0,0\n")
+
+
+def test_initial_state_completed():
+    exp = single_slot(diamond(3))
+    result = exact.solve(exp, initial_state={"collected": {"diamond": 3}})
+
+    assert exact.expected(result.rarity_cdf["diamond"]) == 0
+
+
+def test_multiple_copies():
+    exp = single_slot(diamond(3))
+    with pytest.raises(ValueError):
+        exact.solve(exp, mission={"diamond": [2, 1]})
+
+
+def test_rotation_counts():
+    counts = exact._rotation_counts(np.arange(5), 2)
+    assert [c.tolist() for c in counts] == [[0, 1, 1, 2, 2], [0, 0, 1, 1, 2]]
+
+
+class TestSolveMission:
+    def test_buy_when_affordable(self):
+        exp = single_slot(
+            Rarity(name="diamond", cost=10, offering_rate=(20,), counts=1),
+            Rarity(name="gold", cost=50, offering_rate=(80,), counts=1),
+        )
+        result = exact.solve_mission(exp, {"diamond": 1})
+
+        # pulled in the first pack, or bought with the 10 points from two packs
+        # unless pulled in the second
+        assert result.opened.tolist() == pytest.approx([0, 0.2, 0.8])
+        assert result.bought["diamond"].tolist() == pytest.approx([0.36, 0.64])
+
+    def test_buy_rarest_at_cap(self):
+        exp = single_slot(
+            Rarity(name="diamond", cost=70, offering_rate=(50,), counts=2),
+            Rarity(name="star", cost=5000, offering_rate=(50,), counts=1),
+        )
+        initial_state = {"pack_points": 2495, "collected": {"diamond": 2}}
+        result = exact.solve_mission(
+            exp, {"diamond": 2, "star": 1}, initial_state=initial_state
+        )
+
+        # the star card is bought at the cap, whatever is pulled
+        assert result.opened.tolist() == pytest.approx([0, 1])
+        assert result.bought["star"].tolist() == pytest.approx([0.5, 0.5])
+
+    def test_buy_strategy(self):
+        exp = single_slot(
+            Rarity(name="star", cost=2200, offering_rate=(10,), counts=1),
+            Rarity(name="diamond", cost=1500, offering_rate=(90,), counts=20),
+        )
+        initial_state = {"pack_points": 2495, "collected": {}}
+        mission = {"star": 1, "diamond": 1}
+
+        rarest = exact.solve_mission(exp, mission, initial_state=initial_state)
+        expensive = exact.solve_mission(
+            exp, mission, initial_state=initial_state, buy_strategy="most_expensive"
+        )
+
+        # at the cap, one buys the rarer diamond card and the other the star,
+        # or the other card if that was pulled in the first pack
+        # (give or take the other being bought much later, if never pulled)
+        approx = partial(pytest.approx, abs=1e-4)
+        assert rarest.bought["diamond"].tolist() == approx([0.045, 0.955])
+        assert rarest.bought["star"].tolist() == approx([0.955, 0.045])
+        assert expensive.bought["diamond"].tolist() == approx([0.9, 0.1])
+        assert expensive.bought["star"].tolist() == approx([0.1, 0.9])
+
+    def test_variant_dropped(self):
+        exp = single_slot(diamond({"A": 1, "B": 2}), variants=("A", "B"))
+        result = exact.solve_mission(exp, {"diamond": {"A": 1, "B": 2}})
+
+        # A is completed by the first pack, so the rest are B packs
+        assert result.opened @ np.arange(len(result.opened)) == pytest.approx(
+            4, abs=1e-3
+        )
@@ -1,4 +1,13 @@
-from pokemon_tcg_simulate.expansion import ANY, Expansion, Rarity, create_common_mission
+import pytest
+
+from pokemon_tcg_simulate.expansion import (
+    ANY,
+    AliasTable,
+    Expansion,
+    Rarity,
+    capped_weights,
+    create_common_mission,
+)
 
 
 def diamond(counts):
@@ -10,6 +19,38 @@ def diamond(counts):
     )
 
 
+class TestAliasTable:
+    @pytest.mark.parametrize(
+        "weights", [[1], [1, 1], [60, 30, 10], [0, 0.04, 99.96, 0], [1, 2, 3, 4, 5]]
+    )
+    def test_probabilities(self, weights):
+        table = AliasTable(weights)
+
+        # each slot keeps prob[i] for itself and gives the rest to its alias
+        probs = [0.0] * len(weights)
+        for i in range(len(weights)):
+            probs[i] += table.prob[i] / table.size
+            probs[table.alias[i]] += (1 - table.prob[i]) / table.size
+
+        total = sum(weights)
+        assert probs == pytest.approx([w / total for w in weights])
+
+    def test_sample_never_picks_zero_weight(self):
+        table = AliasTable([0, 1, 0])
+        assert {table.sample() for _ in range(100)} == {1}
+
+    def test_no_weights(self):
+        with pytest.raises(ValueError):
+            AliasTable([0, 0])
+
+
+def test_capped_weights():
+    assert capped_weights([60, 30, 10]) == [60, 30, 10]
+    assert capped_weights([100, 33, 66]) == [100, 0, 0]
+    assert capped_weights([33, 66]) == [33, 66]
+    assert capped_weights([50, 60, 10]) == [50, 50, 0]
+
+
 class TestRarity:
     def test_init_single_count(self):
         r = diamond(5)
@@ -73,6 +114,13 @@ class TestExpansion:
         assert exp._cum_prob[3] == [0, 100]
         assert exp._cum_prob[4] == [0, 100]
 
+    def test_init_no_booster_rates(self):
+        r1 = Rarity(name="diamond", cost=70, offering_rate=(100,), counts={ANY: 5})
+        with pytest.raises(ValueError):
+            Expansion(
+                name="Test", variants=[ANY], rarities=(r1,), booster_rates={"rare": 0}
+            )
+
     def test_from_json_no_variants(self):
         data = {
             "name": "Test",
@@ -214,6 +262,53 @@ class TestExpansion:
             assert item[1][1] in range(5)
 
 
+class TestCompiledExpansion:
+    def test_card_ids(self):
+        r1 = diamond({ANY: 2, "Pikachu": 1, "Charizard": 3})
+        r2 = Rarity(
+            name="crown",
+            cost=2500,
+            offering_rate=(0, 0, 0, 0, 0),
+            counts={ANY: 2},
+            rare_counts={"Pikachu": 1, "Charizard": 1},
+            rare=True,
+        )
+        exp = Expansion(
+            name="Test", variants=["Pikachu", "Charizard"], rarities=(r1, r2)
+        )
+        compiled = exp.compiled
+
+        assert len(compiled.cards) == 8
+        assert compiled.cards[3] == ("diamond", ("Charizard", 0))
+        assert compiled.card_id("diamond", ("Charizard", 2)) == 5
+        assert compiled.card_id("crown", ("Charizard", 0)) == 7
+        assert compiled.rarity_of == [0] * 6 + [1] * 2
+
+    def test_open_regular(self):
+        r1 = diamond({ANY: 5, "Pikachu": 3, "Charizard": 2})
+        r2 = Rarity(
+            name="gold", cost=50, offering_rate=(0, 0, 0, 100, 100), counts={ANY: 2}
+        )
+        exp = Expansion(name="Test", variants=["Pikachu", ANY], rarities=(r1, r2))
+        compiled = exp.compiled
+
+        for _ in range(10):
+            result = [compiled.cards[c] for c in compiled.open_regular("Pikachu")]
+            assert len(result) == 5
+
+            for rarity, (variant, _) in result[:3]:
+                assert rarity == "diamond"
+                assert variant in ("Pikachu", ANY)
+
+            for rarity, _ in result[3:]:
+                assert rarity == "gold"
+
+    def test_missing_variant_cards(self):
+        r1 = diamond({"Pikachu": 3})
+        with pytest.raises(ValueError):
+            Expansion(name="Test", variants=["Charizard"], rarities=(r1,)).compiled
+
+
 def test_create_common_mission():
     r1 = Rarity(
         name="diamond",
@@ -0,0 +1,66 @@
+import pytest
+
+from pokemon_tcg_simulate import runner
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.expansion import ANY
+from pokemon_tcg_simulate.importance import TiltedExpansion, tail_rarities
+from pokemon_tcg_simulate.rng import run_rng
+from pokemon_tcg_simulate.simulation import simulate
+
+
+def test_tail_rarities(expansion):
+    assert tail_rarities(expansion) == {"crown"}
+
+
+def test_invalid_tilt(expansion):
+    with pytest.raises(ValueError):
+        TiltedExpansion(expansion, 0)
+    with pytest.raises(ValueError):
+        TiltedExpansion(expansion, 2)
+
+
+def test_no_tilt_same_as_simulate(expansion):
+    tilted = TiltedExpansion(expansion, 1)
+    for seed in range(5):
+        plain = simulate(
+            expansion, Collection.from_json(expansion), rng=run_rng(seed, 0)
+        )
+        tilted.reset()
+        sampled = simulate(
+            expansion,
+            Collection.from_json(expansion),
+            rng=run_rng(seed, 0),
+            compiled=tilted,
+        )
+        assert sampled.opened == plain.opened
+        assert tilted.likelihood_ratio() == 1
+
+
+def test_weighted_pull_rate(expansion):
+    # under the tilt crowns are pulled less, but weighted they come out the same
+    tilted = TiltedExpansion(expansion, 0.2)
+    crowns = {tilted.card_id("crown", (ANY, i)) for i in range(2)}
+    rng = run_rng(0, 0)
+
+    packs = 50_000
+    weights = pulled = 0.0
+    for _ in range(packs):
+        tilted.reset()
+        has_crown = bool(crowns.intersection(tilted.open("A", rng)))
+        weights += tilted.likelihood_ratio()
+        pulled += has_crown * tilted.likelihood_ratio()
+
+    # a crown in either of the last two slots, or a rare booster (2 crowns, 3 stars)
+    expected = 0.9 * (1 - 0.99 * 0.96) + 0.1 * (1 - (3 / 5) ** 5)
+    assert weights / packs == pytest.approx(1, abs=0.02)
+    assert pulled / packs == pytest.approx(expected, abs=0.015)
+
+
+def test_run_weighted(expansion):
+    statistics = runner.create_statistics(importance_tilt=0.5)
+    runner.run(expansion, 20, statistics, seed=1, importance_tilt=0.5)
+
+    opened = statistics["opened"]
+    assert list(statistics) == ["opened"]
+    assert opened.runs == 20
+    assert opened.opened_hist.total() != 20
@@ -1,7 +1,11 @@
+import gzip
 from collections import Counter
 from io import StringIO
 
+import pytest
+
 from pokemon_tcg_simulate import output
+from pokemon_tcg_simulate.collection import Collection
 
 
 class TestOutput:
@@ -14,6 +18,23 @@ class TestOutput:
         assert output.percentiles(Counter([1, 2, 3])) == [3]  # only 50th percentile
         assert output.percentiles(Counter([])) == []
 
+    def test_stderr(self):
+        assert output.stderr(Counter([1, 3])) == 1.0
+        assert output.stderr(Counter([5] * 10)) == 0
+        assert output.stderr(Counter([1])) is None
+
+    def test_quantile(self):
+        hist = Counter(range(1, 101))
+        assert output.quantile(hist, 0.5) == 50
+        assert output.quantile(hist, 0.95) == 95
+        assert output.quantile(hist, 1) == 100
+
+    def test_percentile_stderr(self):
+        assert output.percentile_stderr(Counter([5] * 100), 95) == 0
+        wide = output.percentile_stderr(Counter(range(100)), 50)
+        narrow = output.percentile_stderr(Counter({i: 100 for i in range(100)}), 50)
+        assert narrow < wide
+
     def test_dump_histograms(self):
         hist = {"a": Counter([1, 2, 3]), "b": Counter([4, 5])}
         file = StringIO()
@@ -21,3 +42,106 @@ class TestOutput:
         file.seek(0)
         expected_output = "opened,a,b\n0,0,0\n1,1,0\n2,1,0\n3,1,0\n4,0,1\n5,0,1\n"
         assert file.getvalue() == expected_output
+
+    @pytest.mark.parametrize("suffix", [".csv", ".csv.gz", ".npz"])
+    def test_write_histograms(self, tmp_path, suffix):
+        if suffix == ".npz":
+            pytest.importorskip("numpy")
+        hist = {"a": Counter({1: 2, 3000: 1}), "b": Counter({4: 0.5, 5: 1.25})}
+        path = tmp_path / f"hist{suffix}"
+        output.write_histograms(hist, path)
+
+        assert output.load_histograms(path) == hist
+
+    @pytest.mark.parametrize("suffix", [".gz", ".tar.gz", ".txt", ""])
+    def test_write_histograms_unknown(self, tmp_path, suffix):
+        with pytest.raises(ValueError):
+            output.write_histograms({"a": Counter({1: 2})}, tmp_path / f"hist{suffix}")
+
+    def test_sparse_histograms(self, tmp_path):
+        path = tmp_path / "hist.csv.gz"
+        output.write_histograms({"a": Counter({1: 2, 3000: 1})}, path)
+        with gzip.open(path, "rt") as f:
+            assert f.read() == "histogram,opened,count\na,1,2\na,3000,1\n"
+
+
+class TestPairedStatistics:
+    def test_summary(self):
+        stats = output.PairedStatistics(strategies=["a", "b"])
+        for a, b in [(10, 12), (20, 21), (30, 33)]:
+            stats.add(
+                {
+                    "a": Collection(collected={}, opened=a),
+                    "b": Collection(collected={}, opened=b),
+                }
+            )
+
+        other = output.PairedStatistics(strategies=["a", "b"])
+        other.add(
+            {
+                "a": Collection(collected={}, opened=40),
+                "b": Collection(collected={}, opened=42),
+            }
+        )
+        stats.merge(other)
+
+        summary = stats.summary()
+        assert summary["average_opened"]["value"] == {"a": 25.0, "b": 27.0}
+
+        difference = summary["paired_difference"]["value"]["b"]
+        assert difference["mean"] == 2.0
+        assert difference["stderr"] == output.stderr(Counter([2, 1, 3, 2]))
+        assert difference["ci95"][0] < 2.0 < difference["ci95"][1]
+        # the runs vary far more than the differences between strategies
+        assert difference["pairing_gain"] > 100
+
+
+class TestWeightedOpenedStatistics:
+    def test_summary(self):
+        stats = output.WeightedOpenedStatistics()
+        for opened, weight in [(10, 1.5), (20, 0.5), (30, 0.5)]:
+            stats.add(Collection(collected={}, opened=opened), weight)
+
+        other = output.WeightedOpenedStatistics()
+        other.add(Collection(collected={}, opened=100), 0.01)
+        stats.merge(other)
+
+        summary = stats.summary()
+        assert stats.runs == 4
+        assert summary["average_opened"]["value"] == pytest.approx(41 / 2.51)
+        assert summary["opened_percentiles"]["value"]["50"] == 10
+        assert summary["opened_percentiles"]["value"]["99.9"] == 100
+
+        # self-normalised, like the percentiles
+        probability, error = stats.tail_probability(20)
+        assert probability == pytest.approx((0.5 + 0.01) / 2.51)
+        assert stats.tail_probability(10)[0] == pytest.approx(1 - 1.5 / 2.51)
+        assert error > 0
+        assert stats.tail_probability(100) == (0, 0)
+
+    def test_unweighted(self):
+        stats = output.WeightedOpenedStatistics()
+        for opened in [1, 2, 3, 4]:
+            stats.add(Collection(collected={}, opened=opened))
+
+        assert stats.summary()["effective_runs"]["value"] == 4
+        assert stats.tail_probability(2) == (0.5, output.stderr(Counter([0, 0, 1, 1])))
+
+
+class TestProgressStatistics:
+    def test_add(self):
+        stats = output.ProgressStatistics(checkpoints=(20, 10))
+        assert stats.checkpoints == (10, 20)
+
+        snapshot = Collection(collected={}, opened=10)
+        stats.observe(snapshot)
+        # finished before the second checkpoint, so counts as it finished
+        stats.add(Collection(collected={}, opened=15))
+
+        other = output.ProgressStatistics(checkpoints=(10, 20))
+        other.observe(snapshot)
+        stats.merge(other)
+
+        assert stats.curve[10].total_collected.total() == 2
+        assert stats.curve[20].total_collected.total() == 1
+        assert list(stats.summary()["progress"]["value"]) == [10, 20]
@@ -0,0 +1,75 @@
+import pytest
+
+from pokemon_tcg_simulate import runner
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.expansion import ANY, Expansion, Rarity
+from pokemon_tcg_simulate.profiling import PHASES, ProfileStatistics
+from pokemon_tcg_simulate.rng import run_rng
+from pokemon_tcg_simulate.simulation import simulate
+
+from .data import EXPANSION as EXPANSION_DATA
+
+EXPANSION = Expansion(
+    name="Test",
+    variants=["A", "B"],
+    rarities=(
+        Rarity(
+            name="star",
+            cost=500,
+            offering_rate=(0, 0, 0, 2, 8),
+            counts={ANY: 3},
+            rare=True,
+        ),
+        Rarity(
+            name="diamond",
+            cost=70,
+            offering_rate=(100, 100, 100, 98, 92),
+            counts={ANY: 20, "A": 10, "B": 10},
+        ),
+    ),
+)
+
+
+def test_same_as_simulate():
+    profile = ProfileStatistics()
+    for seed in range(5):
+        plain = simulate(
+            EXPANSION, Collection.from_json(EXPANSION), rng=run_rng(seed, 0)
+        )
+        profiled = simulate(
+            EXPANSION,
+            Collection.from_json(EXPANSION),
+            rng=run_rng(seed, 0),
+            profile=profile,
+        )
+        profile.add(profiled)
+
+        assert profiled.opened == plain.opened
+        assert profiled.all_common_at == plain.all_common_at
+        assert {r: c.bought for r, c in profiled.collected.items()} == {
+            r: c.bought for r, c in plain.collected.items()
+        }
+
+    assert profile.boosters.total() == profile.packs
+    assert profile.counters["buy_remaining_triggered"] == 5
+    assert set(profile.phases) == set(PHASES)
+
+
+def test_run_parallel_profiled():
+    statistics = runner.create_statistics()
+    statistics["profile"] = ProfileStatistics()
+    runner.run_parallel(EXPANSION_DATA, 10, statistics, workers=2)
+
+    profile = statistics["profile"]
+    assert profile.runs == 10
+    assert profile.packs == sum(
+        k * v for k, v in statistics["opened"].opened_hist.items()
+    )
+    assert profile.summary()["packs_by_booster"]["value"] == {"regular": profile.packs}
+
+
+def test_batch_unsupported():
+    statistics = runner.create_statistics()
+    statistics["profile"] = ProfileStatistics()
+    with pytest.raises(ValueError, match="profile"):
+        runner.run(EXPANSION_DATA, 10, statistics, engine="batch")
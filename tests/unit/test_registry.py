@@ -0,0 +1,121 @@
+import json
+import pickle
+from pathlib import Path
+
+import pytest
+
+from pokemon_tcg_simulate import registry
+from pokemon_tcg_simulate.registry import (
+    ExpansionRegistry,
+    load_expansion,
+    load_rules,
+    read_expansion,
+)
+
+from .data import EXPANSION
+
+
+def write_expansion(directory, data=EXPANSION, stem="test_set"):
+    path = directory / f"{stem}.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+def test_find(tmp_path):
+    path = write_expansion(tmp_path, {**EXPANSION, "name": "Space-Time Test"})
+    registry = ExpansionRegistry(tmp_path)
+
+    assert registry.find("test_set") == path
+    assert registry.find("Test Set") == path
+    assert registry.find("space-time test") == path
+    assert registry.names() == ["Space-Time Test"]
+
+    with pytest.raises(KeyError):
+        registry.find("other")
+
+
+def test_default_directory():
+    # the bundled expansions, wherever the command is run from
+    assert Path(registry.DEFAULT_DIRECTORY).is_absolute()
+    assert ExpansionRegistry(registry.DEFAULT_DIRECTORY).find("genetic_apex").exists()
+
+
+def test_read_expansion_cached(tmp_path):
+    path = write_expansion(tmp_path)
+    cache_dir = tmp_path / "cache"
+
+    data, expansion = read_expansion(path, cache_dir)
+    assert data == EXPANSION
+    assert "compiled" in vars(expansion)
+    (cached,) = cache_dir.glob("*.pickle")
+
+    _, loaded = read_expansion(path, cache_dir)
+    assert loaded == expansion
+    assert loaded.compiled.cards == expansion.compiled.cards
+
+    # changing the data replaces the cached copy
+    write_expansion(tmp_path, {**EXPANSION, "name": "Changed"})
+    _, changed = read_expansion(path, cache_dir)
+    assert changed.name == "Changed"
+    assert [p.name for p in cache_dir.glob("*.pickle")] != [cached.name]
+    assert len(list(cache_dir.glob("*.pickle"))) == 1
+
+
+def test_load_expansion(tmp_path):
+    path = write_expansion(tmp_path)
+    assert load_expansion(str(path))[0] == EXPANSION
+    assert load_expansion("Test Set", tmp_path)[0] == EXPANSION
+
+    with pytest.raises(KeyError, match="expected one of: Test"):
+        load_expansion("other", tmp_path)
+
+
+def test_load_rules(tmp_path):
+    _, expansion = read_expansion(write_expansion(tmp_path))
+    path = tmp_path / "mission.json"
+    path.write_text(json.dumps({"expansion": "Test", "cards": {"star": 1}}))
+
+    assert load_rules(expansion) == (None, None)
+    assert load_rules(expansion, mission=path) == (None, {"star": 1})
+    _, common = load_rules(expansion, stop_at_common=True)
+    assert "star" not in common
+
+
+def test_read_expansion_same_name(tmp_path):
+    # same named files from different directories are cached side by side
+    cache_dir = tmp_path / "cache"
+    first = write_expansion(tmp_path)
+    (tmp_path / "other").mkdir()
+    second = write_expansion(tmp_path / "other", {**EXPANSION, "name": "Other"})
+
+    read_expansion(first, cache_dir)
+    read_expansion(second, cache_dir)
+    assert len(list(cache_dir.glob("*.pickle"))) == 2
+    assert read_expansion(first, cache_dir)[1].name == "Test"
+
+
+def test_read_expansion_tampered(tmp_path, monkeypatch):
+    path = write_expansion(tmp_path)
+    cache_dir = tmp_path / "cache"
+    read_expansion(path, cache_dir)
+    (cached,) = cache_dir.glob("*.pickle")
+
+    # an entry that isn't signed with the cache's key is rebuilt, not unpickled
+    signed = cached.read_bytes()
+    cached.write_bytes(b"\0" * 32 + signed[32:])
+    monkeypatch.setattr(pickle, "loads", lambda payload: pytest.fail("unpickled"))
+    _, expansion = read_expansion(path, cache_dir)
+    assert expansion.name == "Test"
+    assert cached.read_bytes()[:32] == signed[:32]
+
+
+def test_read_expansion_code_changed(tmp_path, monkeypatch):
+    path = write_expansion(tmp_path)
+    cache_dir = tmp_path / "cache"
+    read_expansion(path, cache_dir)
+    (cached,) = cache_dir.glob("*.pickle")
+
+    # a different version of the code replaces the cached copy
+    monkeypatch.setattr(registry, "source_fingerprint", lambda: "changed")
+    read_expansion(path, cache_dir)
+    assert [p.name for p in cache_dir.glob("*.pickle")] != [cached.name]
@@ -0,0 +1,33 @@
+import pytest
+
+from pokemon_tcg_simulate.rng import run_rng
+
+
+@pytest.mark.parametrize("backend", ["random", "numpy"])
+def test_run_rng(backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+
+    first = run_rng(1, 0, backend)
+    values = [first.random() for _ in range(5)]
+
+    again = run_rng(1, 0, backend)
+    assert [again.random() for _ in range(5)] == values
+    assert run_rng(1, 1, backend).random() != values[0]
+    assert run_rng(2, 0, backend).random() != values[0]
+    assert all(0 <= v < 1 for v in values)
+
+
+def test_numpy_random():
+    pytest.importorskip("numpy")
+    rng = run_rng(1, 0, "numpy")
+
+    # derived from random and getrandbits
+    assert {rng.randint(0, 3) for _ in range(200)} == {0, 1, 2, 3}
+    assert {rng.getrandbits(3) for _ in range(200)} == set(range(8))
+    assert len(rng.choices("abc", k=5)) == 5
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        run_rng(1, 0, "other")
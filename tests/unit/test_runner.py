@@ -0,0 +1,138 @@
+import pytest
+
+from pokemon_tcg_simulate import runner
+from pokemon_tcg_simulate.expansion import ANY, Expansion
+from pokemon_tcg_simulate.output import PairedStatistics
+
+from .data import EXPANSION
+
+
+class TestRunner:
+    def test_create_statistics(self):
+        assert list(runner.create_statistics()) == ["opened", "bought"]
+        assert list(runner.create_statistics(buy_cards=False, max_opened=5)) == [
+            "cards"
+        ]
+
+    def test_split_runs(self):
+        assert runner.split_runs(10, 4) == [3, 3, 2, 2]
+        assert runner.split_runs(2, 4) == [1, 1]
+
+    def test_merge_statistics(self):
+        expansion = Expansion.from_json(EXPANSION)
+        first = runner.run(expansion, 3, runner.create_statistics())
+        second = runner.run(expansion, 2, runner.create_statistics())
+
+        merged = runner.merge_statistics(first, second)
+        assert merged["opened"].opened_hist.total() == 5
+        assert merged["opened"].rarity_hist["diamond"].total() == 5
+        assert merged["bought"].runs == 5
+
+    def test_run_parallel(self):
+        statistics = runner.create_statistics(max_opened=3)
+        runner.run_parallel(EXPANSION, 10, statistics, workers=2, max_opened=3)
+
+        assert statistics["cards"].total_collected.total() == 10
+        assert statistics["bought"].runs == 10
+
+    def test_run_seeded(self):
+        expansion = Expansion.from_json(EXPANSION)
+        whole = runner.run(expansion, 6, runner.create_statistics(), seed=1)
+
+        # the same runs, however they're split
+        split = runner.run(expansion, 4, runner.create_statistics(), seed=1)
+        runner.run(expansion, 2, split, seed=1, first_run=4)
+        assert split["opened"].opened_hist == whole["opened"].opened_hist
+
+        parallel = runner.create_statistics()
+        runner.run_parallel(expansion, 6, parallel, workers=2, seed=1)
+        assert parallel["opened"].opened_hist == whole["opened"].opened_hist
+
+    def test_run_progress(self):
+        expansion = Expansion.from_json(EXPANSION)
+        statistics = runner.create_statistics(progress_at=(1, 3, 1000))
+        runner.run(expansion, 5, statistics, seed=1)
+        curve = statistics["progress"].curve
+
+        # snapshots are the same as stopping there
+        stopped = runner.create_statistics(max_opened=3)
+        runner.run(expansion, 5, stopped, seed=1, max_opened=3)
+        assert curve[3].total_collected == stopped["cards"].total_collected
+        assert curve[1].total_collected.total() == 5
+
+        # and past the end of every run, as the runs finished
+        assert curve[1000].cards_by_rarity["diamond"] == {1.0: 5}
+
+        parallel = runner.create_statistics(progress_at=(1, 3, 1000))
+        runner.run_parallel(expansion, 5, parallel, workers=2, seed=1)
+        assert parallel["progress"].curve[3].total_collected == curve[3].total_collected
+
+        # the batch engine doesn't take snapshots
+        with pytest.raises(ValueError, match="progress"):
+            runner.run(expansion, 5, statistics, engine="batch")
+
+    def test_run_parallel_pool(self):
+        expansion = Expansion.from_json(EXPANSION)
+        whole = runner.run(expansion, 6, runner.create_statistics(), seed=1)
+
+        # one pool for several rounds
+        statistics = runner.create_statistics()
+        with runner.create_pool(expansion, statistics, workers=2, seed=1) as pool:
+            for first_run in (0, 3):
+                runner.run_parallel(
+                    expansion, 3, statistics, workers=2, first_run=first_run, pool=pool
+                )
+        assert statistics["opened"].opened_hist == whole["opened"].opened_hist
+
+    def test_run_parallel_shared_pool(self):
+        rarity = {**EXPANSION["rarities"][0], "counts": {ANY: 5}}
+        other = {**EXPANSION, "name": "Other", "rarities": [rarity]}
+        wholes = [
+            runner.run(Expansion.from_json(data), 6, runner.create_statistics(), seed=1)
+            for data in (EXPANSION, other)
+        ]
+
+        # one pool for several expansions, each sent as json data with its tasks
+        template = runner.create_statistics()
+        with runner.create_pool(None, template, workers=2, seed=1) as pool:
+            for data, whole in zip((EXPANSION, other), wholes):
+                statistics = runner.create_statistics()
+                runner.run_parallel(data, 6, statistics, workers=2, pool=pool)
+                assert statistics["opened"].opened_hist == whole["opened"].opened_hist
+
+    def test_run_paired(self):
+        expansion = Expansion.from_json(EXPANSION)
+        statistics = PairedStatistics(strategies=["rarest", "most_expensive"])
+        runner.run_paired(expansion, 5, statistics, seed=1)
+
+        # with one rarity the strategies buy the same cards, on the same packs
+        assert statistics.opened_hist["rarest"].total() == 5
+        assert statistics.difference_hist["most_expensive"] == {0: 5}
+
+    def test_run_until_target(self):
+        expansion = Expansion.from_json(EXPANSION)
+        statistics = runner.create_statistics()
+        rounds = []
+
+        def run_round(runs):
+            rounds.append(runs)
+            runner.run(expansion, runs, statistics)
+
+        runs = runner.run_until(run_round, statistics, runs=10, target_stderr=0.5)
+
+        assert runs == sum(rounds) == statistics["opened"].opened_hist.total()
+        assert runner.precision(statistics["opened"])["average"] <= 0.5
+        # at most doubling each round
+        assert all(b <= sum(rounds[: i + 1]) for i, b in enumerate(rounds[1:]))
+
+    def test_run_until_time_budget(self):
+        expansion = Expansion.from_json(EXPANSION)
+        statistics = runner.create_statistics()
+
+        runs = runner.run_until(
+            lambda n: runner.run(expansion, n, statistics),
+            statistics,
+            runs=5,
+            time_budget=0.1,
+        )
+        assert runs == statistics["opened"].opened_hist.total() >= 5
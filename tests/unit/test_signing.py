@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from pokemon_tcg_simulate.signing import (
+    KEY_FILE,
+    read_signed,
+    sign,
+    signing_key,
+    verify,
+    write_signed,
+)
+
+
+def test_signing_key(tmp_path):
+    key = signing_key(tmp_path)
+    assert signing_key(tmp_path) == key
+    assert os.stat(tmp_path / KEY_FILE).st_mode & 0o777 == 0o600
+
+
+def test_verify():
+    signed = sign(b"key", b"payload")
+    assert verify(b"key", signed) == b"payload"
+    assert verify(b"other", signed) is None
+    assert verify(b"key", signed[:-1]) is None
+    assert verify(b"key", b"") is None
+
+
+def test_read_write(tmp_path):
+    path = tmp_path / "file"
+    write_signed(path, b"payload")
+    assert read_signed(path) == b"payload"
+
+    path.write_bytes(sign(b"other", b"payload"))
+    with pytest.raises(ValueError, match="signed"):
+        read_signed(path)
@@ -37,6 +37,17 @@ class TestPick:
         assert card[0] == ANY
         assert card[1] in range(5)
 
+    def test_rarity_order(self):
+        rarities = [
+            Rarity("crown", cost=9, offering_rate=(0.1,), counts={ANY: 1}),
+            Rarity("star", cost=5, offering_rate=(0.1,), counts={ANY: 5}),
+            Rarity("diamond", cost=1, offering_rate=(0.5,), counts={"A": 10}),
+        ]
+        assert simulation.rarity_order(rarities, "rarest", "A") == [1, 2, 0]
+        # no diamonds to pull in B
+        assert simulation.rarity_order(rarities, "rarest", "B") == [1, 0, 2]
+        assert simulation.rarity_order(rarities, "most_expensive", "A") == [0, 1, 2]
+
 
 class TestCompleted:
     def test_completed_all(self):
@@ -0,0 +1,65 @@
+from pokemon_tcg_simulate import runner, sweep
+from pokemon_tcg_simulate.simulation import MAX_PACK_POINTS
+from pokemon_tcg_simulate.sweep import SweepPoint, grid, run_sweep, table
+
+
+def test_grid():
+    points = grid(max_opened=[10, None], buy=[True, False])
+    assert len(points) == 4
+    assert SweepPoint(max_opened=10, buy_cards=False) in points
+    assert SweepPoint(pack_points=500).rules() == SweepPoint(pack_points=500)
+    assert SweepPoint(pack_points=500, buy_cards=False).rules() == SweepPoint(
+        buy_cards=False
+    )
+
+
+def test_same_as_run(expansion):
+    points = grid(pack_points=[0, 1000], max_opened=[5, 20, None], buy=[True, False])
+    statistics = run_sweep(expansion, points, 10, seed=3)
+
+    for point in points:
+        initial_state = {"pack_points": point.pack_points, "collected": {}}
+        alone = runner.run(
+            expansion,
+            10,
+            runner.create_statistics(
+                buy_cards=point.buy_cards, max_opened=point.max_opened
+            ),
+            initial_state=initial_state,
+            buy_cards=point.buy_cards,
+            max_opened=point.max_opened,
+            seed=3,
+        )
+        assert {n: s.summary() for n, s in statistics[point].items()} == {
+            n: s.summary() for n, s in alone.items()
+        }
+
+    rows = table(statistics)
+    assert len(rows) == len(points)
+    assert rows[0]["total_collected"] is not None
+
+
+def test_shared_simulations(monkeypatch, expansion):
+    calls = 0
+    simulate = sweep.simulate
+
+    def counted(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return simulate(*args, **kwargs)
+
+    monkeypatch.setattr(sweep, "simulate", counted)
+    points = grid(pack_points=[0, 1000], max_opened=[5, 20, None], buy=[True, False])
+    run_sweep(expansion, points, 4, seed=3)
+
+    # one simulation for each starting pack points when buying, and one without
+    assert len(points) == 12
+    assert calls == 3 * 4
+
+
+def test_pack_point_cap(expansion):
+    # a lower cap buys cards sooner, and so more of them
+    points = grid(max_pack_points=[100, MAX_PACK_POINTS])
+    low, high = table(run_sweep(expansion, points, 10, seed=3))
+    assert low["average_bought"] > high["average_bought"]
+    assert low["average_opened"] < high["average_opened"]
@@ -0,0 +1,50 @@
+import json
+
+from pokemon_tcg_simulate import tables
+
+from .data import EXPANSION
+
+
+def write_expansions(tmp_path):
+    for name in ("Beta", "Alpha"):
+        with open(tmp_path / f"{name.lower()}.json", "w") as f:
+            json.dump({**EXPANSION, "name": name}, f)
+    (tmp_path / "format.md").write_text("not an expansion")
+
+
+def test_find_expansions(tmp_path):
+    write_expansions(tmp_path)
+
+    paths = [str(tmp_path / "alpha.json"), str(tmp_path / "beta.json")]
+    assert tables.find_expansions(str(tmp_path)) == paths
+    assert tables.find_expansions(str(tmp_path / "a*.json")) == paths[:1]
+
+
+def test_run_all(tmp_path):
+    write_expansions(tmp_path)
+    paths = tables.find_expansions(str(tmp_path))
+
+    results = tables.run_all(paths, 5)
+    assert [name for name, _ in results.values()] == ["Alpha", "Beta"]
+    for _, statistics in results.values():
+        assert statistics["opened"].opened_hist.total() == 5
+        assert statistics["opened"].common_opened_hist.total() == 5
+
+    table = tables.format_table(results).splitlines()
+    assert table[0] == "| Expansion | Common | Complete |"
+    assert table[2].startswith("| Alpha     |")
+
+    summary = tables.summarise(results, 5)
+    assert summary["Alpha"]["runs"] == 5
+    assert "average_opened" in summary["Alpha"]["opened"]
+
+
+def test_run_all_workers(tmp_path):
+    write_expansions(tmp_path)
+    paths = tables.find_expansions(str(tmp_path))
+
+    # one pool for both expansions
+    results = tables.run_all(paths, 6, workers=2)
+    assert [name for name, _ in results.values()] == ["Alpha", "Beta"]
+    for _, statistics in results.values():
+        assert statistics["opened"].opened_hist.total() == 6
@@ -0,0 +1,57 @@
+import json
+
+from pokemon_tcg_simulate import runner
+from pokemon_tcg_simulate.collection import Collection
+from pokemon_tcg_simulate.rng import run_rng
+from pokemon_tcg_simulate.simulation import simulate
+from pokemon_tcg_simulate.targets import (
+    ALL_COMMON,
+    FULL_SET,
+    SharedPacks,
+    create_targets,
+    load_missions,
+    run_targets,
+)
+
+
+def test_shared_packs(expansion):
+    shared = SharedPacks(expansion.compiled, run_rng(0, 0))
+    first, second = shared.reader(), shared.reader()
+
+    packs = [first.open(v) for v in "AABA"]
+    assert [second.open(v) for v in "ABAA"] == [packs[i] for i in (0, 2, 1, 3)]
+    assert shared.opened == 4
+    assert shared.read == 8
+
+
+def test_first_target_same_as_simulate(expansion):
+    plain = simulate(expansion, Collection.from_json(expansion), rng=run_rng(1, 0))
+
+    shared = SharedPacks(expansion.compiled, run_rng(1, 0))
+    result = simulate(
+        expansion, Collection.from_json(expansion), compiled=shared.reader()
+    )
+    assert result.opened == plain.opened
+    assert shared.opened == plain.opened
+
+
+def test_run_targets(expansion, mission):
+    targets = create_targets(expansion, {"mission": mission})
+    assert list(targets) == ["mission", FULL_SET, ALL_COMMON]
+
+    statistics = {name: runner.create_statistics() for name in targets}
+    opened, read = run_targets(expansion, 10, statistics, targets=targets, seed=2)
+
+    hists = [s["opened"].opened_hist for s in statistics.values()]
+    assert all(hist.total() == 10 for hist in hists)
+    assert read == sum(k * v for hist in hists for k, v in hist.items())
+    # packs are shared, so fewer are opened, but at least all the full set's
+    assert sum(k * v for k, v in hists[1].items()) <= opened < read
+
+
+def test_load_missions(tmp_path, expansion, mission):
+    for name, expansion_name in [("ours", "Test"), ("theirs", "Other")]:
+        with open(tmp_path / f"{name}.json", "w") as f:
+            json.dump({"expansion": expansion_name, "cards": mission}, f)
+
+    assert load_missions([tmp_path], expansion) == {"ours": mission}
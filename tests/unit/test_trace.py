@@ -0,0 +1,71 @@
+import pytest
+
+from pokemon_tcg_simulate import runner
+from pokemon_tcg_simulate.expansion import Expansion
+from pokemon_tcg_simulate.trace import Trace, TraceWriter, replay
+
+
+@pytest.fixture
+def trace_path(tmp_path, expansion):
+    path = tmp_path / "trace.bin"
+    with TraceWriter(path, expansion.compiled) as writer:
+        statistics = runner.create_statistics()
+        runner.run(expansion, 5, statistics, seed=1, record=writer)
+    assert writer.runs == 5
+    assert writer.packs == sum(
+        k * v for k, v in statistics["opened"].opened_hist.items()
+    )
+    return path, statistics
+
+
+def test_record(trace_path):
+    path, statistics = trace_path
+    with Trace(path) as trace:
+        assert trace.header["expansion"] == "Test"
+        assert len(trace) == 5
+
+        runs = list(trace.runs())
+        assert sorted(map(len, runs)) == sorted(
+            statistics["opened"].opened_hist.elements()
+        )
+        booster, variant, cards = runs[0][0]
+        assert booster in ("regular", "rare")
+        assert variant == "A"
+        assert len(cards) == 5
+
+
+def test_replay(trace_path, expansion, mission):
+    path, statistics = trace_path
+    with Trace(path) as trace:
+        replayed = replay(expansion, trace, runner.create_statistics())
+        assert replayed["opened"].opened_hist == statistics["opened"].opened_hist
+
+        # new rules, on the same packs
+        with_mission = replay(
+            expansion, trace, runner.create_statistics(), mission=mission
+        )
+        assert with_mission["opened"].opened_hist.total() == 5
+
+
+def test_replay_checks(trace_path, expansion):
+    path, _ = trace_path
+    other = Expansion(name="Test", variants=["A", "B"], rarities=expansion.rarities[1:])
+    with Trace(path) as trace:
+        with pytest.raises(ValueError, match="different"):
+            replay(other, trace, runner.create_statistics())
+
+        # without buying, the runs need more packs than were recorded
+        with pytest.raises(ValueError, match="too few packs"):
+            replay(expansion, trace, runner.create_statistics(), buy_cards=False)
+
+
+def test_record_tilted(tmp_path, expansion):
+    with TraceWriter(tmp_path / "trace.bin", expansion.compiled) as writer:
+        with pytest.raises(ValueError, match="importance tilt"):
+            runner.run(
+                expansion,
+                1,
+                runner.create_statistics(importance_tilt=0.5),
+                importance_tilt=0.5,
+                record=writer,
+            )